@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import liferestart  # noqa: E402
+from liferestart import Game, Statistics  # noqa: E402
+
+
+def read_memory() -> Dict[str, int]:
+  # 单位为 KiB，仅支持 Linux
+  result: Dict[str, int] = {}
+  with open("/proc/self/smaps_rollup") as f:
+    for line in f:
+      parts = line.split()
+      if len(parts) == 3 and parts[2] == "kB":
+        result[parts[0].rstrip(":")] = int(parts[1])
+  return {
+    "rss": result.get("Rss", 0),
+    "pss": result.get("Pss", 0),
+    "shared": result.get("Shared_Clean", 0) + result.get("Shared_Dirty", 0),
+    "private": result.get("Private_Clean", 0) + result.get("Private_Dirty", 0),
+  }
+
+
+def run_lives(lives: int, seed: int) -> None:
+  for i in range(lives):
+    game = Game(statistics=Statistics())
+    game.seed(seed + i)
+    talents = next(game.random_talents())[:3]
+    game.set_talents(talents)
+    game.set_stats(5, 5, 5, 5)
+    for _ in game.progress():
+      pass
+    game.end()
+
+
+def child(lives: int, seed: int, write_fd: int) -> None:
+  run_lives(lives, seed)
+  os.write(write_fd, (json.dumps(read_memory()) + "\n").encode())
+  os.close(write_fd)
+  os._exit(0)
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="测量 fork 后子进程的共享和私有内存")
+  parser.add_argument("--children", type=int, default=4)
+  parser.add_argument("--lives", type=int, default=20)
+  parser.add_argument("--no-preload", action="store_true", help="不调用 liferestart.preload()")
+  args = parser.parse_args()
+
+  if not args.no_preload:
+    liferestart.preload()
+  parent = read_memory()
+  results: List[Dict[str, int]] = []
+  pids: List[int] = []
+  pipes: List[int] = []
+  for i in range(args.children):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+      os.close(read_fd)
+      child(args.lives, i * args.lives, write_fd)
+    os.close(write_fd)
+    pids.append(pid)
+    pipes.append(read_fd)
+  for pid, read_fd in zip(pids, pipes):
+    with os.fdopen(read_fd) as f:
+      results.append(json.loads(f.readline()))
+    os.waitpid(pid, 0)
+
+  print(f"preload: {not args.no_preload}")
+  print(f"parent: rss {parent['rss']} KiB")
+  for i, result in enumerate(results):
+    print(
+      f"child {i}: rss {result['rss']} KiB, shared {result['shared']} KiB, "
+      f"private {result['private']} KiB, pss {result['pss']} KiB")
+  print(f"mean private: {sum(i['private'] for i in results) / len(results):.0f} KiB")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from liferestart import Game, Statistics  # noqa: E402
+from liferestart.condition import Condition  # noqa: E402
+from liferestart.struct.achievement import Opportunity  # noqa: E402
+
+# 可重复的基准测试，只依赖标准库。每个场景报告每次操作的耗时（多轮取中位数）
+# 和 tracemalloc 统计的内存峰值，结果是稳定排序的 JSON，可以保存为基线并比较。
+
+DATA = os.path.join(ROOT, "liferestart", "data")
+MEMORY_SLACK_KIB = 64
+
+
+@dataclass
+class Scenario:
+  name: str
+  setup: Callable[[], Callable[[], Any]]  # 返回被计时的函数，准备工作不计时
+  operations: int  # 每次调用被计时函数包含的操作数，例如局数
+
+
+def _new_game(seed: int) -> Game:
+  game = Game(statistics=Statistics())
+  game.seed(seed)
+  game.set_talents(next(game.random_talents())[:3])
+  game.set_stats(5, 5, 5, 5)
+  return game
+
+
+def _run_lives(lives: int) -> Callable[[], None]:
+  def run() -> None:
+    for i in range(lives):
+      game = _new_game(i)
+      for _ in game.progress():
+        pass
+      game.end()
+  return run
+
+
+def _conditions() -> List[str]:
+  result: List[str] = []
+  with open(os.path.join(DATA, "events.json"), encoding="utf-8") as f:
+    for event in json.load(f).values():
+      result.extend(event[key] for key in ("include", "exclude") if event.get(key))
+      result.extend(branch.split(":")[0] for branch in event.get("branch", []))
+  for name in ("talents.json", "achievement.json"):
+    with open(os.path.join(DATA, name), encoding="utf-8") as f:
+      result.extend(i["condition"] for i in json.load(f).values() if i.get("condition"))
+  return result
+
+
+def _parse_conditions() -> Callable[[], None]:
+  conditions = _conditions()
+  def run() -> None:
+    for condition in conditions:
+      Condition.parse(condition)
+  return run
+
+
+def _random_talents(draws: int) -> Callable[[], None]:
+  def run() -> None:
+    game = Game(statistics=Statistics())
+    game.seed(0)
+    generator = game.random_talents()
+    for _ in range(draws):
+      next(generator)
+  return run
+
+
+def _check_achievements(calls: int) -> Callable[[], None]:
+  game = _new_game(0)
+  for _ in game.progress():
+    pass
+  def run() -> None:
+    for _ in range(calls):
+      game._check_achievements(Opportunity.TRAJECTORY)  # type: ignore
+      game._check_achievements(Opportunity.SUMMARY)  # type: ignore
+  return run
+
+
+def _statistics_round_trip(rounds: int) -> Callable[[], None]:
+  stats = Statistics()
+  for i in range(20):
+    game = Game(statistics=stats)
+    game.seed(i)
+    game.set_talents(next(game.random_talents())[:3])
+    game.set_stats(5, 5, 5, 5)
+    for _ in game.progress():
+      pass
+    game.end()
+  def run() -> None:
+    for _ in range(rounds):
+      Statistics.deserialize(json.loads(json.dumps(stats.serialize())))
+  return run
+
+
+SCENARIOS = [
+  Scenario("parse_conditions", _parse_conditions, 1),
+  Scenario("progress", lambda: _run_lives(20), 20),
+  Scenario("random_talents", lambda: _random_talents(1000), 1000),
+  Scenario("check_achievements", lambda: _check_achievements(1000), 1000),
+  Scenario("statistics_round_trip", lambda: _statistics_round_trip(100), 100),
+]
+
+
+def measure_import() -> Dict[str, float]:
+  # 在新的解释器中测量冷启动导入，包括加载数据和构建索引
+  code = (
+    "import json, sys, time, tracemalloc\n"
+    f"sys.path.insert(0, {ROOT!r})\n"
+    "tracemalloc.start()\n"
+    "start = time.perf_counter()\n"
+    "import liferestart\n"
+    "seconds = time.perf_counter() - start\n"
+    "print(json.dumps([seconds, tracemalloc.get_traced_memory()[1]]))\n"
+  )
+  runs = [
+    json.loads(subprocess.run(
+      [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout) for _ in range(5)]
+  return {
+    "seconds": statistics.median(run[0] for run in runs),
+    "peak_kib": max(run[1] for run in runs) / 1024,
+  }
+
+
+def measure(scenario: Scenario, repeat: int) -> Dict[str, float]:
+  times: List[float] = []
+  for _ in range(repeat):
+    function = scenario.setup()
+    start = time.perf_counter()
+    function()
+    times.append(time.perf_counter() - start)
+  # 内存峰值单独测一轮，避免 tracemalloc 影响计时
+  function = scenario.setup()
+  tracemalloc.start()
+  function()
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  seconds = statistics.median(times) / scenario.operations
+  return {"seconds": seconds, "per_second": 1 / seconds, "peak_kib": peak / 1024}
+
+
+def run(names: Optional[List[str]] = None, repeat: int = 5) -> Dict[str, Any]:
+  results: Dict[str, Dict[str, float]] = {}
+  if not names or "import" in names:
+    results["import"] = measure_import()
+  for scenario in SCENARIOS:
+    if not names or scenario.name in names:
+      results[scenario.name] = measure(scenario, repeat)
+  return {
+    "python": platform.python_version(),
+    "implementation": platform.python_implementation(),
+    "scenarios": {
+      name: {key: float(f"{value:.6g}") for key, value in result.items()}
+      for name, result in results.items()
+    },
+  }
+
+
+def compare(
+  result: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+  # 耗时或内存峰值超过基线 (1 + threshold) 倍视为退化，内存另外允许 MEMORY_SLACK_KIB 的波动
+  regressions: List[str] = []
+  for name, current in result["scenarios"].items():
+    old = baseline["scenarios"].get(name)
+    if old is None:
+      continue
+    for key, slack in (("seconds", 0.0), ("peak_kib", MEMORY_SLACK_KIB)):
+      if current[key] > old[key] * (1 + threshold) + slack:
+        regressions.append(f"{name}.{key}: {old[key]} -> {current[key]}")
+  return regressions
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description="LifeRestartPy 基准测试")
+  parser.add_argument(
+    "scenarios", nargs="*", help="只运行指定的场景，可选 import、"
+    + "、".join(scenario.name for scenario in SCENARIOS))
+  parser.add_argument("--repeat", type=int, default=5)
+  parser.add_argument("--save", help="把结果保存为基线")
+  parser.add_argument("--baseline", help="与保存的基线比较")
+  parser.add_argument("--threshold", type=float, default=0.2, help="允许的退化比例")
+  args = parser.parse_args()
+
+  result = run(args.scenarios, args.repeat)
+  print(json.dumps(result, indent=2, sort_keys=True))
+  if args.save:
+    with open(args.save, "w") as f:
+      json.dump(result, f, indent=2, sort_keys=True)
+      f.write("\n")
+  if args.baseline:
+    with open(args.baseline) as f:
+      regressions = compare(result, json.load(f), args.threshold)
+    for regression in regressions:
+      print(f"退化：{regression}", file=sys.stderr)
+    if regressions:
+      sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -1,10 +1,20 @@
+import copy
+import dataclasses
+import time
 from collections import defaultdict
 from dataclasses import dataclass, field
 from random import Random
-from typing import Any, Dict, Generator, List, Optional, Set, Tuple, TypedDict
+from typing import (
+  Any, Dict, FrozenSet, Generator, List, Optional, Sequence, Set, Tuple, TypedDict
+)
+
+from typing_extensions import NotRequired
 
 from .config import Config, StatRarityItem, TalentBoostItem
-from .data import ACHIEVEMENT, AGE, EVENT, TALENT
+from .dataset import DEFAULT_DATASET, Dataset, get_dataset
+from .preload import preload as preload
+from .sampler import BucketSampler
+from .state import GameState, Slot
 from .struct.achievement import Achievement, Opportunity
 from .struct.character import Character
 from .struct.commons import Rarity
@@ -22,14 +32,14 @@ class SerializedGeneratedCharacter(TypedDict):
   seed: int
 
 
-@dataclass
+@dataclass(frozen=True)
 class GeneratedCharacter(Character):
   seed: int
 
   def serialize(self) -> SerializedGeneratedCharacter:
     return {
       "name": self.name,
-      "talents": self.talents,
+      "talents": list(self.talents),
       "charm": int(self.charm),
       "intelligence": int(self.intelligence),
       "strength": int(self.strength),
@@ -57,6 +67,13 @@ class SerializedStatistics(TypedDict):
   finished_games: int
   inherited_talent: int
   character: Optional[SerializedGeneratedCharacter]
+  replica: NotRequired[str]
+  counters: NotRequired[Dict[str, int]]
+  clocks: NotRequired[Dict[str, List[Any]]]
+
+
+# 最后写入者获胜的字段，赋值时自动记录时间戳
+STATISTICS_REGISTERS = ("inherited_talent", "character")
 
 
 @dataclass
@@ -67,6 +84,70 @@ class Statistics:
   finished_games: int = 0
   inherited_talent: int = -1
   character: Optional[GeneratedCharacter] = None
+  # 多个副本合并用的元数据。replica 是本副本的标识，不同的 worker 必须不同；
+  # counters 是上次合并时已知的各副本的 finished_games，本副本的值由总数推算；
+  # clocks 是 STATISTICS_REGISTERS 中字段的 (纳秒时间戳, 副本)
+  replica: str = field(default="", compare=False)
+  counters: Dict[str, int] = field(default_factory=lambda: {}, compare=False)
+  clocks: Dict[str, Tuple[int, str]] = field(default_factory=lambda: {}, compare=False)
+
+  def __setattr__(self, name: str, value: Any) -> None:
+    # __init__ 中 clocks 还不存在，这时只是普通的赋值，默认值的时间戳视为 0
+    initialized = "clocks" in self.__dict__
+    if name == "replica" and initialized and value != self.replica:
+      # 换成新的副本标识（例如从已有的统计复制出新的 worker）时，
+      # 已有的局数仍然算在旧副本名下
+      self.counters = self._counter_vector()
+    object.__setattr__(self, name, value)
+    if name in STATISTICS_REGISTERS and initialized:
+      self.clocks[name] = (time.time_ns(), self.replica)
+
+  def copy(self) -> "Statistics":
+    return dataclasses.replace(
+      self, talents=set(self.talents), events=set(self.events),
+      achievements=set(self.achievements), counters=dict(self.counters), clocks=dict(self.clocks))
+
+  def _counter_vector(self) -> Dict[str, int]:
+    vector = dict(self.counters)
+    vector[self.replica] = self.finished_games - sum(
+      value for replica, value in self.counters.items() if replica != self.replica)
+    return vector
+
+  def merge(self, other: "Statistics") -> None:
+    # 集合取并集，计数器逐副本取最大值再求和，寄存器取时间戳较新的一方。
+    # 满足交换律、结合律和幂等律，可以按任意顺序、重复地合并完整状态或 diff 得到的增量。
+    self.talents |= other.talents
+    self.events |= other.events
+    self.achievements |= other.achievements
+    vector = self._counter_vector()
+    for replica, value in other._counter_vector().items():
+      if value > vector.get(replica, 0):
+        vector[replica] = value
+    self.counters = vector
+    object.__setattr__(self, "finished_games", sum(vector.values()))
+    for name in STATISTICS_REGISTERS:
+      clock = other.clocks.get(name)
+      if clock is not None and clock > self.clocks.get(name, (0, "")):
+        object.__setattr__(self, name, getattr(other, name))
+        self.clocks[name] = clock
+
+  def diff(self, base: "Statistics") -> "Statistics":
+    # 相对于 base（通常是上次同步时 copy() 的快照）的增量，本身也是 Statistics，可以直接 merge
+    vector = self._counter_vector()
+    base_vector = base._counter_vector()
+    counters = {
+      replica: value for replica, value in vector.items() if value > base_vector.get(replica, 0)}
+    delta = Statistics(
+      self.talents - base.talents, self.events - base.events,
+      self.achievements - base.achievements, replica=self.replica)
+    delta.counters = counters
+    object.__setattr__(delta, "finished_games", sum(counters.values()))
+    for name in STATISTICS_REGISTERS:
+      clock = self.clocks.get(name)
+      if clock is not None and clock > base.clocks.get(name, (0, "")):
+        object.__setattr__(delta, name, getattr(self, name))
+        delta.clocks[name] = clock
+    return delta
 
   def serialize(self) -> SerializedStatistics:
     return {
@@ -76,6 +157,9 @@ class Statistics:
       "events": list(self.events),
       "achievements": list(self.achievements),
       "character": self.character.serialize() if self.character else None,
+      "replica": self.replica,
+      "counters": self.counters,
+      "clocks": {name: list(clock) for name, clock in self.clocks.items()},
     }
 
   @staticmethod
@@ -87,7 +171,10 @@ class Statistics:
       set(serialized["achievements"]),
       serialized["finished_games"],
       serialized["inherited_talent"],
-      GeneratedCharacter.deserialize(character) if character else None
+      GeneratedCharacter.deserialize(character) if character else None,
+      serialized.get("replica", ""),
+      dict(serialized.get("counters", {})),
+      {name: (clock[0], clock[1]) for name, clock in serialized.get("clocks", {}).items()},
     )
 
 
@@ -132,46 +219,103 @@ class Game:
 
   _raw_talents: List[Talent]
   _talents: List[Talent]
-  _charm: float
-  _intelligence: float
-  _strength: float
-  _money: float
-  _spirit: int
-  _max_charm: float
-  _max_intelligence: float
-  _max_strength: float
-  _max_money: float
-  _max_spirit: int
-  _min_charm: float
-  _min_intelligence: float
-  _min_strength: float
-  _min_money: float
-  _min_spirit: int
-
-  _age: int
-  _max_age: int
+  _state: GameState
+  _slots: List[Any]
+  _events: Set[int]
+
   _alive: bool
   _talent_executed: Dict[int, int]
-  _condition_vars: Dict[str, Any]
+  _talent_schedule: List[Tuple[Talent, Optional[FrozenSet[int]]]]
 
-  def __init__(self, config: Config = Config(), statistics: Statistics = Statistics()):
-    self.config = config
-    self.statistics = statistics
-    self._random = Random()
+  def __init__(
+    self, config: Optional[Config] = None, statistics: Optional[Statistics] = None,
+    random: Optional[Random] = None, dataset: Optional[Dataset] = None,
+    locale: Optional[str] = None
+  ):
+    # random 可以是任意 random.Random 的实例，例如 liferestart.rng.PhiloxRandom
+    # dataset 默认为 liferestart.data 中的数据，也可以是 Dataset.overlay() 叠加了自定义内容的数据，
+    # locale 是 register_locale 注册的语言，与 dataset 只能指定一个。
+    # 不指定 statistics 时每局使用各自新建的 Statistics（以前的默认参数被所有 Game 共享）
+    if dataset is not None and locale is not None:
+      raise ValueError("dataset 和 locale 只能指定一个")
+    self.config = Config() if config is None else config
+    if locale is not None:
+      self.dataset = get_dataset(locale)
+    else:
+      self.dataset = DEFAULT_DATASET if dataset is None else dataset
+    self.statistics = Statistics() if statistics is None else statistics
+    self._random = Random() if random is None else random
+    self._raw_talents = []
     self._talents = []
-    self._charm = self._max_charm = self._min_charm = 0
-    self._intelligence = self._max_intelligence = self._min_intelligence = 0
-    self._strength = self._max_strength = self._min_strength = 0
-    self._money = self._max_money = self._min_money = 0
-    self._spirit = self._max_spirit = self._min_spirit = 0
-    self._max_age = self._age = -1
+    self._talent_schedule = []
+    self._state = GameState()
+    self._slots = self._state.slots
+    self._state.reset(Slot.AGE, -1)
+    self._events = self._slots[Slot.EVT]
+    self._slots[Slot.ATLT] = self.statistics.talents
+    self._slots[Slot.AEVT] = self.statistics.events
+    self._slots[Slot.TMS] = self.statistics.finished_games
     self._alive = True
     self._talent_executed = defaultdict(int)
-    self._condition_vars = {
-      "ATLT": self.statistics.talents,
-      "AEVT": self.statistics.events,
-      "TMS": self.statistics.finished_games,
-    }
+
+  @property
+  def _condition_vars(self) -> GameState:
+    # 兼容旧代码，按名字读写条件变量
+    return self._state
+
+  @property
+  def alive(self) -> bool:
+    return self._alive
+
+  @property
+  def values(self) -> Sequence[Any]:
+    # 条件变量，按 Slot 的下标读取，不要修改
+    return self._slots
+
+  @property
+  def random(self) -> Random:
+    return self._random
+
+  @random.setter
+  def random(self, random: Random) -> None:
+    # 例如重新播种分裂出的游戏，或者在每一年开始前定位 PhiloxRandom
+    self._random = random
+
+  @property
+  def pending_talents(self) -> List[Tuple[Talent, int]]:
+    # 还可能发动的天赋及其已经发动的次数
+    return [(talent, self._talent_executed[talent.id]) for talent, _ in self._talent_schedule]
+
+  def fork(self, random: Optional[Random] = None) -> "Game":
+    # 复制当前这一局的全部状态（包括随机数状态和统计），数据表仍然共享。
+    # 复制出的游戏可以用 next_year() 从当前年份继续。指定 random 时复制出的游戏改用它
+    game = copy.copy(self)
+    game.statistics = self.statistics.copy()
+    if random is None:
+      game._random = type(self._random)()
+      game._random.setstate(self._random.getstate())
+    else:
+      game._random = random
+    game._talents = list(self._talents)
+    game._talent_schedule = list(self._talent_schedule)
+    game._talent_executed = defaultdict(int, self._talent_executed)
+    game._state = GameState()
+    game._slots = game._state.slots
+    game._slots[:] = self._slots
+    game._slots[Slot.TLT] = set(self._slots[Slot.TLT])
+    game._events = game._slots[Slot.EVT] = set(self._events)
+    game._slots[Slot.ATLT] = game.statistics.talents
+    game._slots[Slot.AEVT] = game.statistics.events
+    return game
+
+  def use_dataset(self, dataset: Dataset) -> None:
+    # 换用另一份逻辑相同的数据（例如 liferestart.profiling 中条件带计数的副本），
+    # 已经选择的天赋按 id 换成新数据中的对象，可以在一局中途调用
+    talents = dataset.talents
+    self.dataset = dataset
+    self._raw_talents = [talents[talent.id] for talent in self._raw_talents]
+    self._talents = [talents[talent.id] for talent in self._talents]
+    self._talent_schedule = [(talents[talent.id], ages) for talent, ages in self._talent_schedule]
 
   def seed(self, seed: Optional[int] = None) -> int:
     if seed is None:
@@ -180,32 +324,23 @@ class Game:
     self._random.seed(seed)
     return seed
 
-  def random_talents(self) -> Generator[List[Talent], None, None]:
+  def random_talents(self, fast: bool = False) -> Generator[List[Talent], None, None]:
+    # fast=True 时使用 O(1) 的交换删除，概率分布不变，但同一种子抽到的天赋与默认模式不同
     weight = self.config.talent.weight * sum([
       self._get_boost(self.config.talent.boost.finished_games, self.statistics.finished_games),
       self._get_boost(self.config.talent.boost.achievements, len(self.statistics.achievements)),
     ], TalentBoostItem.ONE)
-    by_rarity: Dict[Rarity, List[Talent]] = {rarity: [] for rarity in Rarity}
-    for i in (i for i in TALENT.values() if not i.exclusive):
-      by_rarity[i.rarity].append(i)
+    sampler: BucketSampler[Rarity, Talent] = BucketSampler(
+      self.dataset.talent_by_rarity, {rarity: weight.get(rarity) for rarity in Rarity}, fast)
     while True:
       result: List[Talent] = []
       while len(result) < self.config.talent.choices:
-        rarities: List[Rarity] = []
-        weights: List[float] = []
-        for rarity in Rarity:
-          if by_rarity[rarity]:
-            rarities.append(rarity)
-            weights.append(weight.get(rarity))
-        if not rarities:
+        talent = sampler.draw(self._random)
+        if talent is None:
           break
-        rarity = self._random.choices(rarities, weights)[0]
-        talent = self._random.choice(by_rarity[rarity])
         result.append(talent)
-        by_rarity[rarity].remove(talent)
-      yield list(result)
-      for i in result:
-        by_rarity[i.rarity].append(i)
+      yield result
+      sampler.undo()
 
   def _get_boost(self, boosts: List[Tuple[int, TalentBoostItem]], value: int) -> TalentBoostItem:
     for min, boost in reversed(boosts):
@@ -222,35 +357,33 @@ class Game:
       if replacement:
         self.statistics.talents.add(replacement.id)
         self._talents[i] = replacement
-    self._condition_vars["TLT"] = {talent.id for talent in self._talents}
+    self._slots[Slot.TLT] = {talent.id for talent in self._talents}
+    self._talent_schedule = [
+      (talent, self.dataset.trigger_index.talent_ages.get(talent.id)) for talent in self._talents
+    ]
     return self._talents
 
   def _get_replacement(self, current: Talent) -> Optional[Talent]:
+    incompatibility = self.dataset.talent_incompatibility
+    blocked = incompatibility.blocked(self._talents)
     if current.replacement == "rarity":
-      by_rarity: Dict[int, List[Talent]] = {i: [] for i in current.weights}
-      for talent in TALENT.values():
-        if not talent.exclusive and talent.rarity in current.weights and not any(
-          talent is other or talent.is_imcompatible_with(other) for other in self._talents
-        ):
-          by_rarity[talent.rarity].append(talent)
-      rarities: List[int] = []
+      pools: List[List[Talent]] = []
       weights: List[float] = []
       for id, weight in current.weights.items():
-        if by_rarity[id]:
-          rarities.append(id)
+        pool = incompatibility.unpack(incompatibility.by_rarity[Rarity(id)] & ~blocked)
+        if pool:
+          pools.append(pool)
           weights.append(weight)
-      if rarities:
-        rarity = self._random.choices(rarities, weights)[0]
-        talent = self._random.choice(by_rarity[rarity])
+      if pools:
+        pool = self._random.choices(pools, weights)[0]
+        talent = self._random.choice(pool)
         return talent
     elif current.replacement == "talent":
       choices: List[Talent] = []
       weights: List[float] = []
       for id, weight in current.weights.items():
-        talent = TALENT[id]
-        if not any(
-          talent is other or talent.is_imcompatible_with(other) for other in self._talents
-        ):
+        talent = self.dataset.talents[id]
+        if not incompatibility.is_blocked(talent, blocked):
           choices.append(talent)
           weights.append(weight)
       if choices:
@@ -262,90 +395,113 @@ class Game:
     return self.config.stat.total + sum(i.points for i in self._talents)
 
   def set_stats(self, charm: float, intelligence: float, strength: float, money: float):
-    self._charm = self._max_charm = self._min_charm = charm
-    self._intelligence = self._max_intelligence = self._min_intelligence = intelligence
-    self._strength = self._max_strength = self._min_strength = strength
-    self._money = self._max_money = self._min_money = money
-    self._spirit = self._max_spirit = self._min_spirit = self.config.stat.spirit
-    self._update_vars()
+    self._state.reset(Slot.CHR, charm)
+    self._state.reset(Slot.INT, intelligence)
+    self._state.reset(Slot.STR, strength)
+    self._state.reset(Slot.MNY, money)
+    self._state.reset(Slot.SPR, self.config.stat.spirit)
 
   def progress(self) -> Generator[Progress, None, None]:
-    self._events: Set[int] = set()
-    self._condition_vars["EVT"] = self._events
-    yield Progress(
+    yield self.start()
+    while self._alive:
+      yield self.next_year()
+
+  # 与 progress() 相同，但不经过生成器，可以由外部逐年推进（例如 fork 之后）
+  def start(self) -> Progress:
+    slots = self._slots
+    self._events = slots[Slot.EVT] = set()
+    return Progress(
       -1,
       self._execute_talents(),
       [],
       self._check_achievements(Opportunity.START),
-      self._charm,
-      self._intelligence,
-      self._strength,
-      self._money,
-      self._spirit)
-    while self._alive:
-      self._age += 1
-      self._update_vars()
-      yield Progress(
-        self._age,
-        self._execute_talents(),
-        self._execute_events(),
-        self._check_achievements(Opportunity.TRAJECTORY),
-        self._charm,
-        self._intelligence,
-        self._strength,
-        self._money,
-        self._spirit)
+      slots[Slot.CHR],
+      slots[Slot.INT],
+      slots[Slot.STR],
+      slots[Slot.MNY],
+      slots[Slot.SPR])
+
+  def next_year(self) -> Progress:
+    slots = self._slots
+    self._state.add(Slot.AGE, 1)
+    return Progress(
+      slots[Slot.AGE],
+      self._execute_talents(),
+      self._execute_events(),
+      self._check_achievements(Opportunity.TRAJECTORY),
+      slots[Slot.CHR],
+      slots[Slot.INT],
+      slots[Slot.STR],
+      slots[Slot.MNY],
+      slots[Slot.SPR])
 
   def _execute_talents(self) -> List[Talent]:
     talents: List[Talent] = []
-    for talent in self._talents:
+    age = self._slots[Slot.AGE]
+    for talent, ages in self._talent_schedule:
       if (
-        self._talent_executed[talent.id] < talent.max_execute
-        and talent.condition(**self._condition_vars)
+        (ages is None or age in ages)
+        and self._talent_executed[talent.id] < talent.max_execute
+        and talent.condition.evaluate(self._slots)
       ):
         self._add_stats(
           talent.charm, talent.intelligence, talent.strength, talent.money, talent.spirit,
           talent.random)
         self._talent_executed[talent.id] += 1
         talents.append(talent)
+    if talents:
+      # 已经达到发动次数上限的天赋不再参与之后的检查
+      self._talent_schedule = [
+        item for item in self._talent_schedule
+        if self._talent_executed[item[0].id] < item[0].max_execute
+      ]
     return talents
 
-  def _execute_events(self) -> List[Tuple[Event, bool]]:
-    events: List[Tuple[Event, bool]] = []
+  def event_candidates(self) -> Tuple[List[Event], List[float]]:
+    # 这一年可以抽到的事件及其权重
     choices: List[Event] = []
     weights: List[float] = []
-    for id, weight in AGE[self._age].items():
-      event = EVENT[id]
+    slots = self._slots
+    dataset = self.dataset
+    for id, weight in dataset.age[slots[Slot.AGE]].items():
+      event = dataset.events[id]
       if (
-        not event.no_random and not event.exclude(**self._condition_vars)
-        and event.include(**self._condition_vars)
+        not event.no_random and not event.exclude.evaluate(slots)
+        and event.include.evaluate(slots)
       ):
         choices.append(event)
         weights.append(weight)
-    event = self._random.choices(choices, weights)[0]
+    return choices, weights
+
+  def _execute_events(self) -> List[Tuple[Event, bool]]:
+    events: List[Tuple[Event, bool]] = []
+    slots = self._slots
+    dataset = self.dataset
+    event = self._choose_event(*self.event_candidates())
     while event is not None:
       self._alive = [False, self._alive, True][event.life + 1]
-      self._age += event.age
+      if event.age:
+        self._state.add(Slot.AGE, event.age)
       self._add_stats(
         event.charm, event.intelligence, event.strength, event.money, event.spirit, 0)
       self.statistics.events.add(event.id)
       self._events.add(event.id)
-      next_event = None
-      for id, cond in event.branch:
-        if cond(**self._condition_vars):
-          next_event = EVENT[id]
-          break
+      next_event = dataset.branch_index.next(event, slots)
       events.append((event, next_event is not None))
       event = next_event
     return events
 
+  def _choose_event(self, choices: List[Event], weights: List[float]) -> Event:
+    # 子类可以覆盖这里改变事件的抽取方式，例如 liferestart.estimate 的重要性抽样
+    return self._random.choices(choices, weights)[0]
+
   def _check_achievements(self, opportunity: Opportunity) -> List[Achievement]:
     achievements: List[Achievement] = []
-    for achievement in ACHIEVEMENT.values():
+    trigger_index = self.dataset.trigger_index
+    for achievement in trigger_index.achievements_at(opportunity, self._slots[Slot.AGE]):
       if (
         achievement.id not in self.statistics.achievements
-        and achievement.opportunity == opportunity
-        and achievement.condition(**self._condition_vars)
+        and achievement.condition.evaluate(self._slots)
       ):
         achievements.append(achievement)
         self.statistics.achievements.add(achievement.id)
@@ -357,72 +513,47 @@ class Game:
     random_values = [0] * 5
     if random:
       random_values[self._random.randint(0, 4)] = random
-    self._charm += charm + random_values[0]
-    self._intelligence += intelligence + random_values[1]
-    self._strength += strength + random_values[2]
-    self._money += money + random_values[3]
-    self._spirit += spirit + random_values[4]
-    self._update_vars()
-
-  def _update_vars(self):
-    self._max_age = max(self._age, self._max_age)
-    self._max_charm = max(self._charm, self._max_charm)
-    self._max_intelligence = max(self._intelligence, self._max_intelligence)
-    self._max_strength = max(self._strength, self._max_strength)
-    self._max_money = max(self._money, self._max_money)
-    self._max_spirit = max(self._spirit, self._max_spirit)
-    self._min_charm = min(self._charm, self._min_charm)
-    self._min_intelligence = min(self._intelligence, self._min_intelligence)
-    self._min_strength = min(self._strength, self._min_strength)
-    self._min_money = min(self._money, self._min_money)
-    self._min_spirit = min(self._spirit, self._min_spirit)
-    self._condition_vars.update({
-      "AGE": self._age,
-      "CHR": self._charm,
-      "INT": self._intelligence,
-      "STR": self._strength,
-      "MNY": self._money,
-      "SPR": self._spirit,
-      "HAGE": self._max_age,
-      "HCHR": self._max_charm,
-      "HINT": self._max_intelligence,
-      "HSTR": self._max_strength,
-      "HMNY": self._max_money,
-      "HSPR": self._max_spirit,
-      "LCHR": self._min_charm,
-      "LINT": self._min_intelligence,
-      "LSTR": self._min_strength,
-      "LMNY": self._min_money,
-      "LSPR": self._min_spirit,
-    })
+    # 只更新变化了的属性及其最大、最小值
+    state = self._state
+    if value := charm + random_values[0]:
+      state.add(Slot.CHR, value)
+    if value := intelligence + random_values[1]:
+      state.add(Slot.INT, value)
+    if value := strength + random_values[2]:
+      state.add(Slot.STR, value)
+    if value := money + random_values[3]:
+      state.add(Slot.MNY, value)
+    if value := spirit + random_values[4]:
+      state.add(Slot.SPR, value)
 
   def end(self) -> End:
+    slots = self._slots
     overall = int(sum([
-      self._max_charm,
-      self._max_intelligence,
-      self._max_strength,
-      self._max_money,
-      self._max_spirit
-    ])) * 2 + self._max_age // 2
+      slots[Slot.HCHR],
+      slots[Slot.HINT],
+      slots[Slot.HSTR],
+      slots[Slot.HMNY],
+      slots[Slot.HSPR]
+    ])) * 2 + slots[Slot.HAGE] // 2
     self.statistics.finished_games += 1
-    self._condition_vars["SUM"] = overall
-    self._condition_vars["TMS"] = self.statistics.finished_games
+    slots[Slot.SUM] = overall
+    slots[Slot.TMS] = self.statistics.finished_games
     return End(
       self._raw_talents,
       self._check_achievements(Opportunity.SUMMARY) + self._check_achievements(Opportunity.END),
-      self._max_age,
-      self._max_charm,
-      self._max_intelligence,
-      self._max_strength,
-      self._max_money,
-      self._max_spirit,
+      slots[Slot.HAGE],
+      slots[Slot.HCHR],
+      slots[Slot.HINT],
+      slots[Slot.HSTR],
+      slots[Slot.HMNY],
+      slots[Slot.HSPR],
       overall,
-      self.judge(self._max_age, self.config.stat.rarity.age),
-      self.judge(self._max_charm, self.config.stat.rarity.charm),
-      self.judge(self._max_intelligence, self.config.stat.rarity.intelligence),
-      self.judge(self._max_strength, self.config.stat.rarity.strength),
-      self.judge(self._max_money, self.config.stat.rarity.money),
-      self.judge(self._max_spirit, self.config.stat.rarity.spirit),
+      self.judge(slots[Slot.HAGE], self.config.stat.rarity.age),
+      self.judge(slots[Slot.HCHR], self.config.stat.rarity.charm),
+      self.judge(slots[Slot.HINT], self.config.stat.rarity.intelligence),
+      self.judge(slots[Slot.HSTR], self.config.stat.rarity.strength),
+      self.judge(slots[Slot.HMNY], self.config.stat.rarity.money),
+      self.judge(slots[Slot.HSPR], self.config.stat.rarity.spirit),
       self.judge(overall, self.config.stat.rarity.overall))
 
   @staticmethod
@@ -435,14 +566,15 @@ class Game:
   def create_character(
     self, seed: Optional[int] = None, name: str = "独一无二的我"
   ) -> GeneratedCharacter:
-    random = Random()
+    # 与本局使用相同的随机数后端
+    random = type(self._random)()
     if seed is None:
       seed = random.getrandbits(32)
     random.seed(seed)
     choices, weights = zip(*self.config.character.talent_count_weight.items())
     talent_count = random.choices(choices, weights)[0]
     talents = random.sample(
-      [id for id, talent in TALENT.items() if not talent.exclusive], talent_count)
+      [id for id, talent in self.dataset.talents.items() if not talent.exclusive], talent_count)
     choices, weights = zip(*self.config.character.stat_value_weight.items())
     charm, intelligence, strength, money = random.choices(choices, weights, k=4)
     self.statistics.character = GeneratedCharacter(
@@ -450,7 +582,7 @@ class Game:
     return self.statistics.character
 
   def set_character(self, character: Character) -> Tuple[List[Talent], List[Talent]]:
-    talents = [TALENT[id] for id in character.talents]
+    talents = [self.dataset.talents[id] for id in character.talents]
     real_talents = self.set_talents(talents)
     self.set_stats(character.charm, character.intelligence, character.strength, character.money)
     return talents, real_talents
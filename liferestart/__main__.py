@@ -1,93 +1,22 @@
-import itertools
+import argparse
+import asyncio
 import json
 import os
 import random
 import sys
-from typing import List, cast
+from typing import List, Optional, Sequence, cast
 
 from . import Game, GeneratedCharacter, Statistics
-from .data import ACHIEVEMENT, CHARACTER, EVENT, TALENT
+from .data import ACHIEVEMENT, CHARACTER, EVENT, TALENT, TALENT_INCOMPATIBILITY
+from .render import ANSI, format_float, render_end, render_progress, str_pad
+from .render import str_width as str_width
+from .simulate import SimulateOptions, bench, check_options, simulate
 from .struct.character import Character
 from .struct.commons import Rarity
 from .struct.talent import Talent
 
-CHR_WIDTHS = [
-  (126, 1),
-  (159, 0),
-  (687, 1),
-  (710, 0),
-  (711, 1),
-  (727, 0),
-  (733, 1),
-  (879, 0),
-  (1154, 1),
-  (1161, 0),
-  (4347, 1),
-  (4447, 2),
-  (7467, 1),
-  (7521, 0),
-  (8369, 1),
-  (8426, 0),
-  (9000, 1),
-  (9002, 2),
-  (11021, 1),
-  (12350, 2),
-  (12351, 1),
-  (12438, 2),
-  (12442, 0),
-  (19893, 2),
-  (19967, 1),
-  (55203, 2),
-  (63743, 1),
-  (64106, 2),
-  (65039, 1),
-  (65059, 0),
-  (65131, 2),
-  (65279, 1),
-  (65376, 2),
-  (65500, 1),
-  (65510, 2),
-  (120831, 1),
-  (262141, 2),
-  (1114109, 1),
-]
-
-
-def str_width(s: str) -> int:
-  if len(s) > 1:
-    return sum(str_width(c) for c in s)
-  o = ord(s)
-  if o == 0xe or o == 0xf:
-    return 0
-  for num, wid in CHR_WIDTHS:
-    if o <= num:
-      return wid
-  return 1
-
-
-def str_pad(s: str, width: int, chr: str = " ") -> str:
-  return s + chr * max(width - str_width(s), 0)
-
-
-def format_float(value: float) -> str:
-  # 处理唯一一个属性有浮点数的角色祖冲之
-  return f"{value:.7f}".rstrip(".0") or "0"
-
-
-FORMAT_RESET = "\033[0m"
-FORMAT_LIGHT_BLUE = "\033[94m"
-FORMAT_LIGHT_PURPLE = "\033[95m"
-FORMAT_LIGHT_YELLOW = "\033[93m"
-RARITY_FORMATS = {
-  Rarity.COMMON: FORMAT_RESET,
-  Rarity.UNCOMMON: FORMAT_LIGHT_BLUE,
-  Rarity.RARE: FORMAT_LIGHT_PURPLE,
-  Rarity.LEGENDARY: FORMAT_LIGHT_YELLOW,
-}
-
-
 def format_rarity(rarity: Rarity, s: str) -> str:
-  return RARITY_FORMATS[rarity] + s + FORMAT_RESET
+  return ANSI.format(rarity, s)
 
 
 def print_statistics(game: Game) -> None:
@@ -121,30 +50,11 @@ def print_talents(talents: List[Talent], real_talents: List[Talent]) -> None:
 
 def run(game: Game) -> None:
   for progress in game.progress():
-    print("---- 出生 ----" if progress.age == -1 else f"---- {progress.age}岁 ----")
-    print(f"颜值 {format_float(progress.charm)} 智力 {format_float(progress.intelligence)} 体质 {format_float(progress.strength)} 家境 {format_float(progress.money)} 快乐 {progress.spirit}")
-    for talent in progress.talents:
-      print(format_rarity(talent.rarity, f"天赋 {talent.name} 发动: {talent.description}"))
-    for event, has_next in progress.events:
-      segments = [f"{event.event}"]
-      if not has_next and event.post:
-        segments.append(f"{event.post}")
-      print(format_rarity(event.rarity, "\n".join(segments)))
-    for achievement in progress.achievements:
-      print(format_rarity(achievement.rarity, f"获得成就 {achievement.name}: {achievement.description}"))
+    print("\n".join(render_progress(progress, ANSI)))
     input()
 
   end = game.end()
-  print("---- 总结 ----")
-  for achievement in end.achievements:
-    print(format_rarity(achievement.rarity, f"获得成就 {achievement.name}: {achievement.description}"))
-  print(f"颜值: {format_float(end.charm)} - {format_rarity(end.summary_charm.rarity, game.config.stat.rarity.messages[end.summary_charm.message_id])}")
-  print(f"智力: {format_float(end.intelligence)} - {format_rarity(end.summary_intelligence.rarity, game.config.stat.rarity.messages[end.summary_intelligence.message_id])}")
-  print(f"体质: {format_float(end.strength)} - {format_rarity(end.summary_strength.rarity, game.config.stat.rarity.messages[end.summary_strength.message_id])}")
-  print(f"家境: {format_float(end.money)} - {format_rarity(end.summary_money.rarity, game.config.stat.rarity.messages[end.summary_money.message_id])}")
-  print(f"快乐: {end.spirit} - {format_rarity(end.summary_spirit.rarity, game.config.stat.rarity.messages[end.summary_spirit.message_id])}")
-  print(f"享年: {end.age} - {format_rarity(end.summary_age.rarity, game.config.stat.rarity.messages[end.summary_age.message_id])}")
-  print(f"总评: {end.overall} - {format_rarity(end.summary_overall.rarity, game.config.stat.rarity.messages[end.summary_overall.message_id])}")
+  print("\n".join(render_end(end, game.config, ANSI)))
 
 
 def print_character(i: int, ch: Character) -> None:
@@ -238,11 +148,11 @@ def run_classic(game: Game) -> None:
         continue
       errors: List[str] = []
       talents = [choices[i - min_choice] for i in selected]
-      for i, j in itertools.combinations(talents, 2):
-        if i.is_imcompatible_with(j):
-          errors.append(f"不能同时选择 {format_rarity(i.rarity, i.name)} 和 {format_rarity(j.rarity, j.name)}")
-        elif i is j:
+      for i, j in TALENT_INCOMPATIBILITY.conflicts(talents):
+        if i is j:
           errors.append("每个天赋只能选择一次")
+        else:
+          errors.append(f"不能同时选择 {format_rarity(i.rarity, i.name)} 和 {format_rarity(j.rarity, j.name)}")
       if len(talents) > 0 and len(talents) != game.config.talent.limit:
         errors.append(f"只能选择恰好 {game.config.talent.limit} 个天赋")
       if not len(errors):
@@ -293,7 +203,78 @@ def set_seed(game: Game) -> None:
   print(f"本局种子: {game_seed}")
 
 
-def main():
+def parse_ids(raw: str) -> List[int]:
+  return [int(i) for i in raw.replace(",", " ").split()]
+
+
+def parse_seeds(raw: str) -> range:
+  # “100” 表示 0 到 99，“100:200” 表示 100 到 199
+  if ":" in raw:
+    start, stop = raw.split(":")
+    return range(int(start), int(stop))
+  return range(int(raw))
+
+
+def parse_args(args: Sequence[str]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(prog="python -m liferestart", description="人生重开模拟器")
+  subparsers = parser.add_subparsers(dest="command", required=True)
+  for name, help in (("simulate", "模拟多局并以 JSONL 输出每局的结果"), ("bench", "测量每秒模拟的局数")):
+    subparser = subparsers.add_parser(name, help=help)
+    subparser.add_argument("--talents", type=parse_ids, help="天赋 id，逗号分隔，默认从第一次抽到的天赋中选择")
+    subparser.add_argument("--stats", type=parse_ids, help="颜值、智力、体质、家境，逗号分隔，默认随机分配")
+    subparser.add_argument("--character", type=int, choices=sorted(CHARACTER), help="名人模式的名人 id")
+    subparser.add_argument("--workers", type=int, default=1, help="进程数（或线程数）")
+    subparser.add_argument("--threads", action="store_true", help="使用线程池而不是进程池")
+  simulate_parser = subparsers.choices["simulate"]
+  simulate_parser.add_argument("--seeds", type=parse_seeds, default=range(100), help="种子数量或范围，例如 1000 或 1000:2000")
+  simulate_parser.add_argument("--events", action="store_true", help="输出每年的事件 id")
+  simulate_parser.add_argument("--chunk", type=int, default=64, help="每多少局 flush 一次")
+  bench_parser = subparsers.choices["bench"]
+  bench_parser.add_argument("--lives", type=int, default=200)
+  bench_parser.add_argument("--seed", type=int, default=0)
+  serve_parser = subparsers.add_parser("serve", help="启动 HTTP/JSON 模拟服务")
+  serve_parser.add_argument("--host", default="127.0.0.1")
+  serve_parser.add_argument("--port", type=int, default=8000)
+  serve_parser.add_argument("--workers", type=int, default=1, help="进程数")
+  serve_parser.add_argument("--max-pending", type=int, default=64, help="同时等待的请求数上限，超出时返回 429")
+  options = parser.parse_args(args)
+  if options.command in ("simulate", "bench"):
+    # 未知或互斥的天赋、名人模式同时指定天赋或属性、属性超出范围或与属性点不符等，
+    # 与 HTTP 服务的检查相同
+    try:
+      check_options(SimulateOptions(options.talents, options.stats, options.character))
+    except ValueError as e:
+      parser.error(str(e))
+  return options
+
+
+def main_headless(args: Sequence[str]) -> None:
+  options = parse_args(args)
+  if options.command == "serve":
+    from .server import serve
+    asyncio.run(serve(options.host, options.port, options.workers, options.max_pending))
+    return
+  simulate_options = SimulateOptions(
+    options.talents, options.stats, options.character, getattr(options, "events", False))
+  if options.command == "bench":
+    print(json.dumps(bench(
+      options.lives, simulate_options, options.workers, options.seed, options.threads)))
+    return
+  for chunk in simulate(
+    options.seeds, simulate_options, options.workers, options.chunk, options.threads
+  ):
+    sys.stdout.write("".join(
+      json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in chunk))
+    sys.stdout.flush()
+
+
+def main(args: Optional[Sequence[str]] = None):
+  if args is None:
+    args = sys.argv[1:]
+  if args:
+    main_headless(args)
+    return
+
   if os.path.exists("statistics.json"):
     with open("statistics.json") as f:
       statistics = Statistics.deserialize(json.load(f))
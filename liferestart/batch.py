@@ -0,0 +1,425 @@
+import threading
+from dataclasses import dataclass
+from operator import and_  # type: ignore
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Union
+from weakref import WeakKeyDictionary
+
+try:
+  import numpy as np
+except ImportError as e:  # pragma: no cover
+  raise ImportError("liferestart.batch 需要 numpy，请安装 liferestart[batch]") from e
+
+from . import Statistics
+from .condition import BoolCondition, Condition, NoopCondition, VarCondition, contains, equals
+from .condition import not_contains, not_equals
+from .config import Config
+from .dataset import DEFAULT_DATASET, Dataset
+from .state import HIGH, LOW, VARIABLES, Slot
+from .struct.achievement import Achievement, Opportunity
+from .struct.talent import Talent
+
+# 以列存储 N 局游戏的状态，所有局同步推进一年。
+# 与 Game 的概率分布相同，但不复现 random.Random 的种子。
+
+Mask = Callable[["BatchState", Any], Any]
+STAT_SLOTS = (Slot.CHR, Slot.INT, Slot.STR, Slot.MNY, Slot.SPR)
+
+
+class BatchTables:
+  # 一份数据（Dataset）中事件、天赋、成就的列号和事件效果，以及按这些列号编译好的条件。
+  # 不引用 Dataset 本身，否则 _tables 中的项永远不会被回收
+  event_ids: List[int]
+  event_columns: Dict[int, int]
+  talent_ids: List[int]
+  talent_columns: Dict[int, int]
+  achievement_ids: List[int]
+  achievement_columns: Dict[int, int]
+  event_effects: Any  # 列依次为 LIF AGE CHR INT STR MNY SPR
+  compiled: "WeakKeyDictionary[Condition, Mask]"
+
+  def __init__(self, dataset: Dataset) -> None:
+    self.event_ids = list(dataset.events)
+    self.event_columns = {id: i for i, id in enumerate(self.event_ids)}
+    self.talent_ids = list(dataset.talents)
+    self.talent_columns = {id: i for i, id in enumerate(self.talent_ids)}
+    self.achievement_ids = list(dataset.achievements)
+    self.achievement_columns = {id: i for i, id in enumerate(self.achievement_ids)}
+    self.event_effects = np.array([
+      [event.life, event.age, event.charm, event.intelligence, event.strength, event.money,
+       event.spirit]
+      for event in dataset.events.values()
+    ], dtype=np.float64)
+    # 以条件对象本身为键（弱引用），条件被回收后缓存项随之删除，新对象不会误用旧的结果
+    self.compiled = WeakKeyDictionary()
+
+
+# WeakKeyDictionary 在回收时会从其他线程删除项，写入时加锁
+_tables: "WeakKeyDictionary[Dataset, BatchTables]" = WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_tables(dataset: Dataset = DEFAULT_DATASET) -> BatchTables:
+  tables = _tables.get(dataset)
+  if tables is None:
+    tables = BatchTables(dataset)
+    with _lock:
+      tables = _tables.setdefault(dataset, tables)
+  return tables
+
+
+class BatchState:
+  slots: Any  # (变量, N)
+  evt: Any  # (N, 事件) 本局经历的事件
+  tlt: Any  # (N, 天赋) 当前天赋
+  atlt: Any  # (N, 天赋) 统计中的天赋，包括本局选择的天赋和被替换前的天赋
+  aevt: Set[int]  # 开始前统计中的事件，本局的事件从 evt 读取
+
+  def __init__(self, n: int, statistics: Statistics, tables: BatchTables) -> None:
+    columns = tables.talent_columns
+    self.slots = np.zeros((len(VARIABLES), n), dtype=np.float64)
+    self.slots[Slot.AGE] = self.slots[Slot.HAGE] = -1
+    self.slots[Slot.TMS] = statistics.finished_games
+    self.evt = np.zeros((n, len(tables.event_ids)), dtype=np.bool_)
+    self.tlt = np.zeros((n, len(tables.talent_ids)), dtype=np.bool_)
+    self.atlt = np.zeros((n, len(tables.talent_ids)), dtype=np.bool_)
+    self.atlt[:, [columns[id] for id in statistics.talents if id in columns]] = True
+    self.aevt = set(statistics.events)
+
+  def add(self, slot: int, rows: Any, value: Any) -> None:
+    slots = self.slots
+    current = slots[slot, rows] + value
+    slots[slot, rows] = current
+    slots[slot + HIGH, rows] = np.maximum(slots[slot + HIGH, rows], current)
+    if slot != Slot.AGE:
+      slots[slot + LOW, rows] = np.minimum(slots[slot + LOW, rows], current)
+
+
+def _set_mask(
+  matrix: Callable[[BatchState], Any], columns: Dict[int, int], ids: Set[int],
+  static: Optional[Callable[[BatchState], Set[int]]] = None
+) -> Mask:
+  cols = [columns[id] for id in ids if id in columns]
+
+  def mask(state: BatchState, rows: Any) -> Any:
+    if static is not None and not static(state).isdisjoint(ids):
+      return np.ones(len(rows), dtype=np.bool_)
+    if not cols:
+      return np.zeros(len(rows), dtype=np.bool_)
+    return matrix(state)[np.ix_(rows, cols)].any(axis=1)
+  return mask
+
+
+def compile_condition(condition: Condition, tables: Optional[BatchTables] = None) -> Mask:
+  # 把条件树编译为对一批游戏求值的函数，返回布尔数组。EVT、TLT 等按 tables 的列号读取
+  tables = get_tables() if tables is None else tables
+  if isinstance(condition, NoopCondition):
+    value = condition.value
+    return lambda state, rows: np.full(len(rows), value, dtype=np.bool_)
+  if isinstance(condition, BoolCondition):
+    left = compile_condition(condition.left, tables)
+    right = compile_condition(condition.right, tables)
+    if condition.operator is and_:
+      return lambda state, rows: left(state, rows) & right(state, rows)
+    return lambda state, rows: left(state, rows) | right(state, rows)
+  if not isinstance(condition, VarCondition) or condition.slot is None:
+    raise ValueError(f"不支持的条件: {condition!r}")
+  slot = condition.slot
+  op = condition.operator
+  right_value: Any = condition.right
+  if slot in (Slot.TLT, Slot.EVT, Slot.ATLT, Slot.AEVT):
+    ids = set(condition.ids())
+    if slot == Slot.TLT:
+      found = _set_mask(lambda state: state.tlt, tables.talent_columns, ids)
+    elif slot == Slot.ATLT:
+      found = _set_mask(lambda state: state.atlt, tables.talent_columns, ids)
+    elif slot == Slot.EVT:
+      found = _set_mask(lambda state: state.evt, tables.event_columns, ids)
+    else:
+      found = _set_mask(
+        lambda state: state.evt, tables.event_columns, ids, lambda state: state.aevt)
+    if op is contains or op is equals:
+      return found
+    if op is not_contains or op is not_equals:
+      return lambda state, rows: ~found(state, rows)
+    raise ValueError(f"不支持的条件: {condition!r}")
+  if op is contains or op is not_contains:
+    items = list(right_value)
+    invert = op is not_contains
+    return lambda state, rows: np.isin(state.slots[slot, rows], items, invert=invert)
+  if op is equals:
+    return lambda state, rows: state.slots[slot, rows] == right_value
+  if op is not_equals:
+    return lambda state, rows: state.slots[slot, rows] != right_value
+  return lambda state, rows: op(state.slots[slot, rows], right_value)
+
+
+def _compile(condition: Condition, tables: BatchTables) -> Mask:
+  # 按对象缓存，数据表中的条件只编译一次。两个线程同时编译同一个条件时保留先写入的
+  mask = tables.compiled.get(condition)
+  if mask is None:
+    mask = compile_condition(condition, tables)
+    with _lock:
+      mask = tables.compiled.setdefault(condition, mask)
+  return mask
+
+
+def precompile(dataset: Dataset = DEFAULT_DATASET) -> None:
+  # 预先编译数据集中的全部条件，见 liferestart.preload
+  tables = get_tables(dataset)
+  for talent in dataset.talents.values():
+    _compile(talent.condition, tables)
+  for event in dataset.events.values():
+    _compile(event.include, tables)
+    _compile(event.exclude, tables)
+  for groups in dataset.branch_index.tables.values():
+    for prefix, entries in groups:
+      _compile(prefix, tables)
+      for rest, _ in entries:
+        _compile(rest, tables)
+  for achievement in dataset.achievements.values():
+    _compile(achievement.condition, tables)
+
+
+@dataclass
+class BatchResult:
+  age: Any
+  charm: Any
+  intelligence: Any
+  strength: Any
+  money: Any
+  spirit: Any
+  overall: Any
+  events: Any  # (N, 事件)
+  achievements: Any  # (N, 成就) 本局新获得的成就
+  tables: BatchTables  # events、achievements 的列号
+
+  def achievement_rates(self) -> Dict[int, float]:
+    rates = self.achievements.mean(axis=0)
+    return {id: float(rate) for id, rate in zip(self.tables.achievement_ids, rates)}
+
+  def event_rates(self) -> Dict[int, float]:
+    rates = self.events.mean(axis=0)
+    return {id: float(rate) for id, rate in zip(self.tables.event_ids, rates)}
+
+
+class BatchGame:
+  config: Config
+  statistics: Statistics
+  dataset: Dataset
+  n: int
+
+  _rng: Any
+  _tables: BatchTables
+  _state: BatchState
+  _talents: List[List[Talent]]
+  _executed: Any
+  _granted: Any
+  _new_achievements: Any
+  _alive: Any
+
+  def __init__(
+    self, n: int, config: Optional[Config] = None, statistics: Optional[Statistics] = None,
+    seed: Optional[int] = None, dataset: Optional[Dataset] = None
+  ) -> None:
+    # statistics 只作为所有局共同的初始统计，不会被修改。dataset 与 Game 的相同，默认为内置数据
+    self.config = config or Config()
+    self.statistics = statistics or Statistics()
+    self.dataset = DEFAULT_DATASET if dataset is None else dataset
+    self.n = n
+    self._rng = np.random.default_rng(seed)
+    self._tables = tables = get_tables(self.dataset)
+    self._state = BatchState(n, self.statistics, tables)
+    self._talents = [[] for _ in range(n)]
+    self._executed = np.zeros((n, len(tables.talent_ids)), dtype=np.int64)
+    self._granted = np.zeros((n, len(tables.achievement_ids)), dtype=np.bool_)
+    columns = tables.achievement_columns
+    self._granted[:, [
+      columns[id] for id in self.statistics.achievements if id in columns]] = True
+    self._new_achievements = np.zeros_like(self._granted)
+    self._alive = np.ones(n, dtype=np.bool_)
+
+  def set_talents(
+    self, talents: Sequence[Sequence[Talent]], raw_talents: Optional[Sequence[Sequence[Talent]]] = None
+  ) -> None:
+    # talents 是每局替换后的天赋，可以用 Game.set_talents 得到；raw_talents 只影响 ATLT
+    state = self._state
+    columns = self._tables.talent_columns
+    for i, items in enumerate(talents):
+      self._talents[i] = list(items)
+      for talent in items:
+        state.tlt[i, columns[talent.id]] = True
+        state.atlt[i, columns[talent.id]] = True
+    for i, items in enumerate(raw_talents or []):
+      for talent in items:
+        state.atlt[i, columns[talent.id]] = True
+
+  def set_stats(
+    self, charm: Union[float, Any], intelligence: Union[float, Any], strength: Union[float, Any],
+    money: Union[float, Any]
+  ) -> None:
+    slots = self._state.slots
+    stats = (charm, intelligence, strength, money, self.config.stat.spirit)
+    for slot, value in zip(STAT_SLOTS, stats):
+      slots[slot] = slots[slot + HIGH] = slots[slot + LOW] = value
+
+  def run(self) -> BatchResult:
+    state = self._state
+    slots = state.slots
+    everyone = np.arange(self.n)
+    self._execute_talents(everyone)
+    self._check_achievements(everyone, Opportunity.START)
+    while True:
+      rows = np.flatnonzero(self._alive)
+      if not len(rows):
+        break
+      state.add(Slot.AGE, rows, 1)
+      self._execute_talents(rows)
+      self._execute_events(rows)
+      self._check_achievements(rows, Opportunity.TRAJECTORY)
+    overall = (
+      np.trunc(slots[[Slot.HCHR, Slot.HINT, Slot.HSTR, Slot.HMNY, Slot.HSPR]].sum(axis=0)) * 2
+      + np.floor_divide(slots[Slot.HAGE], 2))
+    slots[Slot.SUM] = overall
+    slots[Slot.TMS] = self.statistics.finished_games + 1
+    self._check_achievements(everyone, Opportunity.SUMMARY)
+    self._check_achievements(everyone, Opportunity.END)
+    return BatchResult(
+      slots[Slot.HAGE].astype(np.int64),
+      slots[Slot.HCHR].copy(),
+      slots[Slot.HINT].copy(),
+      slots[Slot.HSTR].copy(),
+      slots[Slot.HMNY].copy(),
+      slots[Slot.HSPR].copy(),
+      overall.astype(np.int64),
+      state.evt.copy(),
+      self._new_achievements.copy(),
+      self._tables)
+
+  def _execute_talents(self, rows: Any) -> None:
+    # 按天赋在每局中的位置依次执行，保持与 Game 相同的顺序
+    state = self._state
+    tables = self._tables
+    talent_ages = self.dataset.trigger_index.talent_ages
+    indices: List[int] = rows.tolist()
+    width = max((len(self._talents[row]) for row in indices), default=0)
+    for position in range(width):
+      groups: Dict[int, List[int]] = {}
+      for row in indices:
+        talents = self._talents[row]
+        if position < len(talents):
+          groups.setdefault(talents[position].id, []).append(row)
+      for id, members in groups.items():
+        talent = self.dataset.talents[id]
+        column = tables.talent_columns[id]
+        group = np.array(members)
+        group = group[self._executed[group, column] < talent.max_execute]
+        ages = talent_ages.get(id)
+        if ages is not None:
+          group = group[np.isin(state.slots[Slot.AGE, group], list(ages))]
+        if not len(group):
+          continue
+        group = group[_compile(talent.condition, tables)(state, group)]
+        if not len(group):
+          continue
+        effects = np.zeros((5, len(group)))
+        effects[:] = np.array([
+          talent.charm, talent.intelligence, talent.strength, talent.money, talent.spirit
+        ])[:, None]
+        if talent.random:
+          effects[self._rng.integers(0, 5, len(group)), np.arange(len(group))] += talent.random
+        for slot, effect in zip(STAT_SLOTS, effects):
+          state.add(slot, group, effect)
+        self._executed[group, column] += 1
+
+  def _execute_events(self, rows: Any) -> None:
+    state = self._state
+    tables = self._tables
+    dataset = self.dataset
+    ages = state.slots[Slot.AGE, rows].astype(np.int64)
+    current = np.empty(len(rows), dtype=np.int64)
+    for age in np.unique(ages):
+      members = np.flatnonzero(ages == age)
+      group = rows[members]
+      columns: List[int] = []
+      weights: List[Any] = []
+      for id, weight in dataset.age[int(age)].items():
+        event = dataset.events[id]
+        if event.no_random:
+          continue
+        mask = (
+          ~_compile(event.exclude, tables)(state, group)
+          & _compile(event.include, tables)(state, group))
+        columns.append(tables.event_columns[id])
+        weights.append(mask * weight)
+      cum = np.cumsum(np.stack(weights, axis=1), axis=1)
+      total = cum[:, -1]
+      if (total <= 0).any():
+        raise ValueError(f"{age} 岁没有可以发生的事件")
+      # 与 random.choices 相同的逆 CDF：选择第一个累计权重大于 u 的事件
+      u = self._rng.random(len(group)) * total
+      picked = (cum <= u[:, None]).sum(axis=1)
+      current[members] = np.array(columns)[np.minimum(picked, len(columns) - 1)]
+    active = rows
+    while len(active):
+      self._apply_events(active, current)
+      active, current = self._next_events(active, current)
+
+  def _apply_events(self, rows: Any, columns: Any) -> None:
+    state = self._state
+    effects = self._tables.event_effects[columns]
+    life = effects[:, 0]
+    self._alive[rows[life < 0]] = False
+    self._alive[rows[life > 0]] = True
+    moved = effects[:, 1] != 0
+    if moved.any():
+      state.add(Slot.AGE, rows[moved], effects[moved, 1])
+    for i, slot in enumerate(STAT_SLOTS, 2):
+      changed = effects[:, i] != 0
+      if changed.any():
+        state.add(slot, rows[changed], effects[changed, i])
+    state.evt[rows, columns] = True
+
+  def _next_events(self, rows: Any, columns: Any) -> Any:
+    state = self._state
+    tables = self._tables
+    branch_tables = self.dataset.branch_index.tables
+    next_rows: List[Any] = []
+    next_columns: List[Any] = []
+    for column in np.unique(columns):
+      groups = branch_tables.get(tables.event_ids[int(column)])
+      if groups is None:
+        continue
+      pending = rows[columns == column]
+      for prefix, entries in groups:
+        matched = pending[_compile(prefix, tables)(state, pending)]
+        for rest, target in entries:
+          if not len(matched):
+            break
+          hit = _compile(rest, tables)(state, matched)
+          if hit.any():
+            next_rows.append(matched[hit])
+            next_columns.append(np.full(hit.sum(), tables.event_columns[target.id]))
+            pending = np.setdiff1d(pending, matched[hit], assume_unique=True)
+            matched = matched[~hit]
+    if not next_rows:
+      return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(next_rows), np.concatenate(next_columns)
+
+  def _check_achievements(self, rows: Any, opportunity: Opportunity) -> None:
+    state = self._state
+    tables = self._tables
+    trigger_index = self.dataset.trigger_index
+    age_groups: Dict[int, List[Achievement]] = {}
+    ages = state.slots[Slot.AGE, rows].astype(np.int64)
+    for age in np.unique(ages):
+      age_groups[int(age)] = trigger_index.achievements_at(opportunity, int(age))
+    for age, achievements in age_groups.items():
+      group = rows[ages == age]
+      for achievement in achievements:
+        column = tables.achievement_columns[achievement.id]
+        candidates = group[~self._granted[group, column]]
+        if not len(candidates):
+          continue
+        hit = candidates[_compile(achievement.condition, tables)(state, candidates)]
+        self._granted[hit, column] = True
+        self._new_achievements[hit, column] = True
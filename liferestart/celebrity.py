@@ -0,0 +1,165 @@
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .config import Config
+from .dataset import DEFAULT_DATASET, Dataset
+from .replay import config_digest
+from .simulate import SimulateOptions, simulate_chunk
+
+# 名人模式各个名人的期望结果：平均总评、寿命分布和最常获得的成就。
+# 模拟很慢，结果按数据版本、Config、局数和种子缓存，机器人回答“哪个名人最强”时直接查表。
+
+AGE_BUCKET = 10  # 寿命分布每个区间的宽度
+CHUNK = 64
+
+
+@dataclass(frozen=True)
+class CelebrityOutcome:
+  character: int
+  lives: int
+  overall: float  # 总评的均值
+  overall_std: float
+  age: float  # 寿命的均值
+  age_percentiles: Tuple[int, int, int]  # 寿命的 10%、50%、90% 分位数
+  ages: Tuple[float, ...]  # 第 i 项是享年在 [10i, 10i+10) 之间的比例
+  achievements: Tuple[Tuple[int, float], ...]  # 最常获得的成就及每局获得的概率
+
+  @property
+  def overall_error(self) -> float:
+    return self.overall_std / math.sqrt(self.lives)
+
+  def to_dict(self) -> Dict[str, Any]:
+    return asdict(self)
+
+  @classmethod
+  def from_dict(cls, data: Dict[str, Any]) -> "CelebrityOutcome":
+    return cls(
+      data["character"], data["lives"], data["overall"], data["overall_std"], data["age"],
+      tuple(data["age_percentiles"]), tuple(data["ages"]),
+      tuple((id, probability) for id, probability in data["achievements"]))
+
+  @classmethod
+  def from_records(
+    cls, character: int, records: Sequence[Dict[str, Any]], top: int = 5
+  ) -> "CelebrityOutcome":
+    # records 是 simulate_life 的结果
+    n = len(records)
+    overall = [record["overall"] for record in records]
+    ages = sorted(record["age"] for record in records)
+    mean = sum(overall) / n
+    std = math.sqrt(sum((x - mean) ** 2 for x in overall) / (n - 1)) if n > 1 else 0.0
+    histogram = [0] * (max(ages[-1], 0) // AGE_BUCKET + 1)
+    for age in ages:
+      histogram[max(age, 0) // AGE_BUCKET] += 1
+    counts: Dict[int, int] = {}
+    for record in records:
+      for id in record["achievements"]:
+        counts[id] = counts.get(id, 0) + 1
+    achievements = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:top]
+    return cls(
+      character, n, mean, std, sum(ages) / n,
+      (_percentile(ages, 0.1), _percentile(ages, 0.5), _percentile(ages, 0.9)),
+      tuple(count / n for count in histogram),
+      tuple((id, count / n) for id, count in achievements))
+
+
+@dataclass(frozen=True)
+class CelebrityTable:
+  key: str
+  outcomes: Dict[int, CelebrityOutcome]
+
+  def rank(self, characters: Sequence[int]) -> List[CelebrityOutcome]:
+    # 按平均总评从高到低，例如 run_character 给出的三个名人
+    return sorted(
+      (self.outcomes[id] for id in characters),
+      key=lambda outcome: (-outcome.overall, outcome.character))
+
+  def best(self, characters: Sequence[int]) -> CelebrityOutcome:
+    return self.rank(characters)[0]
+
+  def to_dict(self) -> Dict[str, Any]:
+    return {"key": self.key, "outcomes": [outcome.to_dict() for outcome in self.outcomes.values()]}
+
+  @classmethod
+  def from_dict(cls, data: Dict[str, Any]) -> "CelebrityTable":
+    outcomes = [CelebrityOutcome.from_dict(item) for item in data["outcomes"]]
+    return cls(data["key"], {outcome.character: outcome for outcome in outcomes})
+
+
+def _percentile(values: Sequence[int], q: float) -> int:
+  # values 已排序，最近秩法
+  return values[max(math.ceil(q * len(values)) - 1, 0)]
+
+
+def table_key(
+  lives: int, seed: int, config: Config, characters: Sequence[int], top: int,
+  dataset: Optional[Dataset] = None
+) -> str:
+  version = (DEFAULT_DATASET if dataset is None else dataset).version
+  data = json.dumps([version, config_digest(config), lives, seed, list(characters), top])
+  return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+_tables: Dict[str, CelebrityTable] = {}
+
+
+def clear_cache() -> None:
+  # 清空进程内的缓存，directory 中的文件不受影响
+  _tables.clear()
+
+
+def celebrity_table(
+  lives: int = 1000, seed: int = 0, workers: int = 1, config: Optional[Config] = None,
+  characters: Optional[Sequence[int]] = None, top: int = 5, directory: Optional[str] = None,
+  dataset: Optional[Dataset] = None
+) -> CelebrityTable:
+  # 每个名人模拟种子 seed 到 seed+lives-1 的局，结果与进程数无关。
+  # 先查进程内的缓存，再查 directory 中的 celebrity-<key>.json，都没有时才模拟。
+  # dataset 默认为内置数据；多进程时工作进程按版本找回数据，找不到时报错
+  config = Config() if config is None else config
+  dataset = DEFAULT_DATASET if dataset is None else dataset
+  characters = sorted(dataset.characters) if characters is None else list(characters)
+  key = table_key(lives, seed, config, characters, top, dataset)
+  table = _tables.get(key)
+  if table is not None:
+    return table
+  path = None if directory is None else os.path.join(directory, f"celebrity-{key}.json")
+  if path is not None and os.path.exists(path):
+    with open(path, encoding="utf-8") as f:
+      table = _tables[key] = CelebrityTable.from_dict(json.load(f))
+    return table
+  seeds = list(range(seed, seed + lives))
+  jobs = [
+    (character, seeds[i:i + CHUNK]) for character in characters
+    for i in range(0, len(seeds), CHUNK)
+  ]
+  options = {
+    character: SimulateOptions(character=character, config=config, dataset=dataset.version)
+    for character in characters}
+  records: Dict[int, List[Dict[str, Any]]] = {character: [] for character in characters}
+  if workers <= 1:
+    results = [simulate_chunk(chunk, options[character]) for character, chunk in jobs]
+  else:
+    with ProcessPoolExecutor(workers) as executor:
+      results = list(executor.map(
+        simulate_chunk, [chunk for _, chunk in jobs],
+        [options[character] for character, _ in jobs]))
+  for (character, _), result in zip(jobs, results):
+    records[character].extend(result)
+  table = CelebrityTable(key, {
+    character: CelebrityOutcome.from_records(character, records[character], top)
+    for character in characters})
+  if path is not None:
+    os.makedirs(directory or ".", exist_ok=True)
+    # 先写临时文件再改名，与 ReplayCache 相同
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "w", encoding="utf-8") as f:
+      json.dump(table.to_dict(), f, ensure_ascii=False)
+    os.replace(temp, path)
+  _tables[key] = table
+  return table
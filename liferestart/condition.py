@@ -1,6 +1,12 @@
 import operator
 import re
-from typing import Any, Callable, Dict, Iterable, List, Set, TypeVar, Union, cast
+from operator import and_  # type: ignore
+from typing import (
+  AbstractSet, Any, Callable, Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Set,
+  TypeVar, Union, cast
+)
+
+from .state import SLOTS
 
 
 def equals(a: Any, b: Any) -> bool:
@@ -85,7 +91,7 @@ class Condition:
     if include := cls.INCLUDE_RE.match(exp):
       return VarCondition(
         include[1], cls.OPERATORS[include[2]],
-        {int(x) for x in include[3].split(",") if x.strip()})
+        frozenset(int(x) for x in include[3].split(",") if x.strip()))
     elif comparison := cls.COMPARISON_RE.match(exp):
       return VarCondition(comparison[1], cls.OPERATORS[comparison[2]], int(comparison[3]))
     raise ValueError("Unknown condition")
@@ -93,6 +99,14 @@ class Condition:
   def __call__(self, **vars: Any) -> bool:
     raise NotImplementedError
 
+  def evaluate(self, slots: Sequence[Any]) -> bool:
+    # 按 GameState 的下标读取变量，比 __call__ 的关键字参数快得多
+    raise NotImplementedError
+
+  def signature(self) -> Hashable:
+    # 结构相同的条件有相同的签名
+    raise NotImplementedError
+
   def _pformat(self, indention: str, level: int) -> str:
     return repr(self)
 
@@ -110,6 +124,12 @@ class NoopCondition(Condition):
   def __call__(self, **vars: Any) -> bool:
     return self.value
 
+  def evaluate(self, slots: Sequence[Any]) -> bool:
+    return self.value
+
+  def signature(self) -> Hashable:
+    return self.value
+
 
 Condition.FALSE = NoopCondition(False)
 Condition.TRUE = NoopCondition(True)
@@ -124,6 +144,15 @@ class BoolCondition(Condition):
   def __call__(self, **vars: Any) -> bool:
     return self.operator(self.left(**vars), self.right(**vars))
 
+  def evaluate(self, slots: Sequence[Any]) -> bool:
+    # 两边都没有副作用，可以短路求值
+    if self.operator is and_:
+      return self.left.evaluate(slots) and self.right.evaluate(slots)
+    return self.left.evaluate(slots) or self.right.evaluate(slots)
+
+  def signature(self) -> Hashable:
+    return (self.operator.__name__, self.left.signature(), self.right.signature())
+
   def __repr__(self) -> str:
     return f"BoolCondition({repr(self.left)}, {repr(self.operator)}, {repr(self.right)})"
 
@@ -140,14 +169,35 @@ TRight = TypeVar("TRight")
 
 
 class VarCondition(Condition):
+  slot: Optional[int]
+
   def __init__(self, key: str, operator: Callable[[Any, TRight], bool], right: TRight) -> None:
     super().__init__()
     self.key = key
     self.operator = operator
     self.right = right
+    self.slot = SLOTS.get(key)
 
   def __call__(self, **vars: Any) -> bool:
     return self.operator(vars[self.key], self.right)
 
+  def evaluate(self, slots: Sequence[Any]) -> bool:
+    if self.slot is None:
+      raise KeyError(self.key)
+    return self.operator(slots[self.slot], self.right)
+
+  def ids(self) -> FrozenSet[int]:
+    # 右侧的 id：TLT?[1001,1002] 等的集合，或者 TLT=1001 等的单个 id
+    right: Any = self.right
+    if isinstance(right, (set, frozenset)):
+      return frozenset(cast(AbstractSet[int], right))
+    return frozenset((right,))
+
+  def signature(self) -> Hashable:
+    right: Any = self.right
+    if isinstance(right, set):
+      right = frozenset(cast(AbstractSet[Any], right))
+    return (self.key, self.operator.__name__, right)
+
   def __repr__(self) -> str:
     return f"VarCondition({repr(self.key)}, {repr(self.operator)}, {repr(self.right)})"
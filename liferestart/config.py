@@ -1,5 +1,4 @@
 from dataclasses import dataclass, field
-from functools import cached_property
 from typing import ClassVar, Dict, List, Tuple
 
 from .struct.commons import Rarity
@@ -210,7 +209,7 @@ class TalentWeight:
   rare: int = 10
   legendary: int = 1
 
-  @cached_property
+  @property
   def common(self) -> int:
     return self.total - self.uncommon - self.rare - self.legendary
 
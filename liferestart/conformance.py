@@ -0,0 +1,169 @@
+import argparse
+import gzip
+import json
+from dataclasses import dataclass
+from random import Random
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from . import Game, Statistics
+from .data import CHARACTER
+from .struct.talent import Talent
+
+# 黄金轨迹：固定种子下每一局的完整结果，用于检查引擎的优化没有改变种子对应的结果。
+# 每行是一局的 JSON，事件用 id 表示，有后续事件（bool 为 True）的记为 -id。
+# 引擎是任意接受 statistics 关键字参数、返回 Game 接口的可调用对象，默认就是 Game。
+# 黄金轨迹文件不随包安装，源码中的是 tests/golden/traces.jsonl.gz，需要明确指定路径。
+
+Engine = Callable[..., Game]
+Trace = Dict[str, Any]
+
+MODES = ("classic", "celebrity", "generated")
+
+
+@dataclass
+class Divergence:
+  seed: int
+  field: str
+  expected: Any
+  actual: Any
+
+
+def _pick_talents(game: Game, random: Random) -> List[Talent]:
+  generator = game.random_talents()
+  choices: List[Talent] = []
+  for _ in range(random.randint(1, 3)):
+    choices = next(generator)
+  picks: List[Talent] = []
+  for talent in choices:
+    if all(talent is not other and not talent.is_imcompatible_with(other) for other in picks):
+      picks.append(talent)
+      if len(picks) == 3:
+        break
+  return picks
+
+
+def trace(seed: int, engine: Engine = Game) -> Trace:
+  # 由种子决定模式、选择的天赋和属性分配，全新的 Statistics，各局互相独立
+  random = Random(seed)
+  game = engine(statistics=Statistics())
+  game.seed(seed)
+  mode = MODES[seed % len(MODES)]
+  result: Trace = {"seed": seed, "mode": mode}
+  if mode == "classic":
+    talents = _pick_talents(game, random)
+    real = game.set_talents(talents)
+    stats = [0, 0, 0, 0]
+    for _ in range(game.get_points()):
+      stats[random.choice([i for i in range(4) if stats[i] < 10])] += 1
+    game.set_stats(*stats)
+  else:
+    if mode == "celebrity":
+      character = CHARACTER[random.choice(sorted(CHARACTER))]
+      result["character"] = character.id
+    else:
+      character = game.create_character(seed)
+    talents, real = game.set_character(character)
+    stats = [character.charm, character.intelligence, character.strength, character.money]
+  result["talents"] = [talent.id for talent in talents]
+  result["real"] = [talent.id for talent in real]
+  result["stats"] = stats
+  years: List[List[int]] = []
+  triggers: List[List[int]] = []
+  achievements: List[List[int]] = []
+  result["years"] = years
+  result["triggers"] = triggers
+  result["achievements"] = achievements
+  try:
+    for progress in game.progress():
+      if progress.age >= 0:
+        years.append([-event.id if post else event.id for event, post in progress.events])
+      triggers.extend([progress.age, talent.id] for talent in progress.talents)
+      achievements.extend([progress.age, achievement.id] for achievement in progress.achievements)
+  except IndexError:
+    # 原版数据在少数种子下会出现没有可选事件的年份（random.choices 抛出 IndexError），
+    # 这也是结果的一部分。其他异常是引擎的错误，直接抛出
+    if game.event_candidates()[0]:
+      raise
+    result["error"] = "IndexError"
+    return result
+  end = game.end()
+  result["end"] = [
+    end.age, end.overall, [achievement.id for achievement in end.achievements],
+    end.charm, end.intelligence, end.strength, end.money, end.spirit]
+  return result
+
+
+def compare(expected: Trace, actual: Trace) -> Optional[Divergence]:
+  seed = expected["seed"]
+  for key, value in expected.items():
+    other = actual.get(key)
+    if key == "years" and value != other:
+      # 定位到第一个不同的年份
+      for age, (left, right) in enumerate(zip(value, other or [])):
+        if left != right:
+          return Divergence(seed, f"years[{age}]", left, right)
+      return Divergence(seed, "years.length", len(value), len(other or []))
+    if value != other:
+      return Divergence(seed, key, value, other)
+  return None
+
+
+def save(path: str, seeds: Iterable[int], engine: Engine = Game) -> None:
+  with gzip.open(path, "wt", encoding="utf8") as f:
+    for seed in seeds:
+      f.write(json.dumps(trace(seed, engine), ensure_ascii=False, separators=(",", ":")))
+      f.write("\n")
+
+
+def load(path: str) -> Iterator[Trace]:
+  with gzip.open(path, "rt", encoding="utf8") as f:
+    for line in f:
+      yield json.loads(line)
+
+
+def check(path: str, engine: Engine = Game, step: int = 1) -> Optional[Divergence]:
+  # 逐局重放，返回第一个不一致的位置。step > 1 时只检查其中一部分
+  for i, expected in enumerate(load(path)):
+    if i % step:
+      continue
+    divergence = compare(expected, trace(expected["seed"], engine))
+    if divergence:
+      return divergence
+  return None
+
+
+def fuzz(
+  left: Engine, right: Engine, count: int, seed: Optional[int] = None
+) -> Optional[Divergence]:
+  # 用随机种子比较两个引擎，遇到第一个不一致就停止
+  random = Random(seed)
+  for _ in range(count):
+    life = random.getrandbits(32)
+    divergence = compare(trace(life, left), trace(life, right))
+    if divergence:
+      return divergence
+  return None
+
+
+def main(args: Optional[Sequence[str]] = None) -> int:
+  parser = argparse.ArgumentParser(prog="python -m liferestart.conformance")
+  subparsers = parser.add_subparsers(dest="command", required=True)
+  generate = subparsers.add_parser("generate")
+  generate.add_argument("path")
+  generate.add_argument("--seeds", type=int, default=3000)
+  verify = subparsers.add_parser("check")
+  verify.add_argument("path")
+  verify.add_argument("--step", type=int, default=1)
+  options = parser.parse_args(args)
+  if options.command == "generate":
+    save(options.path, range(options.seeds))
+    return 0
+  divergence = check(options.path, step=options.step)
+  if divergence:
+    print(divergence)
+    return 1
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
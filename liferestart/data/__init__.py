@@ -1,31 +1,52 @@
+import hashlib
 import json
 import os
-from typing import Dict
+from typing import Dict, Tuple
 
 from ..struct.achievement import Achievement
+from ..index import BranchIndex, IncompatibilityIndex, TriggerIndex, build_rarity_buckets
 from ..struct.character import PresetCharacter
-from ..struct.commons import Weights, parse_weights
+from ..struct.commons import FrozenDict, Rarity, Weights, parse_weights
 from ..struct.event import Event
 from ..struct.talent import Talent
 
 _dir = os.path.dirname(os.path.abspath(__file__))
 with open(f"{_dir}/age.json", encoding="utf-8") as f:
-  AGE: Dict[int, Weights] = {
-    int(i["age"]): parse_weights(i["event"]) for i in json.load(f).values()
-  }
+  AGE: Dict[int, Weights] = FrozenDict(
+    (int(i["age"]), parse_weights(i["event"])) for i in json.load(f).values()
+  )
 with open(f"{_dir}/talents.json", encoding="utf-8") as f:
-  TALENT: Dict[int, Talent] = {
-    (parsed := Talent.parse(talent)).id: parsed for talent in json.load(f).values()
-  }
+  TALENT: Dict[int, Talent] = FrozenDict(
+    ((parsed := Talent.parse(talent)).id, parsed) for talent in json.load(f).values()
+  )
 with open(f"{_dir}/events.json", encoding="utf-8") as f:
-  EVENT: Dict[int, Event] = {
-    (parsed := Event.parse(event)).id: parsed for event in json.load(f).values()
-  }
+  EVENT: Dict[int, Event] = FrozenDict(
+    ((parsed := Event.parse(event)).id, parsed) for event in json.load(f).values()
+  )
 with open(f"{_dir}/achievement.json", encoding="utf-8") as f:
-  ACHIEVEMENT: Dict[int, Achievement] = {
-    (parsed := Achievement.parse(achievement)).id: parsed for achievement in json.load(f).values()
-  }
+  ACHIEVEMENT: Dict[int, Achievement] = FrozenDict(
+    ((parsed := Achievement.parse(achievement)).id, parsed)
+    for achievement in json.load(f).values()
+  )
 with open(f"{_dir}/character.json", encoding="utf-8") as f:
-  CHARACTER: Dict[int, PresetCharacter] = {
-    (parsed := PresetCharacter.parse(character)).id: parsed for character in json.load(f).values()
-  }
+  CHARACTER: Dict[int, PresetCharacter] = FrozenDict(
+    ((parsed := PresetCharacter.parse(character)).id, parsed)
+    for character in json.load(f).values()
+  )
+
+
+def _dataset_version() -> str:
+  digest = hashlib.sha256()
+  for name in ("achievement.json", "age.json", "character.json", "events.json", "talents.json"):
+    with open(f"{_dir}/{name}", "rb") as f:
+      digest.update(f.read())
+  return digest.hexdigest()[:16]
+
+
+# 数据的版本，回放记录和各种缓存用它判断数据是否变化
+DATASET_VERSION = _dataset_version()
+
+TALENT_BY_RARITY: Dict[Rarity, Tuple[Talent, ...]] = build_rarity_buckets(TALENT.values())
+TALENT_INCOMPATIBILITY = IncompatibilityIndex(TALENT.values())
+TRIGGER_INDEX = TriggerIndex(TALENT.values(), ACHIEVEMENT.values(), EVENT.values(), AGE)
+BRANCH_INDEX = BranchIndex(EVENT, AGE)
@@ -0,0 +1,308 @@
+import dataclasses
+import hashlib
+import json
+import os
+import threading
+import weakref
+from collections import ChainMap
+from typing import (
+  Any, Callable, Dict, Hashable, Iterable, List, Mapping, MutableMapping, Optional, Sequence, Set,
+  Tuple, TypeVar, cast
+)
+
+from . import data
+from .condition import Condition
+from .index import BranchIndex, IncompatibilityIndex, TriggerIndex, build_rarity_buckets
+from .struct.achievement import Achievement
+from .struct.character import PresetCharacter
+from .struct.commons import FrozenDict, Rarity, Weights, parse_weights
+from .struct.event import Event
+from .struct.talent import Talent
+from .typing.achievement import AchievementDict
+from .typing.character import CharacterDict
+from .typing.event import EventDict
+from .typing.talent import TalentDict
+
+# 游戏使用的一整套数据以及由它们派生的索引。overlay 在现有数据上叠加自定义的事件、天赋、成就，
+# 只保存新增或覆盖的条目（ChainMap），派生的索引只重建受影响的部分，其余与底层数据共享。
+# 其他语言的数据只替换文本，条件、效果、权重、分支与默认语言共享同一份对象。
+
+V = TypeVar("V")
+
+DEFAULT_LOCALE = "zh-cn"
+# 各类数据中与语言有关的字段，其余字段在所有语言中必须相同
+TEXT_FIELDS: Dict[type, Sequence[str]] = {
+  Talent: ("name", "description"),
+  Event: ("event", "post"),
+  Achievement: ("name", "description"),
+  PresetCharacter: ("name",),
+}
+
+
+class Dataset:
+  version: str
+  locale: str
+  base: Optional["Dataset"]
+  age: Mapping[int, Weights]
+  talents: Mapping[int, Talent]
+  events: Mapping[int, Event]
+  achievements: Mapping[int, Achievement]
+  characters: Mapping[int, PresetCharacter]
+  talent_by_rarity: Dict[Rarity, Tuple[Talent, ...]]
+  talent_incompatibility: IncompatibilityIndex
+  trigger_index: TriggerIndex
+  branch_index: BranchIndex
+
+  def __init__(
+    self, age: Mapping[int, Weights], talents: Mapping[int, Talent], events: Mapping[int, Event],
+    achievements: Mapping[int, Achievement], characters: Mapping[int, PresetCharacter],
+    version: str, locale: str = DEFAULT_LOCALE
+  ) -> None:
+    # 从头构建全部索引
+    self.version = version
+    self.locale = locale
+    self.base = None
+    self.age = age
+    self.talents = talents
+    self.events = events
+    self.achievements = achievements
+    self.characters = characters
+    self.talent_by_rarity = build_rarity_buckets(talents.values())
+    self.talent_incompatibility = IncompatibilityIndex(talents.values())
+    self.trigger_index = TriggerIndex(talents.values(), achievements.values(), events.values(), age)
+    self.branch_index = BranchIndex(dict(events), dict(age))
+    _register(self)
+
+  def overlay(
+    self, talents: Iterable[TalentDict] = (), events: Iterable[EventDict] = (),
+    achievements: Iterable[AchievementDict] = (), characters: Iterable[CharacterDict] = (),
+    age: Optional[Mapping[int, Sequence[Any]]] = None
+  ) -> "Dataset":
+    # 参数的格式与 data 目录中的 JSON 相同，id 相同的条目覆盖原有的条目。
+    # age 是 {年龄: [事件, ...]}，与该年龄原有的事件权重合并。
+    talents = list(talents)
+    events = list(events)
+    achievements = list(achievements)
+    characters = list(characters)
+    age = {} if age is None else {int(key): list(value) for key, value in age.items()}
+    new_talents = FrozenDict(((parsed := Talent.parse(item)).id, parsed) for item in talents)
+    new_events = FrozenDict(((parsed := Event.parse(item)).id, parsed) for item in events)
+    new_achievements = FrozenDict(
+      ((parsed := Achievement.parse(item)).id, parsed) for item in achievements)
+    new_characters = FrozenDict(
+      ((parsed := PresetCharacter.parse(item)).id, parsed) for item in characters)
+    new_age = FrozenDict(
+      (key, FrozenDict({**self.age.get(key, {}), **parse_weights(value)}))
+      for key, value in age.items())
+
+    result = Dataset.__new__(Dataset)
+    digest = hashlib.sha256(self.version.encode())
+    digest.update(json.dumps(
+      [talents, events, achievements, characters, sorted(age.items())],
+      sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+    ).encode())
+    result.version = digest.hexdigest()[:16]
+    result.locale = self.locale
+    result.base = self
+    _register(result)
+    result.age = _chain(new_age, self.age)
+    result.talents = _chain(new_talents, self.talents)
+    result.events = _chain(new_events, self.events)
+    result.achievements = _chain(new_achievements, self.achievements)
+    result.characters = _chain(new_characters, self.characters)
+
+    # 天赋的稀有度桶只重建变化的天赋新旧稀有度所在的桶
+    rarities: Set[Rarity] = set()
+    for id, talent in new_talents.items():
+      rarities.add(talent.rarity)
+      if (old := self.talents.get(id)) is not None:
+        rarities.add(old.rarity)
+    by_rarity = dict(self.talent_by_rarity)
+    for rarity in rarities:
+      by_rarity[rarity] = tuple(
+        talent for talent in result.talents.values()
+        if talent.rarity == rarity and not talent.exclusive)
+    result.talent_by_rarity = FrozenDict(by_rarity)
+    # 互斥关系是按天赋编号的位集，天赋变化时整体重建（只有几百个天赋，很快）
+    if new_talents:
+      result.talent_incompatibility = IncompatibilityIndex(result.talents.values())
+    else:
+      result.talent_incompatibility = self.talent_incompatibility
+
+    # 出现新的年龄或者新的事件会使年龄减少时，条件能满足的年龄会变化，只能重建
+    domain_changed = any(key not in self.age for key in new_age) or (
+      any(event.age < 0 for event in new_events.values())
+      and all(event.age >= 0 for event in self.events.values())
+    )
+    if domain_changed:
+      result.trigger_index = TriggerIndex(
+        result.talents.values(), result.achievements.values(), result.events.values(), result.age)
+      result.branch_index = BranchIndex(dict(result.events), dict(result.age))
+      return result
+    if new_talents or new_achievements:
+      result.trigger_index = self.trigger_index.updated(
+        result.talents.values(), result.achievements.values(), new_talents.values(),
+        [*new_achievements.values(), *(
+          old for id in new_achievements if (old := self.achievements.get(id)) is not None)])
+    else:
+      result.trigger_index = self.trigger_index
+    if new_events or new_age:
+      result.branch_index = self.branch_index.updated(
+        dict(result.events), dict(result.age), new_events)
+    else:
+      result.branch_index = self.branch_index
+    return result
+
+
+def _chain(new: Mapping[int, V], old: Mapping[int, V]) -> Mapping[int, V]:
+  # 新条目在前。ChainMap 在这里只读，两边都是不可修改的 FrozenDict 或者 ChainMap
+  if not new:
+    return old
+  return ChainMap(cast(MutableMapping[int, V], new), cast(MutableMapping[int, V], old))
+
+
+def _default_dataset() -> Dataset:
+  # 直接使用 liferestart.data 中已经构建好的索引
+  result = Dataset.__new__(Dataset)
+  result.version = data.DATASET_VERSION
+  result.locale = DEFAULT_LOCALE
+  result.base = None
+  result.age = data.AGE
+  result.talents = data.TALENT
+  result.events = data.EVENT
+  result.achievements = data.ACHIEVEMENT
+  result.characters = data.CHARACTER
+  result.talent_by_rarity = data.TALENT_BY_RARITY
+  result.talent_incompatibility = data.TALENT_INCOMPATIBILITY
+  result.trigger_index = data.TRIGGER_INDEX
+  result.branch_index = data.BRANCH_INDEX
+  return result
+
+
+# 版本 -> 这个进程中还在使用的数据，用于从 LifeTrace、ReplayRecord 中保存的版本找回数据
+_versions: "weakref.WeakValueDictionary[str, Dataset]" = weakref.WeakValueDictionary()
+_versions_lock = threading.Lock()
+
+
+def _register(dataset: Dataset) -> None:
+  # 版本相同的数据逻辑和文本都相同，保留哪一个都可以
+  with _versions_lock:
+    _versions[dataset.version] = dataset
+
+
+DEFAULT_DATASET = _default_dataset()
+_register(DEFAULT_DATASET)
+
+
+def _logic(value: object) -> Hashable:
+  # 用于比较两种语言的数据逻辑是否相同，容器中的条目也逐个转换
+  if isinstance(value, Condition):
+    return value.signature()
+  if isinstance(value, (list, tuple)):
+    return tuple(_logic(item) for item in cast(Iterable[object], value))
+  if isinstance(value, (set, frozenset)):
+    return frozenset(_logic(item) for item in cast(Iterable[object], value))
+  if isinstance(value, dict):
+    items = cast(Dict[Any, object], value).items()
+    return tuple(sorted(((key, _logic(item)) for key, item in items), key=lambda pair: pair[0]))
+  return value
+
+
+def _load_table(directory: str, name: str, parse: Callable[[Any], Any]) -> Dict[int, Any]:
+  with open(os.path.join(directory, name), encoding="utf-8") as f:
+    return {(parsed := parse(item)).id: parsed for item in json.load(f).values()}
+
+
+def _localize(
+  name: str, table: Dict[int, Any], base: Mapping[int, Any], errors: List[str]
+) -> Dict[int, Any]:
+  # 按默认语言的顺序排列，同一种子在不同语言中抽到相同的天赋和事件
+  if table.keys() != base.keys():
+    difference = sorted(table.keys() ^ base.keys())
+    errors.append(f"{name}: id 不同 {difference[:10]}")
+  result: Dict[int, Any] = {}
+  for id, original in base.items():
+    item = table.get(id)
+    if item is None:
+      continue
+    text = TEXT_FIELDS[type(original)]
+    for field in dataclasses.fields(original):
+      if field.name not in text and (
+        _logic(getattr(item, field.name)) != _logic(getattr(original, field.name))
+      ):
+        errors.append(f"{name}: {id} 的 {field.name} 不同")
+    # replace 只替换文本，其余字段引用原来的对象
+    result[id] = dataclasses.replace(original, **{key: getattr(item, key) for key in text})
+  return FrozenDict(result)
+
+
+def load_locale(locale: str, directory: str, base: Optional[Dataset] = None) -> Dataset:
+  # directory 中的文件与 liferestart/data 相同，age.json 可以省略。逻辑与 base 不同时抛出 ValueError
+  base = DEFAULT_DATASET if base is None else base
+  errors: List[str] = []
+  talents = _localize(
+    "talents.json", _load_table(directory, "talents.json", Talent.parse), base.talents, errors)
+  events = _localize(
+    "events.json", _load_table(directory, "events.json", Event.parse), base.events, errors)
+  achievements = _localize(
+    "achievement.json", _load_table(directory, "achievement.json", Achievement.parse),
+    base.achievements, errors)
+  characters = _localize(
+    "character.json", _load_table(directory, "character.json", PresetCharacter.parse),
+    base.characters, errors)
+  if os.path.exists(os.path.join(directory, "age.json")):
+    with open(os.path.join(directory, "age.json"), encoding="utf-8") as f:
+      age = {int(i["age"]): parse_weights(i["event"]) for i in json.load(f).values()}
+    if age != dict(base.age):
+      errors.append("age.json: 年龄表不同")
+  if errors:
+    raise ValueError(f"{locale} 的数据逻辑与 {base.locale} 不同：\n" + "\n".join(errors))
+  digest = hashlib.sha256(base.version.encode())
+  for name in ("achievement.json", "character.json", "events.json", "talents.json"):
+    with open(os.path.join(directory, name), "rb") as f:
+      digest.update(f.read())
+  # 年龄表直接共享
+  return Dataset(
+    base.age, talents, events, achievements, characters, digest.hexdigest()[:16], locale)
+
+
+_directories: Dict[str, str] = {}
+_datasets: Dict[str, Dataset] = {DEFAULT_LOCALE: DEFAULT_DATASET}
+_lock = threading.Lock()
+
+
+def register_locale(locale: str, directory: str) -> None:
+  # 第一次 get_dataset 时才加载
+  with _lock:
+    _directories[locale] = directory
+    _datasets.pop(locale, None)
+
+
+def locales() -> List[str]:
+  return sorted({DEFAULT_LOCALE, *_directories})
+
+
+def get_dataset(locale: str = DEFAULT_LOCALE) -> Dataset:
+  # 多个线程同时请求同一种语言时只加载一次
+  dataset = _datasets.get(locale)
+  if dataset is None:
+    with _lock:
+      dataset = _datasets.get(locale)
+      if dataset is None:
+        if locale not in _directories:
+          raise KeyError(f"未注册的语言 {locale}")
+        dataset = _datasets[locale] = load_locale(locale, _directories[locale])
+  return dataset
+
+
+def find_dataset(version: str) -> Dataset:
+  # 按版本找回数据：默认数据、注册的语言（需要时加载）以及还没有被回收的其他数据（如 overlay）。
+  # 找不到时抛出 KeyError，不能换用其他版本的数据，否则同样的输入会得到不同的一局
+  dataset = _versions.get(version)
+  if dataset is not None:
+    return dataset
+  for locale in locales():
+    dataset = get_dataset(locale)
+    if dataset.version == version:
+      return dataset
+  raise KeyError(f"未知的数据版本 {version}")
@@ -0,0 +1,203 @@
+import math
+from dataclasses import dataclass
+from random import Random
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from . import End, Game, Statistics
+from .condition import BoolCondition, Condition, VarCondition, contains, equals
+from .config import Config
+from .dataset import DEFAULT_DATASET, Dataset
+from .struct.event import Event
+
+# 稀有成就、事件的概率估计：
+# - 重要性抽样：放大目标相关事件的权重，再用似然比修正，得到无偏估计
+# - 多级分裂：在中间里程碑处复制（fork）到达的游戏，概率为各级通过率之积
+# dataset 参数与 Game 的相同，默认为内置数据。
+
+Target = Callable[[Game, End], bool]
+Setup = Callable[[Game], None]
+Level = Callable[[Game], bool]
+
+
+@dataclass
+class Estimate:
+  probability: float
+  variance: float  # 估计量的方差
+  samples: int
+  hits: int
+
+  @property
+  def std_error(self) -> float:
+    return math.sqrt(self.variance)
+
+  @property
+  def relative_error(self) -> float:
+    return self.std_error / self.probability if self.probability else math.inf
+
+  def interval(self, z: float = 1.96) -> Tuple[float, float]:
+    return max(self.probability - z * self.std_error, 0.0), self.probability + z * self.std_error
+
+
+def achievement_target(id: int) -> Target:
+  return lambda game, end: id in game.statistics.achievements
+
+
+def event_target(id: int) -> Target:
+  return lambda game, end: id in game.statistics.events
+
+
+def default_setup(game: Game) -> None:
+  game.set_talents([])
+  game.set_stats(5, 5, 5, 5)
+
+
+def condition_events(condition: Condition) -> Set[int]:
+  # 条件中以“经历过”形式出现的事件，用于推断重要性抽样要放大的事件
+  if isinstance(condition, BoolCondition):
+    return condition_events(condition.left) | condition_events(condition.right)
+  if (
+    isinstance(condition, VarCondition) and condition.key in ("EVT", "AEVT")
+    and condition.operator in (contains, equals)
+  ):
+    return set(condition.ids())
+  return set()
+
+
+def event_bias(
+  ids: Iterable[int], factor: float, dataset: Optional[Dataset] = None
+) -> Dict[int, float]:
+  # 目标事件及所有可以通过分支链到达它们的事件都乘以 factor
+  dataset = DEFAULT_DATASET if dataset is None else dataset
+  parents: Dict[int, Set[int]] = {}
+  for id, groups in dataset.branch_index.tables.items():
+    for _, entries in groups:
+      for _, target in entries:
+        parents.setdefault(target.id, set()).add(id)
+  result: Dict[int, float] = {}
+  pending = list(ids)
+  while pending:
+    id = pending.pop()
+    if id in result:
+      continue
+    result[id] = factor
+    pending.extend(parents.get(id, ()))
+  return result
+
+
+class ImportanceGame(Game):
+  bias: Dict[int, float]
+  likelihood: float  # 原分布与偏置分布下本局事件序列的概率之比
+
+  def __init__(
+    self, bias: Dict[int, float], config: Optional[Config] = None,
+    statistics: Optional[Statistics] = None, random: Optional[Random] = None,
+    dataset: Optional[Dataset] = None
+  ) -> None:
+    super().__init__(
+      config, Statistics() if statistics is None else statistics, random, dataset)
+    self.bias = bias
+    self.likelihood = 1.0
+
+  def _choose_event(self, choices: List[Event], weights: List[float]) -> Event:
+    biased = [weight * self.bias.get(event.id, 1.0) for event, weight in zip(choices, weights)]
+    index = self.random.choices(range(len(choices)), biased)[0]
+    self.likelihood *= weights[index] * sum(biased) / (biased[index] * sum(weights))
+    return choices[index]
+
+
+def _finish(game: Game) -> End:
+  while game.alive:
+    game.next_year()
+  return game.end()
+
+
+def importance_sampling(
+  target: Target, bias: Dict[int, float], lives: int, setup: Setup = default_setup,
+  seed: int = 0, config: Optional[Config] = None, dataset: Optional[Dataset] = None
+) -> Estimate:
+  total = 0.0
+  squares = 0.0
+  hits = 0
+  for i in range(lives):
+    game = ImportanceGame(bias, config, dataset=dataset)
+    game.seed(seed + i)
+    setup(game)
+    game.start()
+    end = _finish(game)
+    if target(game, end):
+      hits += 1
+      total += game.likelihood
+      squares += game.likelihood ** 2
+  mean = total / lives
+  variance = max(squares / lives - mean ** 2, 0.0) / max(lives - 1, 1)
+  return Estimate(mean, variance, lives, hits)
+
+
+def _advance(game: Game, level: Level) -> bool:
+  while True:
+    if level(game):
+      return True
+    if not game.alive:
+      return False
+    game.next_year()
+
+
+def multilevel_splitting(
+  target: Target, levels: Sequence[Level], particles: int = 1000, replications: int = 10,
+  setup: Setup = default_setup, seed: int = 0, config: Optional[Config] = None,
+  dataset: Optional[Dataset] = None
+) -> Estimate:
+  # 固定样本量的多级分裂。levels 必须是依次嵌套的中间状态（每年结束时检查），
+  # 目标只有在依次经过所有 levels 之后才可能达成。每次重复的乘积估计是无偏的，
+  # 方差由多次独立重复估计。
+  estimates: List[float] = []
+  hits = 0
+  for replication in range(replications):
+    random = Random(seed * replications + replication)
+    games: List[Game] = []
+    for _ in range(particles):
+      game = Game(config, Statistics(), dataset=dataset)
+      game.seed(random.getrandbits(32))
+      setup(game)
+      game.start()
+      games.append(game)
+    probability = 1.0
+    for level in levels:
+      reached = [game for game in games if _advance(game, level)]
+      probability *= len(reached) / len(games)
+      if not reached:
+        break
+      games = []
+      for _ in range(particles):
+        game = reached[random.randrange(len(reached))].fork()
+        game.random.seed(random.getrandbits(64))
+        games.append(game)
+    else:
+      reached_target = sum(1 for game in games if target(game, _finish(game)))
+      hits += reached_target
+      probability *= reached_target / len(games)
+    if not games or probability == 0.0:
+      probability = 0.0
+    estimates.append(probability)
+  mean = sum(estimates) / replications
+  variance = (
+    sum((x - mean) ** 2 for x in estimates) / (replications - 1) / replications
+    if replications > 1 else math.inf)
+  return Estimate(mean, variance, particles * replications, hits)
+
+
+def achievement_odds(
+  ids: Optional[Iterable[int]] = None, lives: int = 1000, factor: float = 20.0,
+  setup: Setup = default_setup, seed: int = 0, config: Optional[Config] = None,
+  dataset: Optional[Dataset] = None
+) -> Dict[int, Estimate]:
+  # 成就概率表。条件依赖事件的成就用重要性抽样，其余的退化为普通蒙特卡洛
+  dataset = DEFAULT_DATASET if dataset is None else dataset
+  achievements = dataset.achievements
+  result: Dict[int, Estimate] = {}
+  for id in achievements if ids is None else ids:
+    events = condition_events(achievements[id].condition)
+    bias = event_bias(events, factor, dataset) if events else {}
+    result[id] = importance_sampling(
+      achievement_target(id), bias, lives, setup, seed, config, dataset)
+  return result
@@ -0,0 +1,332 @@
+from operator import and_  # type: ignore
+from typing import (
+  Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Set, Tuple, cast
+)
+
+from .condition import BoolCondition, Condition, VarCondition
+from .struct.achievement import Achievement, Opportunity
+from .struct.commons import FrozenDict, Rarity, Weights
+from .struct.event import Event
+from .struct.talent import Talent
+
+
+def build_rarity_buckets(talents: Iterable[Talent]) -> Dict[Rarity, Tuple[Talent, ...]]:
+  # 可以随机抽到的天赋（非 exclusive），按稀有度分组并保持数据中的顺序
+  buckets: Dict[Rarity, List[Talent]] = {rarity: [] for rarity in Rarity}
+  for talent in talents:
+    if not talent.exclusive:
+      buckets[talent.rarity].append(talent)
+  return FrozenDict((rarity, tuple(bucket)) for rarity, bucket in buckets.items())
+
+
+class IncompatibilityIndex:
+  # 天赋按数据中的顺序编号，互斥关系存为对称的邻接位集（Python int）
+  talents: List[Talent]
+  index: Dict[int, int]
+  adjacency: List[int]
+  by_rarity: Dict[Rarity, int]
+
+  def __init__(self, talents: Iterable[Talent]) -> None:
+    self.talents = list(talents)
+    self.index = {talent.id: i for i, talent in enumerate(self.talents)}
+    self.adjacency = [0] * len(self.talents)
+    self.by_rarity = {rarity: 0 for rarity in Rarity}
+    for i, talent in enumerate(self.talents):
+      for id in talent.imcompatible:
+        if (j := self.index.get(id)) is not None:
+          self.adjacency[i] |= 1 << j
+          self.adjacency[j] |= 1 << i
+      if not talent.exclusive:
+        self.by_rarity[talent.rarity] |= 1 << i
+
+  def mask(self, talents: Iterable[Talent]) -> int:
+    result = 0
+    for talent in talents:
+      result |= 1 << self.index[talent.id]
+    return result
+
+  def blocked(self, selection: Iterable[Talent]) -> int:
+    # 已选择的天赋本身以及与它们互斥的天赋
+    result = 0
+    for talent in selection:
+      i = self.index[talent.id]
+      result |= self.adjacency[i] | 1 << i
+    return result
+
+  def unpack(self, mask: int) -> List[Talent]:
+    result: List[Talent] = []
+    while mask:
+      low = mask & -mask
+      result.append(self.talents[low.bit_length() - 1])
+      mask ^= low
+    return result
+
+  def compatible(self, rarity: Rarity, selection: Iterable[Talent]) -> List[Talent]:
+    return self.unpack(self.by_rarity[rarity] & ~self.blocked(selection))
+
+  def is_blocked(self, talent: Talent, blocked: int) -> bool:
+    return bool(blocked >> self.index[talent.id] & 1)
+
+  def conflicts(self, talents: Sequence[Talent]) -> List[Tuple[Talent, Talent]]:
+    # 按 itertools.combinations 的顺序返回重复或互斥的天赋对
+    result: List[Tuple[Talent, Talent]] = []
+    blocked = [self.blocked((talent,)) for talent in talents]
+    for i, first in enumerate(talents):
+      for second in talents[i + 1:]:
+        if self.is_blocked(second, blocked[i]):
+          result.append((first, second))
+    return result
+
+
+def condition_ages(
+  condition: Condition, domain: Sequence[int], monotonic: bool = False
+) -> Optional[FrozenSet[int]]:
+  # 返回条件可能为真的年龄集合，None 表示与年龄无关。
+  # 只有年龄不会倒退（没有负的 AGE 效果）时，HAGE 才等于 AGE，可以一并分析。
+  if isinstance(condition, VarCondition):
+    if condition.key == "AGE" or (monotonic and condition.key == "HAGE"):
+      return frozenset(age for age in domain if condition.operator(age, condition.right))
+    return None
+  if isinstance(condition, BoolCondition):
+    left = condition_ages(condition.left, domain, monotonic)
+    right = condition_ages(condition.right, domain, monotonic)
+    if condition.operator is and_:
+      if left is None:
+        return right
+      if right is None:
+        return left
+      return left & right
+    if left is None or right is None:
+      return None
+    return left | right
+  if condition is Condition.FALSE:
+    return frozenset()
+  return None
+
+
+class TriggerIndex:
+  # 按年龄索引只可能在特定年龄触发的天赋和成就，成就同时按时机分组
+  talent_ages: Dict[int, Optional[FrozenSet[int]]]
+  achievements: Dict[Opportunity, List[Achievement]]
+  achievements_by_age: Dict[Opportunity, Dict[int, List[Achievement]]]
+  _domain: List[int]
+  _monotonic: bool
+
+  def __init__(
+    self, talents: Iterable[Talent], achievements: Iterable[Achievement], events: Iterable[Event],
+    ages: Iterable[int]
+  ) -> None:
+    self._domain = [-1, *sorted(ages)]
+    self._monotonic = all(event.age >= 0 for event in events)
+    self.talent_ages = {
+      talent.id: condition_ages(talent.condition, self._domain, self._monotonic)
+      for talent in talents
+    }
+    self.achievements = {}
+    self.achievements_by_age = {}
+    achievements = list(achievements)
+    for opportunity in Opportunity:
+      self._index_achievements(opportunity, achievements)
+
+  def _index_achievements(self, opportunity: Opportunity, achievements: List[Achievement]) -> None:
+    untimed: List[Tuple[int, Achievement]] = []
+    timed: List[Tuple[int, Achievement, FrozenSet[int]]] = []
+    for i, achievement in enumerate(achievements):
+      if achievement.opportunity != opportunity:
+        continue
+      ages_ = condition_ages(achievement.condition, self._domain, self._monotonic)
+      if ages_ is None:
+        untimed.append((i, achievement))
+      else:
+        timed.append((i, achievement, ages_))
+    self.achievements[opportunity] = [achievement for _, achievement in untimed]
+    by_age: Dict[int, List[Achievement]] = {}
+    # 保持数据中的顺序，成员相同的桶共享同一个列表
+    shared: Dict[Tuple[int, ...], List[Achievement]] = {}
+    for age in self._domain:
+      extra = [(i, achievement) for i, achievement, ages_ in timed if age in ages_]
+      if not extra:
+        continue
+      key = tuple(i for i, _ in extra)
+      if key not in shared:
+        shared[key] = [
+          achievement for _, achievement in sorted(untimed + extra, key=lambda x: x[0])]
+      by_age[age] = shared[key]
+    self.achievements_by_age[opportunity] = by_age
+
+  def updated(
+    self, talents: Iterable[Talent], achievements: Iterable[Achievement],
+    changed_talents: Iterable[Talent], changed_achievements: Iterable[Achievement]
+  ) -> "TriggerIndex":
+    # 增量更新：只重新分析变化的天赋，只重建变化的成就所在时机的桶，其余部分与原索引共享。
+    # 年龄表或年龄是否单调变化时应当重新构建整个索引。
+    result = TriggerIndex.__new__(TriggerIndex)
+    result._domain = self._domain
+    result._monotonic = self._monotonic
+    result.talent_ages = dict(self.talent_ages)
+    for talent in changed_talents:
+      result.talent_ages[talent.id] = condition_ages(talent.condition, self._domain, self._monotonic)
+    result.achievements = dict(self.achievements)
+    result.achievements_by_age = dict(self.achievements_by_age)
+    opportunities = {achievement.opportunity for achievement in changed_achievements}
+    if opportunities:
+      achievements = list(achievements)
+      for opportunity in opportunities:
+        result._index_achievements(opportunity, achievements)
+    return result
+
+  def achievements_at(self, opportunity: Opportunity, age: int) -> List[Achievement]:
+    return self.achievements_by_age[opportunity].get(age, self.achievements[opportunity])
+
+
+BranchGroup = Tuple[Condition, List[Tuple[Condition, Event]]]
+
+
+def split_conjunction(condition: Condition) -> Tuple[Condition, Condition]:
+  # Condition.build 是右结合的，a&b&c 的第一个合取项就是 left
+  if isinstance(condition, BoolCondition) and condition.operator is and_:
+    return condition.left, condition.right
+  return condition, Condition.TRUE
+
+
+class BranchIndex:
+  # 事件分支图的静态分析，以及解析好目标事件的扁平分支表。
+  # 连续几个分支的第一个合取项相同时（如事件 10000 的 AGE![500]），合为一组只求值一次。
+  tables: Dict[int, List[BranchGroup]]
+  cycles: List[List[int]]
+  missing: List[Tuple[int, int]]  # (事件, 不存在的目标)
+  dead: List[Tuple[int, int]]  # (事件, 分支下标)，条件不可能成立或被前面相同的条件遮蔽
+  depth: Dict[int, Optional[int]]  # 从该事件开始最长的事件链长度，None 表示会进入环
+  orphans: List[int]  # 不在年龄表中，也不是任何分支目标的事件
+  _domain: List[int]
+
+  def __init__(self, events: Dict[int, Event], ages: Dict[int, Weights]) -> None:
+    self._domain = [-1, *sorted(ages)]
+    self.tables = {}
+    self.missing = []
+    self.dead = []
+    for event in events.values():
+      self._build_table(event, events)
+    self._analyze(events, ages)
+
+  def _build_table(self, event: Event, events: Dict[int, Event]) -> None:
+    groups: List[BranchGroup] = []
+    seen: Set[Hashable] = set()
+    for i, (id, condition) in enumerate(event.branch):
+      target = events.get(id)
+      if target is None:
+        self.missing.append((event.id, id))
+        continue
+      signature = condition.signature()
+      if signature in seen or condition_ages(condition, self._domain) == frozenset():
+        self.dead.append((event.id, i))
+      seen.add(signature)
+      prefix, rest = split_conjunction(condition)
+      if groups and groups[-1][0].signature() == prefix.signature():
+        groups[-1][1].append((rest, target))
+      else:
+        groups.append((prefix, [(rest, target)]))
+    if groups:
+      self.tables[event.id] = groups
+
+  def _analyze(self, events: Dict[int, Event], ages: Dict[int, Weights]) -> None:
+    sampled = {id for weights in ages.values() for id in weights}
+    targets = {
+      target.id for groups in self.tables.values() for _, entries in groups for _, target in entries
+    }
+    self.orphans = [id for id in events if id not in sampled and id not in targets]
+    self._analyze_graph()
+
+  def updated(
+    self, events: Dict[int, Event], ages: Dict[int, Weights], changed: Iterable[int]
+  ) -> "BranchIndex":
+    # 增量更新：只重建变化的事件以及分支指向它们的事件的分支表，图分析整体重做（很快）。
+    # 年龄的范围变化时应当重新构建整个索引。
+    changed = set(changed)
+    rebuild = set(changed)
+    for id, groups in self.tables.items():
+      if any(target.id in changed for _, entries in groups for _, target in entries):
+        rebuild.add(id)
+    rebuild.update(id for id, target in self.missing if target in changed)
+    result = BranchIndex.__new__(BranchIndex)
+    result._domain = self._domain
+    result.tables = {id: groups for id, groups in self.tables.items() if id not in rebuild}
+    result.missing = [item for item in self.missing if item[0] not in rebuild]
+    result.dead = [item for item in self.dead if item[0] not in rebuild]
+    for id in rebuild:
+      event = events.get(id)
+      if event is not None:
+        result._build_table(event, events)
+    result._analyze(events, ages)
+    return result
+
+  def _analyze_graph(self) -> None:
+    # Tarjan 强连通分量，同时计算最长链
+    graph = {
+      id: [target.id for _, entries in groups for _, target in entries]
+      for id, groups in self.tables.items()
+    }
+    index: Dict[int, int] = {}
+    low: Dict[int, int] = {}
+    stack: List[int] = []
+    on_stack: Set[int] = set()
+    self.cycles = []
+    self.depth = {}
+
+    def visit(node: int) -> None:
+      index[node] = low[node] = len(index)
+      stack.append(node)
+      on_stack.add(node)
+      for next in graph.get(node, []):
+        if next not in index:
+          visit(next)
+          low[node] = min(low[node], low[next])
+        elif next in on_stack:
+          low[node] = min(low[node], index[next])
+      if low[node] == index[node]:
+        component: List[int] = []
+        while True:
+          item = stack.pop()
+          on_stack.remove(item)
+          component.append(item)
+          if item == node:
+            break
+        if len(component) > 1 or node in graph.get(node, []):
+          self.cycles.append(sorted(component))
+          for item in component:
+            self.depth[item] = None
+        else:
+          # 强连通分量按逆拓扑序产生，后继已经计算过
+          depths = [self.depth[next] for next in graph.get(node, [])]
+          if any(depth is None for depth in depths):
+            self.depth[node] = None
+          else:
+            self.depth[node] = 1 + max(cast(List[int], depths), default=0)
+
+    for node in graph:
+      if node not in index:
+        visit(node)
+
+  def next(self, event: Event, slots: Sequence[Any]) -> Optional[Event]:
+    groups = self.tables.get(event.id)
+    if groups is None:
+      return None
+    for prefix, entries in groups:
+      if prefix.evaluate(slots):
+        for rest, target in entries:
+          if rest.evaluate(slots):
+            return target
+    return None
+
+  def stats(self) -> Dict[str, Any]:
+    depths = [depth for depth in self.depth.values() if depth is not None]
+    return {
+      "branching_events": len(self.tables),
+      "branches": sum(len(entries) for groups in self.tables.values() for _, entries in groups),
+      "prefix_groups": sum(len(groups) for groups in self.tables.values()),
+      "max_depth": max(depths, default=0),
+      "cycles": len(self.cycles),
+      "missing": len(self.missing),
+      "dead": len(self.dead),
+      "orphans": len(self.orphans),
+    }
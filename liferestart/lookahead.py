@@ -0,0 +1,269 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from random import Random
+from typing import (
+  Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+)
+
+from . import Game
+from .condition import BoolCondition, Condition, VarCondition
+from .dataset import Dataset
+from .state import HIGH, LOW, Slot
+from .struct.achievement import Opportunity
+from .struct.event import Event
+
+# 不抽样，精确计算下一年所有可能的结果及其概率，不消耗游戏的随机数。
+# 下一年只有两处随机：天赋的随机属性（RDM，5 个属性等概率）和按权重抽取事件，
+# 分支、天赋和成就的条件都是确定的。在复制出的游戏上用“剧本”代替随机数，
+# 深度优先地枚举每一处随机的所有选项。
+# 结果只取决于这一年会用到的条件读取的变量，按这些变量的值缓存，相同状态的游戏直接复用。
+
+SET_SLOTS = (Slot.TLT, Slot.EVT, Slot.ATLT, Slot.AEVT)
+STAT_SLOTS = (Slot.CHR, Slot.INT, Slot.STR, Slot.MNY, Slot.SPR)
+CACHE_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class Outcome:
+  probability: float
+  talents: Tuple[int, ...]  # 发动的天赋
+  events: Tuple[int, ...]  # 依次发生的事件，包括分支
+  achievements: Tuple[int, ...]
+  deltas: Tuple[float, ...]  # 颜值、智力、体质、家境、快乐的变化
+  age: int  # 这一年之后的年龄，事件可能改变年龄
+  alive: bool
+
+
+@dataclass(frozen=True)
+class Lookahead:
+  outcomes: Tuple[Outcome, ...]  # 按概率从大到小
+
+  def total(self) -> float:
+    # 通常是 1；没有可以发生的事件时（引擎在这种情况下会抛出异常）这部分概率不计入
+    return sum(outcome.probability for outcome in self.outcomes)
+
+  def _marginal(self, items: Iterable[Tuple[Iterable[int], float]]) -> Dict[int, float]:
+    result: Dict[int, float] = {}
+    for ids, probability in items:
+      for id in set(ids):
+        result[id] = result.get(id, 0.0) + probability
+    return dict(sorted(result.items(), key=lambda item: (-item[1], item[0])))
+
+  def events(self) -> Dict[int, float]:
+    # 每个事件在下一年发生的概率
+    return self._marginal((outcome.events, outcome.probability) for outcome in self.outcomes)
+
+  def talents(self) -> Dict[int, float]:
+    return self._marginal((outcome.talents, outcome.probability) for outcome in self.outcomes)
+
+  def achievements(self) -> Dict[int, float]:
+    return self._marginal(
+      (outcome.achievements, outcome.probability) for outcome in self.outcomes)
+
+  def deltas(self) -> Dict[Tuple[Tuple[float, ...], bool], float]:
+    # (属性变化, 是否存活) 的分布
+    result: Dict[Tuple[Tuple[float, ...], bool], float] = {}
+    for outcome in self.outcomes:
+      key = (outcome.deltas, outcome.alive)
+      result[key] = result.get(key, 0.0) + outcome.probability
+    return dict(sorted(result.items(), key=lambda item: -item[1]))
+
+  def death(self) -> float:
+    return sum(outcome.probability for outcome in self.outcomes if not outcome.alive)
+
+
+class _Branch(Exception):
+  def __init__(self, options: List[Tuple[int, float]]) -> None:
+    super().__init__()
+    self.options = options
+
+
+class _NoEvent(Exception):
+  pass
+
+
+class _ScriptedRandom(Random):
+  # 代替 random.Random，按剧本返回选择；剧本用完时抛出 _Branch，列出这一处的所有选项
+  script: Sequence[Tuple[int, float]]
+  position: int
+
+  def __init__(self, script: Sequence[Tuple[int, float]]) -> None:
+    super().__init__(0)
+    self.script = script
+    self.position = 0
+
+  def _next(self, options: List[Tuple[int, float]]) -> int:
+    if self.position < len(self.script):
+      index = self.script[self.position][0]
+      self.position += 1
+      return index
+    raise _Branch(options)
+
+  def randint(self, a: int, b: int) -> int:
+    count = b - a + 1
+    return a + self._next([(i, 1 / count) for i in range(count)])
+
+  def choices(
+    self, population: Any, weights: Any = None, *, cum_weights: Any = None, k: int = 1
+  ) -> List[Any]:
+    # Game 只用 choices(population, weights)
+    assert weights is not None and cum_weights is None and k == 1
+    total = sum(weights)
+    if not population or total <= 0:
+      raise _NoEvent
+    return [population[self._next([
+      (i, weight / total) for i, weight in enumerate(weights) if weight > 0])]]
+
+
+Reads = Tuple[FrozenSet[int], Tuple[Tuple[int, FrozenSet[int]], ...]]
+
+
+def _collect(condition: Condition, slots: Set[int], ids: Dict[int, Set[int]]) -> None:
+  if isinstance(condition, BoolCondition):
+    _collect(condition.left, slots, ids)
+    _collect(condition.right, slots, ids)
+  elif isinstance(condition, VarCondition) and condition.slot is not None:
+    slot = condition.slot
+    if slot in SET_SLOTS:
+      ids.setdefault(slot, set()).update(condition.ids())
+      return
+    slots.add(slot)
+    # 最大、最小值在加减属性时由当前值更新，也取决于当前值
+    if Slot.HAGE <= slot < Slot.LCHR:
+      slots.add(slot - HIGH)
+    elif Slot.LCHR <= slot < Slot.TLT:
+      slots.add(slot - LOW)
+
+
+def _reads(conditions: Iterable[Condition]) -> Reads:
+  slots: Set[int] = set()
+  ids: Dict[int, Set[int]] = {}
+  for condition in conditions:
+    _collect(condition, slots, ids)
+  return frozenset(slots), tuple(sorted((slot, frozenset(value)) for slot, value in ids.items()))
+
+
+_year_reads: Dict[Tuple[str, int], Tuple[Reads, FrozenSet[int]]] = {}
+_cache: "OrderedDict[Hashable, Lookahead]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def clear_cache() -> None:
+  # 清空按状态缓存的结果，每年会读取的变量不受影响
+  with _lock:
+    _cache.clear()
+
+
+def _year(dataset: Dataset, age: int) -> Tuple[Reads, FrozenSet[int]]:
+  # 这一年的候选事件、它们能到达的分支事件、以及过程中的成就会读取的变量，按数据和年龄缓存
+  key = (dataset.version, age)
+  result = _year_reads.get(key)
+  if result is not None:
+    return result
+  conditions: List[Condition] = []
+  seen: Set[int] = set()
+  stack = list(dataset.age.get(age, {}))
+  while stack:
+    id = stack.pop()
+    event = dataset.events.get(id)
+    if id in seen or event is None:
+      continue
+    seen.add(id)
+    conditions.extend((event.include, event.exclude))
+    for target, condition in event.branch:
+      conditions.append(condition)
+      stack.append(target)
+  # 事件可能改变年龄，所以包括所有年龄的成就
+  achievements = [
+    achievement for achievement in dataset.achievements.values()
+    if achievement.opportunity == Opportunity.TRAJECTORY
+  ]
+  conditions.extend(achievement.condition for achievement in achievements)
+  result = _year_reads[key] = (
+    _reads(conditions), frozenset(achievement.id for achievement in achievements))
+  return result
+
+
+def signature(game: Game) -> Hashable:
+  # 下一年的结果只取决于这些值
+  values = game.values
+  age = values[Slot.AGE] + 1
+  (slots, ids), achievements = _year(game.dataset, age)
+  pending = game.pending_talents
+  talent_slots, talent_ids = _reads(talent.condition for talent, _ in pending)
+  id_reads: Dict[int, FrozenSet[int]] = dict(ids)
+  for slot, value in talent_ids:
+    id_reads[slot] = id_reads.get(slot, frozenset()) | value
+  return (
+    game.dataset.version,
+    age,
+    tuple((slot, values[slot]) for slot in sorted(slots | talent_slots)),
+    tuple((slot, frozenset(values[slot] & value)) for slot, value in sorted(id_reads.items())),
+    tuple((talent.id, executed) for talent, executed in pending),
+    frozenset(game.statistics.achievements & achievements),
+  )
+
+
+def _explore(game: Game) -> Lookahead:
+  before = [game.values[slot] for slot in STAT_SLOTS]
+  merged: Dict[Tuple[Any, ...], float] = {}
+  # 抽取事件之前的选择（天赋的随机属性）相同时候选事件也相同，只计算一次
+  candidates: Dict[Tuple[Tuple[int, float], ...], Tuple[List[Event], List[float]]] = {}
+  stack: List[Tuple[Tuple[int, float], ...]] = [()]
+  while stack:
+    script = stack.pop()
+    random = _ScriptedRandom(script)
+    child = game.fork(random)
+    compute = child.event_candidates
+
+    def event_candidates() -> Tuple[List[Event], List[float]]:
+      prefix = tuple(script[:random.position])
+      if prefix not in candidates:
+        candidates[prefix] = compute()
+      return candidates[prefix]
+    child.event_candidates = event_candidates
+    try:
+      progress = child.next_year()
+    except _Branch as branch:
+      stack.extend(script + (option,) for option in reversed(branch.options))
+      continue
+    except _NoEvent:
+      continue
+    probability = 1.0
+    for _, p in script:
+      probability *= p
+    values = child.values
+    key = (
+      tuple(talent.id for talent in progress.talents),
+      tuple(event.id for event, _ in progress.events),
+      tuple(achievement.id for achievement in progress.achievements),
+      tuple(values[slot] - value for slot, value in zip(STAT_SLOTS, before)),
+      values[Slot.AGE],
+      child.alive,
+    )
+    merged[key] = merged.get(key, 0.0) + probability
+  outcomes = [Outcome(probability, *key) for key, probability in merged.items()]
+  outcomes.sort(key=lambda outcome: -outcome.probability)
+  return Lookahead(tuple(outcomes))
+
+
+def lookahead(game: Game, cache: bool = True) -> Lookahead:
+  # game 必须已经开始（progress() 产生了出生那一年）。按 Game 默认的方式抽取事件，
+  # 覆盖了 _choose_event 的子类（例如重要性抽样）的结果不适用
+  if not game.alive:
+    return Lookahead(())
+  key: Optional[Hashable] = signature(game) if cache else None
+  if key is not None:
+    with _lock:
+      result = _cache.get(key)
+      if result is not None:
+        _cache.move_to_end(key)
+        return result
+  result = _explore(game)
+  if key is not None:
+    with _lock:
+      _cache[key] = result
+      if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+  return result
@@ -0,0 +1,138 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, FrozenSet, List, Mapping, Optional, Sequence
+
+from . import Game, Statistics
+from .config import Config
+from .rng import PhiloxRandom
+
+# 公共随机数（CRN）配对模拟：第 i 局在每个配置下都使用 PhiloxRandom(seed, stream=i)，
+# 并且每一年开始时定位到第几年对应的固定块，所以不同配置在同一局、同一年看到相同的均匀随机数，
+# 配置之间的差异不再被局与局之间的噪声淹没。
+
+Setup = Callable[[Game], None]
+
+BLOCKS_PER_AGE = 1 << 16
+
+
+@dataclass(frozen=True)
+class Life:
+  overall: int
+  age: int
+  achievements: FrozenSet[int]
+
+
+@dataclass
+class Difference:
+  mean: float  # b - a 的均值
+  variance: float  # 配对估计量的方差
+  independent_variance: float  # 同样局数的独立模拟的方差
+
+  @property
+  def std_error(self) -> float:
+    return math.sqrt(self.variance)
+
+  @property
+  def variance_reduction(self) -> float:
+    if self.variance:
+      return self.independent_variance / self.variance
+    return math.inf if self.independent_variance else 1.0
+
+
+def _variance(values: Sequence[float]) -> float:
+  if len(values) < 2:
+    return 0.0
+  mean = sum(values) / len(values)
+  return sum((x - mean) ** 2 for x in values) / (len(values) - 1)
+
+
+def _difference(a: Sequence[float], b: Sequence[float]) -> Difference:
+  n = len(a)
+  paired = [y - x for x, y in zip(a, b)]
+  return Difference(
+    sum(paired) / n, _variance(paired) / n, (_variance(a) + _variance(b)) / n)
+
+
+@dataclass
+class PairedResult:
+  lives: Dict[str, List[Life]]
+
+  def difference(self, a: str, b: str) -> Dict[str, Difference]:
+    left = self.lives[a]
+    right = self.lives[b]
+    return {
+      "overall": _difference([x.overall for x in left], [x.overall for x in right]),
+      "age": _difference([x.age for x in left], [x.age for x in right]),
+    }
+
+  def achievement_differences(self, a: str, b: str) -> Dict[int, Difference]:
+    left = self.lives[a]
+    right = self.lives[b]
+    ids = {id for x in [*left, *right] for id in x.achievements}
+    return {
+      id: _difference(
+        [id in x.achievements for x in left], [id in x.achievements for x in right])
+      for id in sorted(ids)
+    }
+
+
+def _setup(
+  charm: int, intelligence: int, strength: int, money: int, talents: Sequence[int], game: Game
+) -> None:
+  game.set_talents([game.dataset.talents[id] for id in talents])
+  game.set_stats(charm, intelligence, strength, money)
+
+
+def stats_setup(
+  charm: int, intelligence: int, strength: int, money: int, talents: Sequence[int] = ()
+) -> Setup:
+  # 可以被 pickle 的配置，多进程时需要
+  return partial(_setup, charm, intelligence, strength, money, tuple(talents))
+
+
+def run_life(
+  setup: Setup, index: int, seed: int = 0, config: Optional[Config] = None
+) -> Life:
+  random = PhiloxRandom(seed, stream=index)
+  game = Game(config, Statistics(), random)
+  setup(game)
+  game.start()
+  year = 0
+  while game.alive:
+    # 按经过的年数而不是年龄选块，有的事件会让年龄倒退，按年龄会重复使用同一块。块 0 留给设置天赋等
+    year += 1
+    random.seek(year * BLOCKS_PER_AGE)
+    game.next_year()
+  end = game.end()
+  return Life(end.overall, end.age, frozenset(game.statistics.achievements))
+
+
+def _run_range(
+  configs: Mapping[str, Setup], seed: int, config: Optional[Config], start: int, stop: int
+) -> Dict[str, List[Life]]:
+  return {
+    name: [run_life(setup, i, seed, config) for i in range(start, stop)]
+    for name, setup in configs.items()
+  }
+
+
+def paired_simulation(
+  configs: Mapping[str, Setup], lives: int, seed: int = 0, config: Optional[Config] = None,
+  workers: int = 1
+) -> PairedResult:
+  # 结果与 workers 无关；多进程时 configs 中的配置必须可以 pickle，例如 stats_setup 的返回值
+  if workers <= 1:
+    return PairedResult(_run_range(configs, seed, config, 0, lives))
+  chunk = -(-lives // workers)
+  ranges = [(start, min(start + chunk, lives)) for start in range(0, lives, chunk)]
+  result: Dict[str, List[Life]] = {name: [] for name in configs}
+  with ProcessPoolExecutor(workers) as executor:
+    futures = [
+      executor.submit(_run_range, dict(configs), seed, config, start, stop)
+      for start, stop in ranges]
+    for future in futures:
+      for name, items in future.result().items():
+        result[name].extend(items)
+  return PairedResult(result)
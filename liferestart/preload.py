@@ -0,0 +1,29 @@
+import gc
+
+from . import dataset
+
+
+def preload(freeze: bool = True, search: bool = False, batch: bool = False) -> None:
+  # 在 prefork 服务器 fork 之前调用，构建所有数据表和派生索引，再冻结到 GC 的永久代，
+  # 避免子进程中的循环 GC 扫描这些对象导致写时复制。冻结后不可修改的结构见 README。
+  # 默认数据集在导入时已经构建，这里构建注册的其他语言的数据集，并填充显示宽度的缓存。
+  # search=True 时同时构建搜索索引，batch=True 时预先编译 liferestart.batch 的条件（需要 numpy）。
+  from .render import str_width
+  datasets = [dataset.get_dataset(locale) for locale in dataset.locales()]
+  for item in datasets:
+    for talent in item.talents.values():
+      str_width(talent.name)
+    for achievement in item.achievements.values():
+      str_width(achievement.name)
+    for character in item.characters.values():
+      str_width(character.name)
+  if search:
+    from .search import get_index
+    get_index()
+  if batch:
+    from .batch import precompile
+    for item in datasets:
+      precompile(item)
+  if freeze:
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,232 @@
+import copy
+import dataclasses
+import json
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generator, Hashable, Iterator, List, Sequence, Tuple
+
+from . import Game
+from .condition import Condition, NoopCondition
+from .dataset import DEFAULT_DATASET, Dataset
+from .state import Slot
+from .struct.achievement import Achievement, Opportunity
+from .struct.commons import FrozenDict
+from .struct.event import Event
+from .struct.talent import Talent
+
+# 可选的性能分析。启用时把带计数和计时的函数作为实例属性替换进去，
+# 关闭时删除这些属性，Game 和 Condition 的类本身没有任何额外的判断，不启用就没有开销。
+# 条件的计数不修改共享的 Condition，而是让被分析的游戏换用条件带计数的数据副本，
+# 其他游戏（包括其他线程中的）不受影响。一个 Profiler 的计数不加锁，多个线程各用各的 Profiler。
+
+
+def data_conditions(dataset: Dataset = DEFAULT_DATASET) -> Iterator[Tuple[str, Condition]]:
+  # 数据中所有需要求值的顶层条件及其名字
+  for event in dataset.events.values():
+    yield f"event:{event.id}:include", event.include
+    yield f"event:{event.id}:exclude", event.exclude
+  for id, groups in dataset.branch_index.tables.items():
+    for i, (prefix, entries) in enumerate(groups):
+      yield f"branch:{id}:{i}", prefix
+      for j, (rest, _) in enumerate(entries):
+        yield f"branch:{id}:{i}:{j}", rest
+  for talent in dataset.talents.values():
+    yield f"talent:{talent.id}", talent.condition
+  for achievement in dataset.achievements.values():
+    yield f"achievement:{achievement.id}", achievement.condition
+
+
+class CountedCondition(Condition):
+  # 求值时计数，其余委托给原来的条件。与原来的条件相等，所以数据副本中的天赋、事件等也与原来的相等
+  def __init__(self, condition: Condition, counter: List[int]) -> None:
+    super().__init__()
+    self.condition = condition
+    self.counter = counter  # [求值次数, 为真次数]
+
+  def __call__(self, **vars: Any) -> bool:
+    return self.condition(**vars)
+
+  def evaluate(self, slots: Sequence[Any]) -> bool:
+    result = self.condition.evaluate(slots)
+    self.counter[0] += 1
+    if result:
+      self.counter[1] += 1
+    return result
+
+  def signature(self) -> Hashable:
+    return self.condition.signature()
+
+  def __eq__(self, other: object) -> bool:
+    if isinstance(other, CountedCondition):
+      other = other.condition
+    return self.condition is other
+
+  def __hash__(self) -> int:
+    return hash(self.condition)
+
+  def __repr__(self) -> str:
+    return f"CountedCondition({repr(self.condition)})"
+
+
+class Profiler:
+  conditions: Dict[str, List[int]]  # 名字 -> [求值次数, 为真次数]
+  ages: Dict[int, List[float]]  # 年龄 -> [调用次数, _execute_events 耗时]
+  chain_depth: "Counter[int]"  # 事件链长度 -> 次数
+  talents: List[float]  # [调用次数, 耗时]
+  achievements: Dict[str, List[float]]  # 时机 -> [调用次数, 耗时, 扫描的成就数]
+  _instrumented: Dict[Dataset, Dataset]  # 原来的数据 -> 带计数的副本
+  _originals: Dict[Dataset, Dataset]  # 带计数的副本 -> 原来的数据
+
+  def __init__(self) -> None:
+    self.conditions = defaultdict(lambda: [0, 0])
+    self.ages = defaultdict(lambda: [0, 0.0])
+    self.chain_depth = Counter()
+    self.talents = [0, 0.0]
+    self.achievements = defaultdict(lambda: [0, 0.0, 0])
+    self._instrumented = {}
+    self._originals = {}
+
+  def instrument(self, dataset: Dataset = DEFAULT_DATASET) -> Dataset:
+    # 条件带计数的数据副本，同一份数据只复制一次。用 Game(dataset=...) 或 game.use_dataset() 使用
+    result = self._instrumented.get(dataset)
+    if result is not None:
+      return result
+    # 同一个条件对象出现在多处时按第一个名字计数
+    wrapped: Dict[int, Condition] = {}
+    for name, condition in data_conditions(dataset):
+      if not isinstance(condition, NoopCondition) and id(condition) not in wrapped:
+        wrapped[id(condition)] = CountedCondition(condition, self.conditions[name])
+
+    def wrap(condition: Condition) -> Condition:
+      return wrapped.get(id(condition), condition)
+
+    talents = FrozenDict(
+      (id, dataclasses.replace(talent, condition=wrap(talent.condition)))
+      for id, talent in dataset.talents.items())
+    events = FrozenDict(
+      (id, dataclasses.replace(event, include=wrap(event.include), exclude=wrap(event.exclude)))
+      for id, event in dataset.events.items())
+    achievements = FrozenDict(
+      (id, dataclasses.replace(achievement, condition=wrap(achievement.condition)))
+      for id, achievement in dataset.achievements.items())
+    result = copy.copy(dataset)
+    result.talents = talents
+    result.events = events
+    result.achievements = achievements
+    result.talent_by_rarity = FrozenDict(
+      (rarity, tuple(talents[talent.id] for talent in items))
+      for rarity, items in dataset.talent_by_rarity.items())
+    result.talent_incompatibility = copy.copy(dataset.talent_incompatibility)
+    result.talent_incompatibility.talents = [
+      talents[talent.id] for talent in dataset.talent_incompatibility.talents]
+    result.trigger_index = copy.copy(dataset.trigger_index)
+    result.trigger_index.achievements = {
+      opportunity: [achievements[achievement.id] for achievement in items]
+      for opportunity, items in dataset.trigger_index.achievements.items()}
+    result.trigger_index.achievements_by_age = {
+      opportunity: {
+        age: [achievements[achievement.id] for achievement in items]
+        for age, items in by_age.items()}
+      for opportunity, by_age in dataset.trigger_index.achievements_by_age.items()}
+    result.branch_index = copy.copy(dataset.branch_index)
+    result.branch_index.tables = {
+      id: [
+        (wrap(prefix), [(wrap(rest), events[target.id]) for rest, target in entries])
+        for prefix, entries in groups]
+      for id, groups in dataset.branch_index.tables.items()}
+    self._instrumented[dataset] = result
+    self._originals[result] = dataset
+    return result
+
+  def attach(self, game: Game, conditions: bool = True) -> None:
+    # conditions=True 时这一局换用条件带计数的数据副本，detach 时换回来。
+    # 这几个阶段是 Game 内部的方法，按名字替换实例上的属性
+    if conditions:
+      game.use_dataset(self.instrument(game.dataset))
+    execute_talents: Callable[[], List[Talent]] = getattr(game, "_execute_talents")
+    execute_events: Callable[[], List[Tuple[Event, bool]]] = getattr(game, "_execute_events")
+    check_achievements: Callable[[Opportunity], List[Achievement]] = getattr(
+      game, "_check_achievements")
+    values = game.values
+    clock = time.perf_counter
+
+    def _execute_talents() -> List[Talent]:
+      start = clock()
+      result = execute_talents()
+      self.talents[0] += 1
+      self.talents[1] += clock() - start
+      return result
+
+    def _execute_events() -> List[Tuple[Event, bool]]:
+      age = values[Slot.AGE]
+      start = clock()
+      result = execute_events()
+      item = self.ages[age]
+      item[0] += 1
+      item[1] += clock() - start
+      self.chain_depth[len(result)] += 1
+      return result
+
+    def _check_achievements(opportunity: Opportunity) -> List[Achievement]:
+      scanned = len(game.dataset.trigger_index.achievements_at(opportunity, values[Slot.AGE]))
+      start = clock()
+      result = check_achievements(opportunity)
+      item = self.achievements[opportunity.name]
+      item[0] += 1
+      item[1] += clock() - start
+      item[2] += scanned
+      return result
+
+    setattr(game, "_execute_talents", _execute_talents)
+    setattr(game, "_execute_events", _execute_events)
+    setattr(game, "_check_achievements", _check_achievements)
+
+  def detach(self, game: Game) -> None:
+    for name in ("_execute_talents", "_execute_events", "_check_achievements"):
+      vars(game).pop(name, None)
+    original = self._originals.get(game.dataset)
+    if original is not None:
+      game.use_dataset(original)
+
+  @contextmanager
+  def profile(self, *games: Game, conditions: bool = True) -> Generator["Profiler", None, None]:
+    for game in games:
+      self.attach(game, conditions)
+    try:
+      yield self
+    finally:
+      for game in games:
+        self.detach(game)
+
+  def to_dict(self) -> Dict[str, Any]:
+    return {
+      "conditions": {
+        name: {"evaluations": count, "true": true, "true_rate": true / count}
+        for name, (count, true) in sorted(self.conditions.items()) if count
+      },
+      "ages": {
+        age: {"calls": calls, "seconds": seconds}
+        for age, (calls, seconds) in sorted(self.ages.items())
+      },
+      "chain_depth": dict(sorted(self.chain_depth.items())),
+      "talents": {"calls": self.talents[0], "seconds": self.talents[1]},
+      "achievements": {
+        name: {"calls": calls, "seconds": seconds, "scanned": scanned}
+        for name, (calls, seconds, scanned) in sorted(self.achievements.items())
+      },
+    }
+
+  def to_json(self, **kwargs: Any) -> str:
+    return json.dumps(self.to_dict(), **kwargs)
+
+  def collapsed(self) -> str:
+    # flamegraph.pl / speedscope 可以读取的折叠栈格式，数值为微秒
+    lines = [f"game;execute_talents {round(self.talents[1] * 1e6)}"]
+    lines.extend(
+      f"game;execute_events;age {age} {round(seconds * 1e6)}"
+      for age, (_, seconds) in sorted(self.ages.items()))
+    lines.extend(
+      f"game;check_achievements;{name} {round(seconds * 1e6)}"
+      for name, (_, seconds, _) in sorted(self.achievements.items()))
+    return "".join(f"{line}\n" for line in lines)
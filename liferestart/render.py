@@ -0,0 +1,179 @@
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import End, Progress
+from .config import Config, StatRarityItem
+from .struct.commons import Rarity
+
+# 把一整局渲染成一个字符串，适合机器人一次发送。样式决定稀有度的颜色或标记，
+# 各稀有度的前后缀预先算好，渲染时只拼接字符串，最后 join 一次。
+
+# (码位上限, 宽度)，与终端的显示宽度一致
+CHR_WIDTHS = [
+  (126, 1),
+  (159, 0),
+  (687, 1),
+  (710, 0),
+  (711, 1),
+  (727, 0),
+  (733, 1),
+  (879, 0),
+  (1154, 1),
+  (1161, 0),
+  (4347, 1),
+  (4447, 2),
+  (7467, 1),
+  (7521, 0),
+  (8369, 1),
+  (8426, 0),
+  (9000, 1),
+  (9002, 2),
+  (11021, 1),
+  (12350, 2),
+  (12351, 1),
+  (12438, 2),
+  (12442, 0),
+  (19893, 2),
+  (19967, 1),
+  (55203, 2),
+  (63743, 1),
+  (64106, 2),
+  (65039, 1),
+  (65059, 0),
+  (65131, 2),
+  (65279, 1),
+  (65376, 2),
+  (65500, 1),
+  (65510, 2),
+  (120831, 1),
+  (262141, 2),
+  (1114109, 1),
+]
+_BOUNDS = [bound for bound, _ in CHR_WIDTHS]
+_WIDTHS = [width for _, width in CHR_WIDTHS]
+# 多个线程同时写入也是安全的：每个字符的宽度是确定的，只会用相同的值覆盖，
+# 单次 dict 的读写本身是原子的（自由线程的 CPython 中 dict 有自己的锁），所以不加锁
+_width_cache: Dict[str, int] = {"\x0e": 0, "\x0f": 0}
+
+
+def char_width(c: str) -> int:
+  width = _width_cache.get(c)
+  if width is None:
+    i = bisect_left(_BOUNDS, ord(c))
+    width = _width_cache[c] = _WIDTHS[i] if i < len(_WIDTHS) else 1
+  return width
+
+
+def str_width(s: str) -> int:
+  cache = _width_cache
+  total = 0
+  for c in s:
+    width = cache.get(c)
+    total += char_width(c) if width is None else width
+  return total
+
+
+def str_pad(s: str, width: int, chr: str = " ") -> str:
+  return s + chr * max(width - str_width(s), 0)
+
+
+def format_float(value: float) -> str:
+  # 处理唯一一个属性有浮点数的角色祖冲之
+  return f"{value:.7f}".rstrip(".0") or "0"
+
+
+@dataclass(frozen=True)
+class Style:
+  rarity: Dict[Rarity, Tuple[str, str]]  # 各稀有度的前缀和后缀
+  header: Tuple[str, str]
+  escape: Dict[int, str]  # str.translate 的转换表
+  newline: str = "\n"  # 行之间的分隔，Markdown 中单独的换行不会断行
+
+  def format(self, rarity: Rarity, s: str) -> str:
+    prefix, suffix = self.rarity[rarity]
+    return prefix + s.translate(self.escape) + suffix
+
+
+PLAIN = Style({rarity: ("", "") for rarity in Rarity}, ("---- ", " ----"), {})
+ANSI = Style({
+  Rarity.COMMON: ("\033[0m", "\033[0m"),
+  Rarity.UNCOMMON: ("\033[94m", "\033[0m"),
+  Rarity.RARE: ("\033[95m", "\033[0m"),
+  Rarity.LEGENDARY: ("\033[93m", "\033[0m"),
+}, ("---- ", " ----"), {})
+MARKDOWN = Style({
+  Rarity.COMMON: ("", ""),
+  Rarity.UNCOMMON: ("*", "*"),
+  Rarity.RARE: ("**", "**"),
+  Rarity.LEGENDARY: ("***", "***"),
+}, ("### ", ""), str.maketrans({c: f"\\{c}" for c in "\\*_~`"}), "  \n")
+STYLES = {"plain": PLAIN, "ansi": ANSI, "markdown": MARKDOWN}
+
+
+def _header(style: Style, title: str) -> str:
+  return style.header[0] + title.translate(style.escape) + style.header[1]
+
+
+def render_progress(progress: Progress, style: Style = ANSI) -> List[str]:
+  lines = [
+    _header(style, "出生" if progress.age == -1 else f"{progress.age}岁"),
+    (f"颜值 {format_float(progress.charm)} 智力 {format_float(progress.intelligence)} "
+     f"体质 {format_float(progress.strength)} 家境 {format_float(progress.money)} "
+     f"快乐 {progress.spirit}").translate(style.escape),
+  ]
+  for talent in progress.talents:
+    lines.append(style.format(talent.rarity, f"天赋 {talent.name} 发动: {talent.description}"))
+  for event, has_next in progress.events:
+    if not has_next and event.post:
+      lines.append(
+        style.format(event.rarity, event.event) + style.newline
+        + style.format(event.rarity, event.post))
+    else:
+      lines.append(style.format(event.rarity, event.event))
+  for achievement in progress.achievements:
+    lines.append(style.format(
+      achievement.rarity, f"获得成就 {achievement.name}: {achievement.description}"))
+  return lines
+
+
+def _summary(label: str, value: str, item: StatRarityItem, config: Config, style: Style) -> str:
+  message = style.format(item.rarity, config.stat.rarity.messages[item.message_id])
+  return f"{label}: {value}".translate(style.escape) + f" - {message}"
+
+
+def render_end(end: End, config: Optional[Config] = None, style: Style = ANSI) -> List[str]:
+  config = Config() if config is None else config
+  lines = [_header(style, "总结")]
+  for achievement in end.achievements:
+    lines.append(style.format(
+      achievement.rarity, f"获得成就 {achievement.name}: {achievement.description}"))
+  lines.append(_summary("颜值", format_float(end.charm), end.summary_charm, config, style))
+  lines.append(_summary(
+    "智力", format_float(end.intelligence), end.summary_intelligence, config, style))
+  lines.append(_summary("体质", format_float(end.strength), end.summary_strength, config, style))
+  lines.append(_summary("家境", format_float(end.money), end.summary_money, config, style))
+  lines.append(_summary("快乐", str(end.spirit), end.summary_spirit, config, style))
+  lines.append(_summary("享年", str(end.age), end.summary_age, config, style))
+  lines.append(_summary("总评", str(end.overall), end.summary_overall, config, style))
+  return lines
+
+
+def render_life(
+  progress: Iterable[Progress], end: Optional[End] = None, config: Optional[Config] = None,
+  style: Style = ANSI
+) -> str:
+  # progress 可以是 game.progress()，也可以是 LifeTrace
+  lines: List[str] = []
+  for item in progress:
+    lines.extend(render_progress(item, style))
+  if end is not None:
+    lines.extend(render_end(end, config, style))
+  return style.newline.join(lines) + "\n"
+
+
+def render_life_bytes(
+  progress: Iterable[Progress], end: Optional[End] = None, config: Optional[Config] = None,
+  style: Style = ANSI
+) -> bytes:
+  return render_life(progress, end, config, style).encode()
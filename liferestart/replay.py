@@ -0,0 +1,234 @@
+import base64
+import hashlib
+import json
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from . import End, Game, Statistics
+from .config import Config
+from .data import DATASET_VERSION
+from .dataset import DEFAULT_DATASET, Dataset, find_dataset
+from .trace import LifeTrace
+
+# 一局游戏完全由种子、抽天赋的次数、选择的天赋、属性、开局前的 Statistics 和数据版本决定。
+# ReplayRecord 只保存这些输入，可以重放出同样的一局，也可以作为分享结果的凭证。
+
+
+@dataclass(frozen=True)
+class ReplayRecord:
+  seed: int
+  talents: Tuple[int, ...]
+  stats: Tuple[float, float, float, float]
+  rerolls: int = 0  # 选择天赋前调用 random_talents 抽取的次数，名人模式为 0
+  fast: bool = False  # random_talents 的 fast 参数
+  # 开局前的 Statistics，条件中的 ATLT、AEVT、TMS 以及天赋权重会用到
+  seen_talents: Tuple[int, ...] = ()
+  seen_events: Tuple[int, ...] = ()
+  achievements: Tuple[int, ...] = ()
+  finished_games: int = 0
+  dataset: str = DATASET_VERSION  # Dataset.version
+
+  @classmethod
+  def create(
+    cls, seed: int, talents: Sequence[int], stats: Sequence[float], statistics: Statistics,
+    rerolls: int = 0, fast: bool = False, dataset: Optional[Dataset] = None
+  ) -> "ReplayRecord":
+    # statistics 必须是开局前（set_talents 之前）的状态，dataset 是这一局使用的数据（game.dataset）
+    dataset = DEFAULT_DATASET if dataset is None else dataset
+    return cls(
+      seed, tuple(talents), (stats[0], stats[1], stats[2], stats[3]), rerolls, fast,
+      tuple(sorted(statistics.talents)), tuple(sorted(statistics.events)),
+      tuple(sorted(statistics.achievements)), statistics.finished_games, dataset.version)
+
+  def statistics(self) -> Statistics:
+    return Statistics(
+      set(self.seen_talents), set(self.seen_events), set(self.achievements), self.finished_games)
+
+  def to_dict(self) -> Dict[str, Any]:
+    return asdict(self)
+
+  @classmethod
+  def from_dict(cls, data: Dict[str, Any]) -> "ReplayRecord":
+    return cls(
+      data["seed"], tuple(data["talents"]), tuple(data["stats"]), data["rerolls"], data["fast"],
+      tuple(data["seen_talents"]), tuple(data["seen_events"]), tuple(data["achievements"]),
+      data["finished_games"], data["dataset"])
+
+  def digest(self) -> str:
+    return hashlib.sha256(
+      json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+  def to_token(self) -> str:
+    # 可以直接发给其他玩家的短字符串
+    data = json.dumps(self.to_dict(), sort_keys=True, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(zlib.compress(data, 9)).decode().rstrip("=")
+
+  @classmethod
+  def from_token(cls, token: str) -> "ReplayRecord":
+    data = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    return cls.from_dict(json.loads(zlib.decompress(data)))
+
+
+@dataclass
+class Replay:
+  trace: LifeTrace
+  end: End
+
+
+def record_dataset(record: ReplayRecord, dataset: Optional[Dataset] = None) -> Dataset:
+  # 记录使用的数据。不指定 dataset 时按版本查找（见 dataset.find_dataset），
+  # 指定时版本必须相同；找不到或不同时抛出 ValueError，而不是用其他数据重放出另一局
+  if dataset is None:
+    try:
+      return find_dataset(record.dataset)
+    except KeyError:
+      raise ValueError(f"回放记录的数据版本 {record.dataset} 不在这个进程中") from None
+  if dataset.version != record.dataset:
+    raise ValueError(f"回放记录的数据版本 {record.dataset} 与指定的数据 {dataset.version} 不同")
+  return dataset
+
+
+def prepare(
+  record: ReplayRecord, config: Optional[Config] = None, dataset: Optional[Dataset] = None
+) -> Game:
+  # 按记录开始一局并设置天赋，还没有分配属性。game.get_points() 是可以分配的属性点，
+  # 天赋的替换取决于种子，所以只有这样才能得到准确的点数
+  dataset = record_dataset(record, dataset)
+  game = Game(config, record.statistics(), dataset=dataset)
+  game.seed(record.seed)
+  if record.rerolls:
+    generator = game.random_talents(record.fast)
+    for _ in range(record.rerolls):
+      next(generator)
+  game.set_talents([dataset.talents[id] for id in record.talents])
+  return game
+
+
+def replay(
+  record: ReplayRecord, config: Optional[Config] = None, dataset: Optional[Dataset] = None
+) -> Replay:
+  game = prepare(record, config, dataset)
+  game.set_stats(*record.stats)
+  trace = LifeTrace.record(game)
+  return Replay(trace, game.end())
+
+
+def end_to_dict(end: End) -> Dict[str, Any]:
+  # 结算结果的 JSON 形式，HTTP 服务和磁盘缓存使用
+  return {
+    "talents": [talent.id for talent in end.talents],
+    "achievements": [achievement.id for achievement in end.achievements],
+    "stats": [end.age, end.charm, end.intelligence, end.strength, end.money, end.spirit],
+    "overall": end.overall,
+  }
+
+
+def end_from_dict(
+  data: Dict[str, Any], config: Config, dataset: Optional[Dataset] = None
+) -> End:
+  age, charm, intelligence, strength, money, spirit = data["stats"]
+  overall = data["overall"]
+  rarity = config.stat.rarity
+  dataset = DEFAULT_DATASET if dataset is None else dataset
+  return End(
+    [dataset.talents[id] for id in data["talents"]],
+    [dataset.achievements[id] for id in data["achievements"]],
+    age, charm, intelligence, strength, money, spirit, overall,
+    Game.judge(age, rarity.age),
+    Game.judge(charm, rarity.charm),
+    Game.judge(intelligence, rarity.intelligence),
+    Game.judge(strength, rarity.strength),
+    Game.judge(money, rarity.money),
+    Game.judge(spirit, rarity.spirit),
+    Game.judge(overall, rarity.overall))
+
+
+def config_digest(config: Config) -> str:
+  # Config 是嵌套的数据类，repr 是确定的
+  return hashlib.sha256(repr(config).encode()).hexdigest()
+
+
+class ReplayCache:
+  # 以记录的哈希为键的 LRU 缓存，指定 directory 时同时保存到磁盘，
+  # 磁盘上的每个文件是 4 字节长度 + 结算的 JSON + LifeTrace 的二进制数据
+  maxsize: int
+  directory: Optional[str]
+  hits: int
+  misses: int
+  _items: "OrderedDict[str, Replay]"
+
+  def __init__(self, maxsize: int = 1024, directory: Optional[str] = None) -> None:
+    self.maxsize = maxsize
+    self.directory = directory
+    self.hits = 0
+    self.misses = 0
+    self._items = OrderedDict()
+    if directory is not None:
+      os.makedirs(directory, exist_ok=True)
+
+  def __len__(self) -> int:
+    return len(self._items)
+
+  @staticmethod
+  def key(record: ReplayRecord, config: Optional[Config] = None) -> str:
+    config = Config() if config is None else config
+    return hashlib.sha256((record.digest() + config_digest(config)).encode()).hexdigest()
+
+  def get(
+    self, record: ReplayRecord, config: Optional[Config] = None, dataset: Optional[Dataset] = None
+  ) -> Replay:
+    # 记录的哈希包括数据版本，不同数据的结果不会混在一起
+    config = Config() if config is None else config
+    dataset = record_dataset(record, dataset)
+    key = self.key(record, config)
+    result = self._items.get(key)
+    if result is not None:
+      self._items.move_to_end(key)
+      self.hits += 1
+      return result
+    result = self._load(key, config, dataset)
+    if result is None:
+      self.misses += 1
+      result = replay(record, config, dataset)
+      self._save(key, result)
+    else:
+      self.hits += 1
+    self._items[key] = result
+    if len(self._items) > self.maxsize:
+      self._items.popitem(last=False)
+    return result
+
+  def _path(self, key: str) -> str:
+    return os.path.join(self.directory or "", f"{key}.bin")
+
+  def _load(self, key: str, config: Config, dataset: Dataset) -> Optional[Replay]:
+    if self.directory is None:
+      return None
+    try:
+      with open(self._path(key), "rb") as f:
+        data = f.read()
+    except FileNotFoundError:
+      return None
+    try:
+      size, = struct.unpack_from("<I", data)
+      end = json.loads(data[4:4 + size])
+      trace = LifeTrace.from_bytes(data[4 + size:], dataset)
+    except (struct.error, ValueError):
+      # 旧格式或者不完整的文件，重新计算并覆盖
+      return None
+    return Replay(trace, end_from_dict(end, config, dataset))
+
+  def _save(self, key: str, result: Replay) -> None:
+    if self.directory is None:
+      return
+    end = json.dumps(end_to_dict(result.end), separators=(",", ":")).encode()
+    # 先写临时文件再改名，多个进程共用目录时不会读到写了一半的文件
+    path = self._path(key)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "wb") as f:
+      f.write(struct.pack("<I", len(end)) + end + result.trace.to_bytes())
+    os.replace(temp, path)
@@ -0,0 +1,185 @@
+import hashlib
+import os
+from random import Random
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple, Union
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+if TYPE_CHECKING:
+  from numpy import float64, uint32, uint64
+  from numpy.typing import NDArray
+
+Seed = Union[int, float, str, bytes, bytearray, None]
+
+# Game 接受任意 random.Random 的实例，默认的 Random 就是与原先逐位一致的后端。
+# PhiloxRandom 是基于计数器的 Philox4x32-10，可以 O(1) 跳转，
+# 不同的 stream 互不重叠，适合多个进程从同一个主种子各取一条流。
+
+MASK32 = 0xFFFFFFFF
+MASK64 = 0xFFFFFFFFFFFFFFFF
+PHILOX_M0 = 0xD2511F53
+PHILOX_M1 = 0xCD9E8D57
+PHILOX_W0 = 0x9E3779B9
+PHILOX_W1 = 0xBB67AE85
+ROUNDS = 10
+
+
+def philox(counter: Tuple[int, int, int, int], key: Tuple[int, int]) -> Tuple[int, int, int, int]:
+  c0, c1, c2, c3 = counter
+  k0, k1 = key
+  for _ in range(ROUNDS):
+    p0 = PHILOX_M0 * c0
+    p1 = PHILOX_M1 * c2
+    c0, c1, c2, c3 = (p1 >> 32) ^ c1 ^ k0, p1 & MASK32, (p0 >> 32) ^ c3 ^ k1, p0 & MASK32
+    k0 = (k0 + PHILOX_W0) & MASK32
+    k1 = (k1 + PHILOX_W1) & MASK32
+  return c0, c1, c2, c3
+
+
+def philox_numpy(
+  blocks: "NDArray[uint64]", stream: int, key: Tuple[int, int]
+) -> "NDArray[uint32]":
+  # 与 philox 逐位一致的向量化版本，返回 (len(blocks), 4) 的 uint32
+  assert np is not None, "philox_numpy 需要 numpy"
+  mask = np.uint64(MASK32)
+  shift = np.uint64(32)
+  c0: "NDArray[uint64]" = blocks & mask
+  c1: "NDArray[uint64]" = blocks >> shift
+  c2: "NDArray[uint64]" = np.full_like(blocks, stream & MASK32)
+  c3: "NDArray[uint64]" = np.full_like(blocks, stream >> 32 & MASK32)
+  k0, k1 = key
+  for _ in range(ROUNDS):
+    p0: "NDArray[uint64]" = c0 * np.uint64(PHILOX_M0)
+    p1: "NDArray[uint64]" = c2 * np.uint64(PHILOX_M1)
+    c0, c1, c2, c3 = (
+      (p1 >> shift) ^ c1 ^ np.uint64(k0), p1 & mask, (p0 >> shift) ^ c3 ^ np.uint64(k1), p0 & mask)
+    k0 = (k0 + PHILOX_W0) & MASK32
+    k1 = (k1 + PHILOX_W1) & MASK32
+  return np.stack([c0, c1, c2, c3], axis=1).astype(np.uint32)
+
+
+def _derive_key(seed: Seed) -> Tuple[int, int]:
+  if seed is None:
+    value = int.from_bytes(os.urandom(8), "little")
+  elif isinstance(seed, int):
+    value = int.from_bytes(hashlib.sha256(str(abs(seed)).encode()).digest()[:8], "little")
+  elif isinstance(seed, float):
+    # 与 random.Random 一样接受浮点数
+    value = int.from_bytes(hashlib.sha256(repr(seed).encode()).digest()[:8], "little")
+  else:
+    data = seed.encode() if isinstance(seed, str) else bytes(seed)
+    value = int.from_bytes(hashlib.sha256(data).digest()[:8], "little")
+  return value & MASK32, value >> 32
+
+
+class PhiloxRandom(Random):
+  # 计数器的低 64 位是块号，高 64 位是流号，每块产生 4 个 32 位整数
+  _key: Tuple[int, int]
+  _stream: int
+  _block: int
+  _buffer: List[int]
+
+  def __init__(self, seed: Seed = None, stream: int = 0) -> None:
+    self._stream = stream & MASK64
+    super().__init__(seed)
+
+  def seed(self, a: Seed = None, version: int = 2) -> None:
+    self._key = _derive_key(a)
+    self._block = 0
+    self._buffer = []
+    self.gauss_next = None
+
+  @property
+  def stream(self) -> int:
+    return self._stream
+
+  def _next32(self) -> int:
+    if not self._buffer:
+      block = self._block
+      words = philox(
+        (block & MASK32, block >> 32, self._stream & MASK32, self._stream >> 32), self._key)
+      self._buffer = [words[3], words[2], words[1], words[0]]
+      self._block = (block + 1) & MASK64
+    return self._buffer.pop()
+
+  def random(self) -> float:
+    # 与 random.Random 相同，用 53 位构造 [0, 1) 的浮点数
+    a = self._next32() >> 5
+    b = self._next32() >> 6
+    return (a * 67108864.0 + b) * (1.0 / 9007199254740992.0)
+
+  def getrandbits(self, k: int) -> int:
+    if k < 0:
+      raise ValueError("number of bits must be non-negative")
+    if k <= 32:
+      return self._next32() >> (32 - k)
+    result = 0
+    shift = 0
+    while k > 0:
+      word = self._next32()
+      if k < 32:
+        word >>= 32 - k
+      result |= word << shift
+      shift += 32
+      k -= 32
+    return result
+
+  def getstate(self) -> Tuple[Any, ...]:
+    return (self._key, self._stream, self._block, tuple(self._buffer), self.gauss_next)
+
+  def setstate(self, state: Tuple[Any, ...]) -> None:
+    key, self._stream, self._block, buffer, self.gauss_next = state
+    self._key = tuple(key)
+    self._buffer = list(buffer)
+
+  def jump(self, blocks: int) -> None:
+    # 跳过若干块（每块 4 个 32 位整数），丢弃缓冲区
+    self._block = (self._block + blocks) & MASK64
+    self._buffer = []
+
+  def seek(self, block: int) -> None:
+    # 定位到第 block 块的开头，用于按年份对齐的公共随机数
+    self._block = block & MASK64
+    self._buffer = []
+
+  def spawn(self, stream: int) -> "PhiloxRandom":
+    # 相同密钥的另一条流，不同的流在 2^64 块内不会重叠
+    result = PhiloxRandom.__new__(PhiloxRandom)
+    result._stream = stream & MASK64
+    result._key = self._key
+    result._block = 0
+    result._buffer = []
+    result.gauss_next = None
+    return result
+
+  def random_array(self, n: int) -> Any:
+    # 一次抽取 n 个 [0, 1) 的浮点数，有 numpy 时返回 ndarray，结果与连续调用 random() 相同
+    if np is None or self._buffer:
+      return [self.random() for _ in range(n)]
+    count = (n + 1) // 2
+    blocks: "NDArray[uint64]" = np.arange(self._block, self._block + count, dtype=np.uint64)
+    words: "NDArray[float64]" = philox_numpy(blocks, self._stream, self._key).astype(np.float64)
+    # 每块 4 个字依次组成 2 个浮点数
+    a = words[:, ::2] // 32
+    b = words[:, 1::2] // 64
+    result = ((a * 67108864.0 + b) * (1.0 / 9007199254740992.0)).ravel()
+    self._block = (self._block + count) & MASK64
+    if n % 2:
+      self._buffer = self._remaining_words()
+    return result[:n]
+
+  def _remaining_words(self) -> List[int]:
+    # random_array 为奇数时最后一块还剩两个字
+    block = (self._block - 1) & MASK64
+    words = philox(
+      (block & MASK32, block >> 32, self._stream & MASK32, self._stream >> 32), self._key)
+    return [words[3], words[2]]
+
+
+def spawn_streams(seed: Optional[int], count: int) -> List[PhiloxRandom]:
+  # 从一个主种子得到 count 条互不重叠的流，供多个进程或线程使用
+  master = PhiloxRandom(seed)
+  return [master.spawn(i) for i in range(count)]
@@ -0,0 +1,79 @@
+from random import Random
+from typing import Generic, List, Mapping, Optional, Sequence, Tuple, TypeVar
+
+K = TypeVar("K")
+T = TypeVar("T")
+
+
+class BucketSampler(Generic[K, T]):
+  # 先按权重选桶，再在桶内均匀抽取，不放回，undo() 撤销上次 undo() 之后的所有抽取。
+  # 默认模式与原先 list.remove + append 的实现在相同种子下结果完全一致：
+  # 抽中的元素用 pop 移出，撤销时按抽取顺序追加到桶尾。
+  # fast 模式使用与桶尾交换的 O(1) 删除，撤销时逆序交换回原位，分布相同但序列不同。
+  _keys: List[K]
+  _weights: List[float]
+  _items: List[List[T]]
+  _sizes: List[int]
+  _drawn: List[Tuple[int, int, T]]
+  _cum_buckets: List[int]
+  _cum_weights: List[float]
+
+  def __init__(
+    self, buckets: Mapping[K, Sequence[T]], weights: Mapping[K, float], fast: bool = False
+  ) -> None:
+    self.fast = fast
+    self._keys = list(buckets)
+    self._weights = [weights[key] for key in self._keys]
+    self._items = [list(bucket) for bucket in buckets.values()]
+    self._sizes = [len(bucket) for bucket in self._items]
+    self._drawn = []
+    self._update_weights()
+
+  def _update_weights(self) -> None:
+    self._cum_buckets = []
+    self._cum_weights = []
+    total = 0.0
+    for bucket, size in enumerate(self._sizes):
+      if size:
+        total += self._weights[bucket]
+        self._cum_buckets.append(bucket)
+        self._cum_weights.append(total)
+
+  def draw(self, random: Random) -> Optional[T]:
+    if not self._cum_buckets:
+      return None
+    bucket = random.choices(self._cum_buckets, cum_weights=self._cum_weights)[0]
+    items = self._items[bucket]
+    size = self._sizes[bucket]
+    # randrange(n) 和 choice 消耗的随机数相同
+    index = random.randrange(size)
+    if self.fast:
+      item = items[index]
+      items[index] = items[size - 1]
+      items[size - 1] = item
+    else:
+      item = items.pop(index)
+    self._drawn.append((bucket, index, item))
+    self._sizes[bucket] = size - 1
+    if size == 1:
+      self._update_weights()
+    return item
+
+  def undo(self) -> None:
+    refilled = False
+    if self.fast:
+      for bucket, index, item in reversed(self._drawn):
+        items = self._items[bucket]
+        last = self._sizes[bucket]
+        items[last] = items[index]
+        items[index] = item
+        refilled = refilled or last == 0
+        self._sizes[bucket] = last + 1
+    else:
+      for bucket, _, item in self._drawn:
+        self._items[bucket].append(item)
+        refilled = refilled or self._sizes[bucket] == 0
+        self._sizes[bucket] += 1
+    self._drawn.clear()
+    if refilled:
+      self._update_weights()
@@ -0,0 +1,185 @@
+import bisect
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .data import DATASET_VERSION
+from .dataset import DEFAULT_DATASET, Dataset
+
+# 事件、天赋、成就文本的倒排索引。中文没有分词，按相邻两个字（bigram）建立索引，
+# 查询时先用 bigram 求交集得到候选，再确认子串并排序。第一次查询时才构建。
+
+KINDS = ("talent", "achievement", "event")
+# 字段的权重，名字比描述更重要
+FIELD_WEIGHTS = {"name": 3.0, "description": 1.0, "event": 2.0, "post": 1.0}
+
+
+@dataclass(frozen=True)
+class Document:
+  kind: str
+  id: int
+  field: str
+  text: str
+
+
+@dataclass(frozen=True)
+class SearchResult:
+  kind: str
+  id: int
+  field: str
+  text: str
+  score: float
+
+
+def _grams(text: str) -> Set[str]:
+  # 单字也加入索引，这样一个字的查询同样可以走索引
+  return {text[i:i + 2] for i in range(len(text) - 1)} | set(text)
+
+
+def documents(dataset: Dataset = DEFAULT_DATASET) -> Iterable[Document]:
+  # 个别数据的描述是数字（例如“圆周率”），统一转成字符串
+  for talent in dataset.talents.values():
+    yield Document("talent", talent.id, "name", str(talent.name))
+    yield Document("talent", talent.id, "description", str(talent.description))
+  for achievement in dataset.achievements.values():
+    yield Document("achievement", achievement.id, "name", str(achievement.name))
+    yield Document("achievement", achievement.id, "description", str(achievement.description))
+  for event in dataset.events.values():
+    yield Document("event", event.id, "event", str(event.event))
+    if event.post:
+      yield Document("event", event.id, "post", str(event.post))
+
+
+class SearchIndex:
+  version: str
+  documents: List[Document]
+  postings: Dict[str, List[int]]  # gram -> 文档下标，升序
+  names: List[Tuple[str, int]]  # (小写的名字, 文档下标)，按名字排序，用于前缀查询
+  ids: Dict[int, List[int]]  # id -> 文档下标，天赋、成就、事件的 id 可能重复
+
+  def __init__(self, items: Iterable[Document], version: str = DATASET_VERSION) -> None:
+    self.version = version
+    self.documents = [item for item in items if item.text]
+    self.postings = {}
+    self.names = []
+    self.ids = {}
+    for i, document in enumerate(self.documents):
+      text = document.text.lower()
+      for gram in _grams(text):
+        self.postings.setdefault(gram, []).append(i)
+      if document.field in ("name", "event"):
+        self.names.append((text, i))
+      self.ids.setdefault(document.id, []).append(i)
+    self.names.sort()
+
+  def search(self, query: str, limit: int = 10, kind: Optional[str] = None) -> List[SearchResult]:
+    query = query.strip().lower()
+    if not query:
+      return []
+    grams = sorted(_grams(query), key=lambda gram: len(self.postings.get(gram, ())))
+    if not grams or grams[0] not in self.postings:
+      return []
+    candidates = set(self.postings[grams[0]])
+    for gram in grams[1:]:
+      candidates.intersection_update(self.postings.get(gram, ()))
+      if not candidates:
+        return []
+    best: Dict[Tuple[str, int], SearchResult] = {}
+    for i in candidates:
+      document = self.documents[i]
+      if kind is not None and document.kind != kind:
+        continue
+      text = document.text.lower()
+      position = text.find(query)
+      if position < 0:
+        continue
+      # 字段权重、匹配位置越靠前、文本越短分数越高，完全相同的最优先
+      score = FIELD_WEIGHTS[document.field] * (
+        2.0 if text == query else 1.0 / (1 + position) + len(query) / len(text))
+      key = (document.kind, document.id)
+      if key not in best or best[key].score < score:
+        best[key] = SearchResult(document.kind, document.id, document.field, document.text, score)
+    return sorted(
+      best.values(), key=lambda result: (-result.score, KINDS.index(result.kind), result.id)
+    )[:limit]
+
+  def prefix(self, prefix: str, limit: int = 10) -> List[SearchResult]:
+    prefix = prefix.lower()
+    start = bisect.bisect_left(self.names, (prefix, -1))
+    result: List[SearchResult] = []
+    for text, i in self.names[start:]:
+      if len(result) >= limit or not text.startswith(prefix):
+        break
+      document = self.documents[i]
+      result.append(SearchResult(
+        document.kind, document.id, document.field, document.text, FIELD_WEIGHTS[document.field]))
+    return result
+
+  def lookup(self, id: int, kind: Optional[str] = None) -> List[SearchResult]:
+    result: List[SearchResult] = []
+    seen: Set[str] = set()
+    for i in self.ids.get(id, ()):
+      document = self.documents[i]
+      if (kind is None or document.kind == kind) and document.kind not in seen:
+        seen.add(document.kind)
+        result.append(SearchResult(
+          document.kind, document.id, document.field, document.text, FIELD_WEIGHTS[document.field]))
+    return result
+
+  def save(self, path: str) -> None:
+    data = {
+      "version": self.version,
+      "documents": [[item.kind, item.id, item.field, item.text] for item in self.documents],
+      "postings": self.postings,
+      "names": self.names,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+      json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+  @classmethod
+  def load(cls, path: str, version: str = DATASET_VERSION) -> Optional["SearchIndex"]:
+    # 数据版本不同时返回 None
+    with open(path, encoding="utf-8") as f:
+      data = json.load(f)
+    if data["version"] != version:
+      return None
+    result = cls.__new__(cls)
+    result.version = data["version"]
+    result.documents = [Document(*item) for item in data["documents"]]
+    result.postings = data["postings"]
+    result.names = [(text, i) for text, i in data["names"]]
+    result.ids = {}
+    for i, document in enumerate(result.documents):
+      result.ids.setdefault(document.id, []).append(i)
+    return result
+
+
+_indexes: Dict[str, SearchIndex] = {}
+_lock = threading.Lock()
+
+
+def get_index(path: Optional[str] = None, dataset: Dataset = DEFAULT_DATASET) -> SearchIndex:
+  # 每个数据版本在进程内只构建一次。指定 path 时，未缓存则优先从文件读取，
+  # 文件不存在或数据版本不符时把索引写入文件
+  index = _indexes.get(dataset.version)
+  if index is not None and path is None:
+    return index
+  with _lock:
+    index = _indexes.get(dataset.version)
+    loaded = None
+    if path is not None and os.path.exists(path):
+      loaded = SearchIndex.load(path, dataset.version)
+    if index is None:
+      index = loaded or SearchIndex(documents(dataset), dataset.version)
+      _indexes[dataset.version] = index
+    if path is not None and loaded is None:
+      index.save(path)
+  return index
+
+
+def search(
+  query: str, limit: int = 10, kind: Optional[str] = None, dataset: Dataset = DEFAULT_DATASET
+) -> List[SearchResult]:
+  return get_index(dataset=dataset).search(query, limit, kind)
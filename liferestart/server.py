@@ -0,0 +1,469 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from random import getrandbits
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple, cast
+from urllib.parse import parse_qs, urlsplit
+
+from . import End, Game, Progress, Statistics, preload
+from .config import Config
+from .data import CHARACTER, TALENT, TALENT_INCOMPATIBILITY
+from .replay import ReplayRecord, end_from_dict, end_to_dict, prepare, replay
+from .simulate import SimulateOptions, simulate_chunk, check_options
+from .struct.talent import Talent
+from .trace import LifeTrace
+
+# 只依赖标准库的 HTTP/JSON 模拟服务，python -m liferestart serve 启动。
+# 计算都交给预加载了数据的进程池，等待中的请求超过上限时直接返回 429；
+# 一局开始时在进程池中算完整局（结果由输入完全决定，见 liferestart.replay），之后逐年返回。
+#
+#   GET  /talents?seed=1      抽一次天赋
+#   POST /lives               开始一局 {"seed", "talents", "stats", "rerolls"} 或 {"seed", "character"}，
+#                             属性之和必须等于可分配的点数
+#   POST /lives/<id>/next     推进一年，最后一年之后返回结算
+#   POST /simulate            批量模拟 {"seeds": [...] 或 "count"/"start", "talents", "stats", ...}
+#   GET  /metrics             纯文本的指标
+
+MAX_BODY = 1 << 20
+MAX_BATCH = 10000
+MAX_REROLLS = 10  # 重放时要在工作进程中重新抽这么多次天赋
+# 请求延迟直方图的上界（秒）
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+LIVES_WINDOW = 60.0  # 计算每秒局数的时间窗口（秒）
+REASONS = {
+  200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+  413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+  def __init__(self, status: int, message: str) -> None:
+    super().__init__(message)
+    self.status = status
+    self.message = message
+
+
+class Metrics:
+  started: float
+  requests: Dict[Tuple[str, int], int]  # (路由, 状态码) -> 次数
+  latency: Dict[str, List[int]]  # 路由 -> 各个桶的累计次数，最后一个是 +Inf
+  latency_sum: Dict[str, float]
+  lives: int
+  rejected: int
+  _recent: Deque[Tuple[float, int]]  # (完成时间, 局数)
+
+  def __init__(self) -> None:
+    self.started = time.monotonic()
+    self.requests = {}
+    self.latency = {}
+    self.latency_sum = {}
+    self.lives = 0
+    self.rejected = 0
+    self._recent = deque()
+
+  def observe(self, route: str, status: int, seconds: float) -> None:
+    self.requests[(route, status)] = self.requests.get((route, status), 0) + 1
+    buckets = self.latency.setdefault(route, [0] * (len(LATENCY_BUCKETS) + 1))
+    for i, bound in enumerate(LATENCY_BUCKETS):
+      if seconds <= bound:
+        buckets[i] += 1
+    buckets[-1] += 1
+    self.latency_sum[route] = self.latency_sum.get(route, 0.0) + seconds
+
+  def add_lives(self, count: int) -> None:
+    self.lives += count
+    self._recent.append((time.monotonic(), count))
+
+  def lives_per_second(self) -> float:
+    now = time.monotonic()
+    while self._recent and self._recent[0][0] < now - LIVES_WINDOW:
+      self._recent.popleft()
+    window = min(LIVES_WINDOW, now - self.started)
+    return sum(count for _, count in self._recent) / window if window > 0 else 0.0
+
+  def render(self, pending: int, sessions: int) -> str:
+    # Prometheus 的文本格式
+    lines = [
+      "# TYPE liferestart_requests_total counter",
+      *(
+        f'liferestart_requests_total{{route="{route}",status="{status}"}} {count}'
+        for (route, status), count in sorted(self.requests.items())
+      ),
+      "# TYPE liferestart_request_seconds histogram",
+    ]
+    for route, buckets in sorted(self.latency.items()):
+      for bound, count in zip(LATENCY_BUCKETS, buckets):
+        lines.append(f'liferestart_request_seconds_bucket{{route="{route}",le="{bound}"}} {count}')
+      lines.append(f'liferestart_request_seconds_bucket{{route="{route}",le="+Inf"}} {buckets[-1]}')
+      total = self.latency_sum[route]
+      lines.append(f'liferestart_request_seconds_sum{{route="{route}"}} {total:.6f}')
+      lines.append(f'liferestart_request_seconds_count{{route="{route}"}} {buckets[-1]}')
+    lines.extend([
+      "# TYPE liferestart_lives_total counter",
+      f"liferestart_lives_total {self.lives}",
+      "# TYPE liferestart_lives_per_second gauge",
+      f"liferestart_lives_per_second {self.lives_per_second():.3f}",
+      "# TYPE liferestart_pending gauge",
+      f"liferestart_pending {pending}",
+      "# TYPE liferestart_rejected_total counter",
+      f"liferestart_rejected_total {self.rejected}",
+      "# TYPE liferestart_sessions gauge",
+      f"liferestart_sessions {sessions}",
+      "",
+    ])
+    return "\n".join(lines)
+
+
+@dataclass
+class _Life:
+  trace: LifeTrace
+  end: End
+  year: int = 0
+
+
+def _ping() -> None:
+  pass
+
+
+def _draw_talents(seed: int, fast: bool, config: Config) -> List[int]:
+  game = Game(config)
+  game.seed(seed)
+  return [talent.id for talent in next(game.random_talents(fast))]
+
+
+def _run_life(record: ReplayRecord, config: Config) -> Tuple[bytes, Dict[str, Any]]:
+  # 进程之间只传递 id 和数字，不 pickle 数据对象
+  result = replay(record, config)
+  return result.trace.to_bytes(), end_to_dict(result.end)
+
+
+def _talent_json(talent: Talent) -> Dict[str, Any]:
+  return {
+    "id": talent.id, "name": talent.name, "description": str(talent.description),
+    "rarity": int(talent.rarity),
+  }
+
+
+def _progress_json(progress: Progress) -> Dict[str, Any]:
+  return {
+    "age": progress.age,
+    "talents": [_talent_json(talent) for talent in progress.talents],
+    "events": [
+      {"id": event.id, "event": event.event, "post": event.post if not has_next else "",
+       "rarity": int(event.rarity)}
+      for event, has_next in progress.events
+    ],
+    "achievements": [
+      {"id": achievement.id, "name": achievement.name,
+       "description": str(achievement.description), "rarity": int(achievement.rarity)}
+      for achievement in progress.achievements
+    ],
+    "stats": [
+      progress.charm, progress.intelligence, progress.strength, progress.money, progress.spirit],
+  }
+
+
+def _end_json(end: End, config: Config) -> Dict[str, Any]:
+  data = end_to_dict(end)
+  data["summary"] = {
+    name: {"rarity": int(item.rarity), "message": config.stat.rarity.messages[item.message_id]}
+    for name, item in (
+      ("age", end.summary_age), ("charm", end.summary_charm),
+      ("intelligence", end.summary_intelligence), ("strength", end.summary_strength),
+      ("money", end.summary_money), ("spirit", end.summary_spirit),
+      ("overall", end.summary_overall),
+    )
+  }
+  return data
+
+
+def _int(value: Any, name: str) -> int:
+  if not isinstance(value, int) or isinstance(value, bool):
+    raise HTTPError(400, f"{name} 必须是整数")
+  return value
+
+
+def _ids(value: Any, name: str) -> List[int]:
+  if not isinstance(value, list):
+    raise HTTPError(400, f"{name} 必须是整数数组")
+  return [_int(item, name) for item in cast(List[Any], value)]
+
+
+def _parse_stats(value: Any, config: Config) -> Tuple[int, int, int, int]:
+  stats = _ids(value, "stats")
+  if len(stats) != 4:
+    raise HTTPError(400, "stats 需要恰好 4 个数字")
+  if any(x < config.stat.min or x > config.stat.max for x in stats):
+    raise HTTPError(400, f"属性必须在 {config.stat.min} 和 {config.stat.max} 之间")
+  return stats[0], stats[1], stats[2], stats[3]
+
+
+def _parse_talents(value: Any, config: Config) -> List[int]:
+  talents = _ids(value, "talents")
+  if any(id not in TALENT for id in talents):
+    raise HTTPError(400, "未知的天赋")
+  if len(talents) > config.talent.limit:
+    raise HTTPError(400, f"最多选择 {config.talent.limit} 个天赋")
+  if TALENT_INCOMPATIBILITY.conflicts([TALENT[id] for id in talents]):
+    raise HTTPError(400, "天赋重复或互斥")
+  return talents
+
+
+def _parse_character(value: Any) -> int:
+  character = _int(value, "character")
+  if character not in CHARACTER:
+    raise HTTPError(400, "未知的名人")
+  return character
+
+
+class SimulationServer:
+  config: Config
+  max_pending: int
+  max_sessions: int
+  metrics: Metrics
+  pending: int
+  _executor: Executor
+  _sessions: "OrderedDict[int, _Life]"
+  _server: Optional[asyncio.AbstractServer]
+  _routes: Dict[Tuple[str, ...], Tuple[str, Callable[..., Awaitable[Any]]]]
+
+  def __init__(
+    self, workers: int = 1, max_pending: int = 64, max_sessions: int = 10000,
+    config: Optional[Config] = None, executor: Optional[Executor] = None
+  ) -> None:
+    # max_pending 是同时等待进程池的请求数上限；max_sessions 是保存的进行中的局数，
+    # 超出时淘汰最久未用的。executor 默认是预加载了数据的进程池
+    self.config = Config() if config is None else config
+    self.max_pending = max_pending
+    self.max_sessions = max_sessions
+    self.metrics = Metrics()
+    self.pending = 0
+    if executor is None:
+      executor = ProcessPoolExecutor(workers, initializer=preload)
+    self._executor = executor
+    self._sessions = OrderedDict()
+    self._server = None
+    # 路径中的 * 匹配任意一段，作为参数传给处理函数
+    self._routes = {
+      ("talents",): ("GET", self._talents),
+      ("lives",): ("POST", self._start_life),
+      ("lives", "*", "next"): ("POST", self._next_year),
+      ("simulate",): ("POST", self._simulate),
+      ("metrics",): ("GET", self._metrics),
+    }
+
+  async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+    # 返回实际监听的端口，port=0 时由系统分配。
+    # 先让进程池启动子进程再监听，否则 fork 出的子进程会继承已经打开的连接，
+    # 服务器关闭连接时客户端收不到 EOF
+    await asyncio.get_running_loop().run_in_executor(self._executor, _ping)
+    self._server = await asyncio.start_server(self._handle, host, port)
+    return self._server.sockets[0].getsockname()[1]
+
+  async def serve_forever(self) -> None:
+    assert self._server is not None
+    async with self._server:
+      await self._server.serve_forever()
+
+  async def close(self) -> None:
+    if self._server is not None:
+      self._server.close()
+      await self._server.wait_closed()
+    self._executor.shutdown(wait=True)
+
+  async def _submit(self, function: Callable[..., Any], *args: Any) -> Any:
+    if self.pending >= self.max_pending:
+      self.metrics.rejected += 1
+      raise HTTPError(429, "服务器繁忙，请稍后再试")
+    self.pending += 1
+    try:
+      return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+    finally:
+      self.pending -= 1
+
+  async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+      while True:
+        line = await reader.readline()
+        if not line:
+          break
+        try:
+          method, target, version = line.decode("latin-1").split()
+        except ValueError:
+          break
+        headers: Dict[str, str] = {}
+        while True:
+          line = await reader.readline()
+          if line in (b"\r\n", b"\n", b""):
+            break
+          name, _, value = line.decode("latin-1").partition(":")
+          headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0") or 0)
+        if length > MAX_BODY:
+          self._write(writer, 413, {"error": "请求体过大"}, False)
+          break
+        body = await reader.readexactly(length) if length else b""
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        status, payload = await self._dispatch(method, target, body)
+        self._write(writer, status, payload, keep_alive)
+        await writer.drain()
+        if not keep_alive:
+          break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+      pass
+    finally:
+      writer.close()
+
+  def _write(
+    self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool
+  ) -> None:
+    if isinstance(payload, str):
+      data = payload.encode()
+      content_type = "text/plain; version=0.0.4; charset=utf-8"
+    else:
+      data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+      content_type = "application/json; charset=utf-8"
+    headers = [
+      f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+      f"Content-Type: {content_type}",
+      f"Content-Length: {len(data)}",
+      f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if status == 429:
+      headers.append("Retry-After: 1")
+    writer.write(("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + data)
+
+  def _route(self, method: str, path: str) -> Tuple[str, Callable[..., Awaitable[Any]], List[str]]:
+    parts = [part for part in path.split("/") if part]
+    for pattern, (allowed, handler) in self._routes.items():
+      if len(pattern) == len(parts) and all(p in ("*", part) for p, part in zip(pattern, parts)):
+        route = "/" + "/".join("{id}" if p == "*" else p for p in pattern)
+        if method != allowed:
+          raise HTTPError(405, f"{route} 只支持 {allowed}")
+        return route, handler, [part for p, part in zip(pattern, parts) if p == "*"]
+    raise HTTPError(404, "没有这个接口")
+
+  async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+    start = time.perf_counter()
+    url = urlsplit(target)
+    route = "unknown"
+    try:
+      route, handler, args = self._route(method, url.path)
+      query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+      if body:
+        try:
+          data = json.loads(body)
+        except ValueError:
+          raise HTTPError(400, "请求体不是 JSON")
+        if not isinstance(data, dict):
+          raise HTTPError(400, "请求体必须是 JSON 对象")
+      else:
+        data = {}
+      status, payload = 200, await handler(*args, query=query, data=data)
+    except HTTPError as e:
+      status, payload = e.status, {"error": e.message}
+    except Exception as e:  # 不让单个请求的错误影响整个服务
+      status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+    self.metrics.observe(route, status, time.perf_counter() - start)
+    return status, payload
+
+  async def _talents(self, query: Dict[str, str], data: Dict[str, Any]) -> Any:
+    try:
+      seed = int(query["seed"]) if "seed" in query else getrandbits(32)
+    except ValueError:
+      raise HTTPError(400, "seed 必须是整数")
+    fast = query.get("fast", "") in ("1", "true")
+    ids = await self._submit(_draw_talents, seed, fast, self.config)
+    # 用同一个种子和 rerolls=1 开始一局即可从这次抽到的天赋中选择
+    return {"seed": seed, "talents": [_talent_json(TALENT[id]) for id in ids]}
+
+  async def _start_life(self, query: Dict[str, str], data: Dict[str, Any]) -> Any:
+    seed = _int(data["seed"], "seed") if "seed" in data else getrandbits(32)
+    if "character" in data:
+      if data.keys() & {"talents", "stats", "rerolls", "fast"}:
+        raise HTTPError(400, "名人模式不能同时指定 talents、stats、rerolls 或 fast")
+      character = CHARACTER[_parse_character(data["character"])]
+      record = ReplayRecord.create(seed, character.talents, (
+        character.charm, character.intelligence, character.strength, character.money
+      ), Statistics())
+    else:
+      talents = _parse_talents(data.get("talents", []), self.config)
+      stats = _parse_stats(data.get("stats"), self.config)
+      rerolls = _int(data.get("rerolls", 0), "rerolls")
+      if not 0 <= rerolls <= MAX_REROLLS:
+        raise HTTPError(400, f"rerolls 必须在 0 和 {MAX_REROLLS} 之间")
+      fast = bool(data.get("fast", False))
+      record = ReplayRecord.create(seed, talents, stats, Statistics(), rerolls, fast)
+      # 属性点取决于天赋（包括按种子替换的天赋），只需要抽 rerolls 次天赋，直接在这里算
+      points = prepare(record, self.config).get_points()
+      if sum(stats) != points:
+        raise HTTPError(400, f"属性之和必须等于可分配的属性点 {points}")
+    trace_bytes, end = await self._submit(_run_life, record, self.config)
+    self.metrics.add_lives(1)
+    life = _Life(LifeTrace.from_bytes(trace_bytes), end_from_dict(end, self.config))
+    id = getrandbits(63)
+    self._sessions[id] = life
+    if len(self._sessions) > self.max_sessions:
+      self._sessions.popitem(last=False)
+    return {"id": str(id), "seed": seed, "record": record.to_token(), **self._advance(life)}
+
+  def _advance(self, life: _Life) -> Dict[str, Any]:
+    year = _progress_json(life.trace.progress(life.year))
+    life.year += 1
+    done = life.year >= len(life.trace)
+    return {"year": year, "end": _end_json(life.end, self.config) if done else None}
+
+  async def _next_year(self, id: str, query: Dict[str, str], data: Dict[str, Any]) -> Any:
+    try:
+      key = int(id)
+    except ValueError:
+      raise HTTPError(404, "没有这一局")
+    life = self._sessions.get(key)
+    if life is None:
+      raise HTTPError(404, "没有这一局")
+    self._sessions.move_to_end(key)
+    result = self._advance(life)
+    if result["end"] is not None:
+      del self._sessions[key]
+    return result
+
+  async def _simulate(self, query: Dict[str, str], data: Dict[str, Any]) -> Any:
+    if "seeds" in data:
+      seeds: Sequence[int] = _ids(data["seeds"], "seeds")
+    else:
+      start = _int(data.get("start", 0), "start")
+      seeds = range(start, start + _int(data.get("count", 1), "count"))
+    if len(seeds) > MAX_BATCH:
+      raise HTTPError(400, f"一次最多模拟 {MAX_BATCH} 局")
+    options = SimulateOptions(
+      _parse_talents(data["talents"], self.config) if "talents" in data else None,
+      _parse_stats(data["stats"], self.config) if "stats" in data else None,
+      _parse_character(data["character"]) if "character" in data else None,
+      bool(data.get("events", False)),
+      self.config,
+    )
+    try:
+      check_options(options)
+    except ValueError as e:
+      raise HTTPError(400, str(e))
+    lives = await self._submit(simulate_chunk, list(seeds), options)
+    self.metrics.add_lives(len(lives))
+    return {"lives": lives}
+
+  async def _metrics(self, query: Dict[str, str], data: Dict[str, Any]) -> Any:
+    return self.metrics.render(self.pending, len(self._sessions))
+
+
+async def serve(
+  host: str = "127.0.0.1", port: int = 8000, workers: int = 1, max_pending: int = 64
+) -> None:
+  server = SimulationServer(workers, max_pending)
+  port = await server.start(host, port)
+  print(f"在 http://{host}:{port} 上提供服务")
+  try:
+    await server.serve_forever()
+  finally:
+    await server.close()
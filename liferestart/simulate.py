@@ -0,0 +1,170 @@
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from random import Random
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from . import Game, Statistics
+from .config import Config
+from .dataset import DEFAULT_DATASET, Dataset, find_dataset
+from .struct.talent import Talent
+
+# 无交互地模拟多局游戏，python -m liferestart simulate 和 bench 使用。
+# 每局使用全新的 Statistics，结果只取决于种子和选项，与进程数、线程数无关。
+# 数据表加载后不可修改，每局的状态都在 Game 实例中，因此可以用多线程运行；
+# 在自由线程（free-threaded）的 CPython 上多线程可以利用多个核心，且不需要复制数据和 pickle 结果。
+
+
+@dataclass(frozen=True)
+class SimulateOptions:
+  talents: Optional[Sequence[int]] = None  # None 表示从第一次抽到的天赋中选择
+  stats: Optional[Sequence[int]] = None  # None 表示随机分配
+  character: Optional[int] = None  # 名人模式，CHARACTER 中的 id
+  events: bool = False  # 是否在结果中包含每年的事件
+  config: Config = field(default_factory=Config)
+  # 数据的版本（Dataset.version），None 表示内置数据。只传版本，多进程时不需要 pickle 数据，
+  # 工作进程中找不到这个版本时报错（见 dataset.find_dataset）
+  dataset: Optional[str] = None
+
+
+def options_dataset(options: SimulateOptions) -> Dataset:
+  if options.dataset is None:
+    return DEFAULT_DATASET
+  try:
+    return find_dataset(options.dataset)
+  except KeyError:
+    raise ValueError(f"数据版本 {options.dataset} 不在这个进程中") from None
+
+
+def check_options(options: SimulateOptions) -> None:
+  # 与 HTTP 服务相同的检查，不合法时抛出 ValueError。simulate 和命令行检查一次，
+  # simulate_life 和 simulate_chunk 不再检查
+  dataset = options_dataset(options)
+  config = options.config
+  talents = dataset.talents
+  if options.character is not None:
+    if options.character not in dataset.characters:
+      raise ValueError(f"未知的名人 {options.character}")
+    if options.talents is not None or options.stats is not None:
+      raise ValueError("名人模式不能同时指定天赋或属性")
+  if options.talents is not None:
+    unknown = [id for id in options.talents if id not in talents]
+    if unknown:
+      raise ValueError(f"未知的天赋 {', '.join(map(str, unknown))}")
+    if len(options.talents) > options.config.talent.limit:
+      raise ValueError(f"最多选择 {options.config.talent.limit} 个天赋")
+    if dataset.talent_incompatibility.conflicts([talents[id] for id in options.talents]):
+      raise ValueError("天赋重复或互斥")
+  if options.stats is not None:
+    if len(options.stats) != 4:
+      raise ValueError("属性需要恰好 4 个数字")
+    if any(x < config.stat.min or x > config.stat.max for x in options.stats):
+      raise ValueError(f"属性必须在 {config.stat.min} 和 {config.stat.max} 之间")
+    # 随机天赋和会被替换的天赋的属性点取决于种子，只能检查范围
+    if options.talents is not None and all(
+      talents[id].replacement is None for id in options.talents
+    ):
+      points = config.stat.total + sum(talents[id].points for id in options.talents)
+      if sum(options.stats) != points:
+        raise ValueError(f"属性之和必须等于可分配的属性点 {points}")
+
+
+def _random_talents(game: Game) -> List[Talent]:
+  incompatibility = game.dataset.talent_incompatibility
+  result: List[Talent] = []
+  blocked = 0
+  for talent in next(game.random_talents()):
+    if not incompatibility.is_blocked(talent, blocked):
+      result.append(talent)
+      blocked |= incompatibility.blocked([talent])
+      if len(result) == game.config.talent.limit:
+        break
+  return result
+
+
+def _random_stats(config: Config, total: int, random: Random) -> List[int]:
+  result = [config.stat.min] * 4
+  for _ in range(total):
+    result[random.choice([i for i, v in enumerate(result) if v < config.stat.max])] += 1
+  return result
+
+
+def simulate_life(seed: int, options: Optional[SimulateOptions] = None) -> Dict[str, Any]:
+  options = SimulateOptions() if options is None else options
+  dataset = options_dataset(options)
+  game = Game(options.config, Statistics(), dataset=dataset)
+  game.seed(seed)
+  if options.character is not None:
+    character = dataset.characters[options.character]
+    _, real = game.set_character(character)
+    stats: Sequence[float] = [
+      character.charm, character.intelligence, character.strength, character.money]
+  else:
+    if options.talents is None:
+      talents = _random_talents(game)
+    else:
+      talents = [dataset.talents[id] for id in options.talents]
+    real = game.set_talents(talents)
+    if options.stats is None:
+      stats = _random_stats(options.config, game.get_points(), Random(seed))
+    else:
+      stats = options.stats
+    game.set_stats(*stats)
+  events: List[List[int]] = []
+  for progress in game.progress():
+    if options.events and progress.age >= 0:
+      events.append([event.id for event, _ in progress.events])
+  end = game.end()
+  result: Dict[str, Any] = {
+    "seed": seed,
+    "talents": [talent.id for talent in real],
+    "stats": list(stats),
+    "age": end.age,
+    "overall": end.overall,
+    "final": [end.charm, end.intelligence, end.strength, end.money, end.spirit],
+    "achievements": [achievement.id for achievement in end.achievements],
+  }
+  if options.events:
+    result["events"] = events
+  return result
+
+
+def simulate_chunk(seeds: Sequence[int], options: SimulateOptions) -> List[Dict[str, Any]]:
+  # 进程池中执行的一块，HTTP 服务和名人强度表也直接调用，调用方需要先用 check_options 检查
+  return [simulate_life(seed, options) for seed in seeds]
+
+
+def simulate(
+  seeds: Iterable[int], options: Optional[SimulateOptions] = None, workers: int = 1,
+  chunk: int = 64, threads: bool = False
+) -> Iterator[List[Dict[str, Any]]]:
+  # 按种子的顺序分块产生结果，调用方可以每块写出并 flush 一次。
+  # threads=True 时使用线程池而不是进程池
+  options = SimulateOptions() if options is None else options
+  check_options(options)
+  seeds = list(seeds)
+  chunks = [seeds[i:i + chunk] for i in range(0, len(seeds), chunk)]
+  if workers <= 1:
+    for item in chunks:
+      yield simulate_chunk(item, options)
+    return
+  executor: Executor = ThreadPoolExecutor(workers) if threads else ProcessPoolExecutor(workers)
+  with executor:
+    yield from executor.map(simulate_chunk, chunks, [options] * len(chunks))
+
+
+def bench(
+  lives: int, options: Optional[SimulateOptions] = None, workers: int = 1, seed: int = 0,
+  threads: bool = False
+) -> Dict[str, Any]:
+  start = time.perf_counter()
+  count = sum(
+    len(item) for item in simulate(range(seed, seed + lives), options, workers, threads=threads))
+  seconds = time.perf_counter() - start
+  return {
+    "lives": count,
+    "workers": workers,
+    "threads": threads,
+    "seconds": round(seconds, 6),
+    "lives_per_second": round(count / seconds, 3),
+  }
@@ -0,0 +1,86 @@
+from typing import Any, Iterator, List, MutableMapping
+
+VARIABLES = (
+  "AGE", "CHR", "INT", "STR", "MNY", "SPR",
+  "HAGE", "HCHR", "HINT", "HSTR", "HMNY", "HSPR",
+  "LCHR", "LINT", "LSTR", "LMNY", "LSPR",
+  "TLT", "EVT", "ATLT", "AEVT", "TMS", "SUM",
+)
+SLOTS = {name: i for i, name in enumerate(VARIABLES)}
+
+
+class Slot:
+  # 条件变量在 GameState.slots 中的固定下标
+  AGE = 0
+  CHR = 1  # 颜值
+  INT = 2  # 智力
+  STR = 3  # 体质
+  MNY = 4  # 家境
+  SPR = 5  # 快乐
+  HAGE = 6
+  HCHR = 7
+  HINT = 8
+  HSTR = 9
+  HMNY = 10
+  HSPR = 11
+  LCHR = 12
+  LINT = 13
+  LSTR = 14
+  LMNY = 15
+  LSPR = 16
+  TLT = 17  # 当前天赋
+  EVT = 18  # 本局经历的事件
+  ATLT = 19  # 所有局选过的天赋
+  AEVT = 20  # 所有局经历的事件
+  TMS = 21  # 重开次数
+  SUM = 22  # 总评
+
+
+# 最大值、最小值相对于当前值的偏移，年龄没有最小值
+HIGH = Slot.HAGE - Slot.AGE
+LOW = Slot.LCHR - Slot.CHR
+
+
+class GameState(MutableMapping[str, Any]):
+  # 数组存储的条件变量，Condition.evaluate 直接按下标读取。
+  # 同时实现了 MutableMapping，可以像原先的 _condition_vars 字典一样按名字读写。
+  __slots__ = ("slots",)
+
+  slots: List[Any]
+
+  def __init__(self) -> None:
+    self.slots = [0] * len(VARIABLES)
+    self.slots[Slot.TLT] = set()
+    self.slots[Slot.EVT] = set()
+    self.slots[Slot.ATLT] = set()
+    self.slots[Slot.AEVT] = set()
+
+  def reset(self, slot: int, value: Any) -> None:
+    # 同时重置当前值和最大、最小值
+    slots = self.slots
+    slots[slot] = slots[slot + HIGH] = value
+    if slot != Slot.AGE:
+      slots[slot + LOW] = value
+
+  def add(self, slot: int, value: Any) -> None:
+    slots = self.slots
+    current = slots[slot] = slots[slot] + value
+    if current > slots[slot + HIGH]:
+      slots[slot + HIGH] = current
+    if slot != Slot.AGE and current < slots[slot + LOW]:
+      slots[slot + LOW] = current
+
+  def __getitem__(self, key: str) -> Any:
+    return self.slots[SLOTS[key]]
+
+  def __setitem__(self, key: str, value: Any) -> None:
+    self.slots[SLOTS[key]] = value
+
+  def __delitem__(self, key: str) -> None:
+    raise TypeError("GameState 的变量不能删除")
+
+  def __iter__(self) -> Iterator[str]:
+    return iter(VARIABLES)
+
+  def __len__(self) -> int:
+    return len(VARIABLES)
@@ -13,7 +13,7 @@ class Opportunity(Enum):
   END = 3
 
 
-@dataclass
+@dataclass(frozen=True)
 class Achievement:
   id: int
   name: str
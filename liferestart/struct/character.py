@@ -1,13 +1,13 @@
 from dataclasses import dataclass
-from typing import List
+from typing import Sequence
 
 from ..typing.character import CharacterDict
 
 
-@dataclass
+@dataclass(frozen=True)
 class Character:
   name: str
-  talents: List[int]
+  talents: Sequence[int]
   # 祖冲之的属性是唯一一个有 float 的
   charm: float  # CHR, 颜值
   intelligence: float  # INT, 智力
@@ -15,7 +15,7 @@ class Character:
   money: float  # MNY, 家境
 
 
-@dataclass
+@dataclass(frozen=True)
 class PresetCharacter(Character):
   id: int
 
@@ -25,7 +25,7 @@ class PresetCharacter(Character):
     return PresetCharacter(
       id=int(data["id"]),
       name=data["name"],
-      talents=[int(x) for x in data["talent"]],
+      talents=tuple(int(x) for x in data["talent"]),
       charm=float(property["CHR"]),
       intelligence=float(property["INT"]),
       strength=float(property["STR"]),
@@ -1,5 +1,8 @@
 from enum import IntEnum
-from typing import Dict, Iterable, TypedDict, Union
+from typing import Any, Dict, Iterable, NoReturn, Tuple, TypedDict, TypeVar, Union
+
+K = TypeVar("K")
+V = TypeVar("V")
 
 
 class Rarity(IntEnum):
@@ -13,12 +16,24 @@ class EmptyDict(TypedDict):
   pass
 
 
+class FrozenDict(Dict[K, V]):
+  # 加载后不可修改的 dict，查找与 dict 一样快，可以 pickle，多个线程可以放心共享
+  def _readonly(self, *args: Any, **kwargs: Any) -> NoReturn:
+    raise TypeError(f"{type(self).__name__} 不可修改")
+
+  __setitem__ = __delitem__ = __ior__ = _readonly  # type: ignore
+  clear = pop = popitem = setdefault = update = _readonly  # type: ignore
+
+  def __reduce__(self) -> Tuple[Any, ...]:
+    return (type(self), (dict(self),))
+
+
 Weights = Dict[int, float]
 Age = Dict[int, Weights]
 
 
 def parse_weights(items: Iterable[Union[int, str]]) -> Weights:
-  result: Weights = {}
+  result: Dict[int, float] = {}
   for item in items:
     if isinstance(item, str):
       if "*" in item:
@@ -28,4 +43,4 @@ def parse_weights(items: Iterable[Union[int, str]]) -> Weights:
         result[int(item)] = 1
     else:
       result[item] = 1
-  return result
+  return FrozenDict(result)
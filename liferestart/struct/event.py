@@ -1,12 +1,12 @@
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Tuple
 
 from ..condition import Condition
 from ..typing.event import EventDict
 from .commons import Rarity
 
 
-@dataclass
+@dataclass(frozen=True)
 class Event:
   id: int
   event: str
@@ -22,7 +22,7 @@ class Event:
   spirit: int  # SPR, 快乐
 
   no_random: bool
-  branch: List[Tuple[int, Condition]]
+  branch: Tuple[Tuple[int, Condition], ...]
   include: Condition
   exclude: Condition
 
@@ -44,10 +44,10 @@ class Event:
       money=effect.get("MNY", 0),
       spirit=effect.get("SPR", 0),
       no_random=bool(data.get("NoRandom", 0)),
-      branch=[
+      branch=tuple(
         (int(id), Condition.parse(cond))
         for cond, id in (x.split(":") for x in data.get("branch", []))
-      ],
+      ),
       include=Condition.parse(include) if include else Condition.TRUE,
       exclude=Condition.parse(exclude) if exclude else Condition.FALSE,
     )
@@ -1,15 +1,15 @@
 import re
 from dataclasses import dataclass
-from typing import Literal, Set, Union
+from typing import FrozenSet, Literal, Union
 
 from ..condition import Condition
 from ..typing.talent import GradeReplacementDict, TalentDict, TalentReplacementDict
-from .commons import EmptyDict, Rarity, Weights, parse_weights
+from .commons import EmptyDict, FrozenDict, Rarity, Weights, parse_weights
 
 MAX_EXECUTE_RE = re.compile(r"AGE\s*\?\s*\[((?:\s*(?:\d+)\s*,)*\s*(?:\d+))\s*,?\s*\]")
 
 
-@dataclass
+@dataclass(frozen=True)
 class Talent:
   # 基本属性
   id: int
@@ -30,7 +30,7 @@ class Talent:
   condition: Condition
   max_execute: int
   exclusive: bool
-  imcompatible: Set[int]  # exclude
+  imcompatible: FrozenSet[int]  # exclude
   replacement: Literal[None, "rarity", "talent"]
   weights: Weights
 
@@ -49,7 +49,7 @@ class Talent:
       replacement_weights = parse_weights(replacement["talent"])
     else:
       replacement_type = None
-      replacement_weights = {}
+      replacement_weights = FrozenDict[int, float]()
     if match := MAX_EXECUTE_RE.search(condition):
       max_execute = len(match[1].split(","))
     else:
@@ -69,7 +69,7 @@ class Talent:
       condition=Condition.parse(condition) if condition else Condition.TRUE,
       max_execute=max_execute,
       exclusive=bool(data.get("exclusive", 0)),
-      imcompatible={int(x) for x in data.get("exclude", [])},
+      imcompatible=frozenset(int(x) for x in data.get("exclude", [])),
       replacement=replacement_type,
       weights=replacement_weights,
     )
@@ -0,0 +1,214 @@
+import json
+import struct
+import sys
+from array import array
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from . import Game, Progress
+from .dataset import DEFAULT_DATASET, Dataset, find_dataset
+from .struct.achievement import Achievement
+from .struct.event import Event
+from .struct.talent import Talent
+
+# 按列存储的一局游戏。每年一行，事件、天赋、成就是变长的，用 offsets 分段（CSR），
+# 全部是 array，只在访问 Progress、Event 等时才从数据表中查出对象。
+# 属性用 double 保存，祖冲之等预设角色的属性不是整数。
+# 保存时记录数据版本，读取时按版本找回数据（见 dataset.find_dataset），找不到时拒绝读取。
+
+MAGIC = b"LRT3"
+STATS = 5  # 颜值、智力、体质、家境、快乐
+# 二进制格式中各列的顺序和类型
+COLUMNS = (
+  ("ages", "h"),
+  ("event_offsets", "I"),
+  ("event_ids", "i"),
+  ("event_next", "B"),
+  ("talent_offsets", "I"),
+  ("talent_ids", "i"),
+  ("achievement_offsets", "I"),
+  ("achievement_ids", "i"),
+  ("stats", "d"),
+)
+
+
+class LifeTrace:
+  dataset: Dataset
+  ages: "array[int]"
+  event_offsets: "array[int]"
+  event_ids: "array[int]"
+  event_next: "array[int]"  # 该事件之后是否还有分支事件
+  talent_offsets: "array[int]"
+  talent_ids: "array[int]"
+  achievement_offsets: "array[int]"
+  achievement_ids: "array[int]"
+  stats: "array[float]"  # 每年 STATS 个
+
+  def __init__(self, dataset: Optional[Dataset] = None) -> None:
+    self.dataset = DEFAULT_DATASET if dataset is None else dataset
+    for name, typecode in COLUMNS:
+      setattr(self, name, array(typecode))
+    self.event_offsets.append(0)
+    self.talent_offsets.append(0)
+    self.achievement_offsets.append(0)
+
+  def append(
+    self, age: int, events: Iterable[Tuple[Event, bool]], talents: Iterable[Talent],
+    achievements: Iterable[Achievement], stats: Iterable[float]
+  ) -> None:
+    self.ages.append(age)
+    for event, has_next in events:
+      self.event_ids.append(event.id)
+      self.event_next.append(has_next)
+    self.event_offsets.append(len(self.event_ids))
+    self.talent_ids.extend(talent.id for talent in talents)
+    self.talent_offsets.append(len(self.talent_ids))
+    self.achievement_ids.extend(achievement.id for achievement in achievements)
+    self.achievement_offsets.append(len(self.achievement_ids))
+    self.stats.extend(stats)
+
+  def append_progress(self, progress: Progress) -> None:
+    self.append(
+      progress.age, progress.events, progress.talents, progress.achievements,
+      (progress.charm, progress.intelligence, progress.strength, progress.money, progress.spirit))
+
+  @classmethod
+  def from_progress(
+    cls, progress: Iterable[Progress], dataset: Optional[Dataset] = None
+  ) -> "LifeTrace":
+    # dataset 是产生 progress 的游戏使用的数据
+    result = cls(dataset)
+    for item in progress:
+      result.append_progress(item)
+    return result
+
+  @classmethod
+  def record(cls, game: Game) -> "LifeTrace":
+    # 直接推进游戏并记录，不经过 progress() 生成器，结果与 from_progress(game.progress()) 相同
+    result = cls(game.dataset)
+    result.append_progress(game.start())
+    while game.alive:
+      result.append_progress(game.next_year())
+    return result
+
+  def __len__(self) -> int:
+    return len(self.ages)
+
+  def event_slice(self, year: int) -> Tuple[int, int]:
+    return self.event_offsets[year], self.event_offsets[year + 1]
+
+  def events(self, year: int) -> List[Tuple[Event, bool]]:
+    start, stop = self.event_slice(year)
+    events = self.dataset.events
+    return [(events[self.event_ids[i]], bool(self.event_next[i])) for i in range(start, stop)]
+
+  def talents(self, year: int) -> List[Talent]:
+    start, stop = self.talent_offsets[year], self.talent_offsets[year + 1]
+    talents = self.dataset.talents
+    return [talents[id] for id in self.talent_ids[start:stop]]
+
+  def achievements(self, year: int) -> List[Achievement]:
+    start, stop = self.achievement_offsets[year], self.achievement_offsets[year + 1]
+    achievements = self.dataset.achievements
+    return [achievements[id] for id in self.achievement_ids[start:stop]]
+
+  def progress(self, year: int) -> Progress:
+    # 整数属性还原为 int，与游戏直接给出的 Progress 一致
+    charm, intelligence, strength, money = [
+      int(value) if value.is_integer() else value
+      for value in self.stats[year * STATS:year * STATS + 4]]
+    return Progress(
+      self.ages[year], self.talents(year), self.events(year), self.achievements(year),
+      charm, intelligence, strength, money, int(self.stats[year * STATS + 4]))
+
+  def __iter__(self) -> Iterator[Progress]:
+    for year in range(len(self)):
+      yield self.progress(year)
+
+  def __eq__(self, other: object) -> bool:
+    if not isinstance(other, LifeTrace):
+      return NotImplemented
+    return self.dataset.version == other.dataset.version and all(
+      getattr(self, name) == getattr(other, name) for name, _ in COLUMNS)
+
+  def to_bytes(self) -> bytes:
+    # 小端序，魔数和数据版本（16 个字符）之后是各列的长度，然后依次是各列的数据
+    columns: List["array[Any]"] = [getattr(self, name) for name, _ in COLUMNS]
+    if sys.byteorder == "big":
+      columns = [column[:] for column in columns]
+      for column in columns:
+        column.byteswap()
+    header = struct.pack(
+      f"<4s16s{len(COLUMNS)}I", MAGIC, self.dataset.version.encode(),
+      *(len(column) for column in columns))
+    return header + b"".join(column.tobytes() for column in columns)
+
+  @classmethod
+  def from_bytes(cls, data: bytes, dataset: Optional[Dataset] = None) -> "LifeTrace":
+    header = struct.Struct(f"<4s16s{len(COLUMNS)}I")
+    magic, version, *lengths = header.unpack_from(data)
+    if magic != MAGIC:
+      raise ValueError("不是 LifeTrace 的二进制数据")
+    result = cls.__new__(cls)
+    result.dataset = _resolve(version.decode(), dataset)
+    offset = header.size
+    for (name, typecode), length in zip(COLUMNS, lengths):
+      column: "array[Any]" = array(typecode)
+      size = column.itemsize * length
+      column.frombytes(data[offset:offset + size])
+      if sys.byteorder == "big":
+        column.byteswap()
+      setattr(result, name, column)
+      offset += size
+    if offset != len(data):
+      raise ValueError("LifeTrace 的二进制数据不完整")
+    return result
+
+  def to_dict(self) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"dataset": self.dataset.version}
+    result.update((name, getattr(self, name).tolist()) for name, _ in COLUMNS)
+    return result
+
+  @classmethod
+  def from_dict(cls, data: Dict[str, Any], dataset: Optional[Dataset] = None) -> "LifeTrace":
+    result = cls.__new__(cls)
+    result.dataset = _resolve(data["dataset"], dataset)
+    for name, typecode in COLUMNS:
+      setattr(result, name, array(typecode, data[name]))
+    return result
+
+
+def _resolve(version: str, dataset: Optional[Dataset]) -> Dataset:
+  # 指定 dataset 时必须与保存的版本相同，否则按版本查找
+  if dataset is None:
+    try:
+      return find_dataset(version)
+    except KeyError:
+      raise ValueError(f"LifeTrace 的数据版本 {version} 不在这个进程中") from None
+  if dataset.version != version:
+    raise ValueError(f"LifeTrace 的数据版本 {version} 与指定的数据 {dataset.version} 不同")
+  return dataset
+
+
+def write_binary(traces: Iterable[LifeTrace], file: BinaryIO) -> None:
+  # 每条记录之前是 4 字节的长度
+  for trace in traces:
+    data = trace.to_bytes()
+    file.write(struct.pack("<I", len(data)))
+    file.write(data)
+
+
+def read_binary(file: BinaryIO, dataset: Optional[Dataset] = None) -> Iterator[LifeTrace]:
+  while size := file.read(4):
+    yield LifeTrace.from_bytes(file.read(struct.unpack("<I", size)[0]), dataset)
+
+
+def write_jsonl(traces: Iterable[LifeTrace], file: TextIO) -> None:
+  for trace in traces:
+    file.write(json.dumps(trace.to_dict(), separators=(",", ":")))
+    file.write("\n")
+
+
+def read_jsonl(file: TextIO, dataset: Optional[Dataset] = None) -> Iterator[LifeTrace]:
+  for line in file:
+    if line.strip():
+      yield LifeTrace.from_dict(json.loads(line), dataset)
@@ -1 +1,21 @@
 from . import test_condition as test_condition
+from . import test_sampler as test_sampler
+from . import test_index as test_index
+from . import test_batch as test_batch
+from . import test_rng as test_rng
+from . import test_estimate as test_estimate
+from . import test_paired as test_paired
+from . import test_conformance as test_conformance
+from . import test_profiling as test_profiling
+from . import test_trace as test_trace
+from . import test_replay as test_replay
+from . import test_simulate as test_simulate
+from . import test_search as test_search
+from . import test_render as test_render
+from . import test_statistics as test_statistics
+from . import test_dataset as test_dataset
+from . import test_threading as test_threading
+from . import test_server as test_server
+from . import test_celebrity as test_celebrity
+from . import test_lookahead as test_lookahead
+from . import test_preload as test_preload
@@ -0,0 +1,146 @@
+import gc
+import math
+import unittest
+from statistics import NormalDist
+from typing import TYPE_CHECKING, Dict, List, Sequence
+
+from liferestart import Game, Statistics
+from liferestart.condition import Condition
+from liferestart.data import TALENT
+from liferestart.dataset import DEFAULT_DATASET
+
+from .test_dataset import OVERLAY
+
+try:
+  import numpy as np
+
+  from liferestart import batch
+except ImportError:
+  np = None
+  batch = None
+
+if TYPE_CHECKING:
+  from numpy.typing import ArrayLike
+
+  from liferestart.batch import BatchResult
+
+SCALAR_LIVES = 400
+BATCH_LIVES = 5000
+ALPHA = 0.001  # 整个测试的显著性
+
+
+def ks_statistic(a: "ArrayLike", b: "ArrayLike") -> float:
+  assert np is not None
+  sorted_a = np.sort(a)
+  sorted_b = np.sort(b)
+  x = np.concatenate([sorted_a, sorted_b])
+  cdf_a = np.searchsorted(sorted_a, x, "right") / len(sorted_a)
+  cdf_b = np.searchsorted(sorted_b, x, "right") / len(sorted_b)
+  return float(np.abs(cdf_a - cdf_b).max())
+
+
+def ks_critical(m: int, n: int) -> float:
+  # 双样本 KS 检验在显著性 ALPHA 下的临界值
+  return (-0.5 * math.log(ALPHA / 2)) ** 0.5 * ((m + n) / (m * n)) ** 0.5
+
+
+class Scalar:
+  ages: List[float]
+  overall: List[float]
+  events: Dict[int, float]
+  achievements: Dict[int, float]
+
+  def __init__(self, lives: int, talents: Sequence[int]) -> None:
+    # 逐局模拟，记录寿命、总评以及每个事件、成就出现的比例
+    self.ages = []
+    self.overall = []
+    self.events = {}
+    self.achievements = {}
+    for seed in range(lives):
+      game = Game(statistics=Statistics())
+      game.seed(seed)
+      game.set_talents([TALENT[id] for id in talents])
+      game.set_stats(5, 5, 5, 5)
+      for _ in game.progress():
+        pass
+      end = game.end()
+      self.ages.append(end.age)
+      self.overall.append(end.overall)
+      for id in game.statistics.events:
+        self.events[id] = self.events.get(id, 0) + 1 / lives
+      for id in game.statistics.achievements:
+        self.achievements[id] = self.achievements.get(id, 0) + 1 / lives
+
+
+@unittest.skipIf(np is None, "需要 numpy")
+class BatchGameTestCase(unittest.TestCase):
+  def run_batch(self, n: int, talents: Sequence[int]) -> "BatchResult":
+    assert batch is not None
+    game = batch.BatchGame(n, seed=0)
+    game.set_talents([[TALENT[id] for id in talents]] * n)
+    game.set_stats(5, 5, 5, 5)
+    return game.run()
+
+  def assert_rates(
+    self, expected: Dict[int, float], actual: Dict[int, float], scalar: int, n: int
+  ) -> None:
+    # 逐项做两比例 z 检验，按项数做 Bonferroni 校正，使整体的显著性为 ALPHA。
+    # 合并比例不低于 1/scalar，避免极少出现的项的正态近似过于严格
+    ids = set(expected) | {id for id, rate in actual.items() if rate}
+    z = NormalDist().inv_cdf(1 - ALPHA / (2 * len(ids)))
+    for id in ids:
+      a = expected.get(id, 0.0)
+      b = actual.get(id, 0.0)
+      p = max((a * scalar + b * n) / (scalar + n), 1 / scalar)
+      bound = z * (p * (1 - p) * (1 / scalar + 1 / n)) ** 0.5
+      self.assertLess(abs(a - b), bound, id)
+
+  def test_distribution(self) -> None:
+    # 与逐局模拟的寿命和总评分布做双样本 KS 检验
+    scalar = Scalar(SCALAR_LIVES, [])
+    result = self.run_batch(BATCH_LIVES, [])
+    critical = ks_critical(SCALAR_LIVES, BATCH_LIVES)
+    self.assertLess(ks_statistic(scalar.ages, result.age), critical)
+    self.assertLess(ks_statistic(scalar.overall, result.overall), critical)
+    self.assertTrue((result.age >= 0).all())
+
+  def test_talents(self) -> None:
+    # 有天赋（包括随机属性）时，事件和成就的频率也应与逐局模拟一致
+    talents = [1139, 1056, 1066]
+    scalar = Scalar(SCALAR_LIVES, talents)
+    result = self.run_batch(BATCH_LIVES, talents)
+    critical = ks_critical(SCALAR_LIVES, BATCH_LIVES)
+    self.assertLess(ks_statistic(scalar.overall, result.overall), critical)
+    self.assert_rates(scalar.events, result.event_rates(), SCALAR_LIVES, BATCH_LIVES)
+    # 成就包括出生时和结算时获得的
+    self.assert_rates(scalar.achievements, result.achievement_rates(), SCALAR_LIVES, BATCH_LIVES)
+
+  def test_compiled_cache(self) -> None:
+    # 缓存不能让回收后的条件的编译结果被新对象误用
+    assert np is not None and batch is not None
+    tables = batch.get_tables()
+    first = Condition.parse("AGE>10")
+    batch._compile(first, tables)  # type: ignore
+    self.assertIn(first, tables.compiled)
+    size = len(tables.compiled)
+    del first
+    gc.collect()
+    self.assertEqual(len(tables.compiled), size - 1)
+    second = Condition.parse("AGE<10")
+    state = batch.BatchState(2, Statistics(), tables)
+    state.slots[0] = [5, 20]
+    mask = batch._compile(second, tables)  # type: ignore
+    self.assertEqual(mask(state, np.arange(2)).tolist(), [True, False])
+
+  def test_dataset(self) -> None:
+    # 叠加的数据有自己的列号，新事件与原有的事件一样可以发生
+    assert batch is not None
+    dataset = DEFAULT_DATASET.overlay(**OVERLAY)
+    game = batch.BatchGame(50, seed=0, dataset=dataset)
+    game.set_talents([[dataset.talents[90001]]] * 50)
+    game.set_stats(5, 5, 5, 5)
+    result = game.run()
+    self.assertEqual(result.event_rates()[90002], 1.0)
+    self.assertEqual(result.achievement_rates()[90001], 1.0)
+    self.assertIs(batch.get_tables(dataset), batch.get_tables(dataset))
+    self.assertIsNot(batch.get_tables(dataset), batch.get_tables())
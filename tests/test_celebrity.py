@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Any, Dict, List
+
+from liferestart.celebrity import (
+  CelebrityOutcome, CelebrityTable, celebrity_table, clear_cache, table_key
+)
+from liferestart.config import Config
+from liferestart.dataset import DEFAULT_DATASET
+from liferestart.simulate import SimulateOptions, simulate_life
+
+from .test_dataset import OVERLAY
+
+
+class CelebrityTestCase(unittest.TestCase):
+  def setUp(self) -> None:
+    self.directory = tempfile.mkdtemp()
+    clear_cache()
+
+  def tearDown(self) -> None:
+    shutil.rmtree(self.directory)
+    clear_cache()
+
+  def test_table(self) -> None:
+    table = celebrity_table(6, characters=[1, 2, 3], workers=2, directory=self.directory)
+    outcome = table.outcomes[2]
+    records = [simulate_life(seed, SimulateOptions(character=2)) for seed in range(6)]
+    self.assertEqual(outcome.lives, 6)
+    self.assertAlmostEqual(outcome.overall, sum(record["overall"] for record in records) / 6)
+    self.assertAlmostEqual(outcome.age, sum(record["age"] for record in records) / 6)
+    self.assertAlmostEqual(sum(outcome.ages), 1)
+    self.assertLessEqual(outcome.age_percentiles[0], outcome.age_percentiles[2])
+    ranked = table.rank([1, 2, 3])
+    self.assertEqual(table.best([3, 2, 1]), ranked[0])
+    self.assertTrue(all(a.overall >= b.overall for a, b in zip(ranked, ranked[1:])))
+    # 与单进程的结果相同
+    clear_cache()
+    self.assertEqual(celebrity_table(6, characters=[1, 2, 3]), table)
+
+  def test_cache(self) -> None:
+    table = celebrity_table(2, characters=[5], directory=self.directory)
+    path = os.path.join(self.directory, f"celebrity-{table.key}.json")
+    self.assertTrue(os.path.exists(path))
+    self.assertIs(celebrity_table(2, characters=[5], directory=self.directory), table)
+    clear_cache()
+    loaded = celebrity_table(2, characters=[5], directory=self.directory)
+    self.assertEqual(loaded, table)
+    self.assertEqual(CelebrityTable.from_dict(table.to_dict()), table)
+    self.assertNotEqual(celebrity_table(2, seed=1, characters=[5]).key, table.key)
+
+  def test_negative_age(self) -> None:
+    # 所有局都在出生前死亡时，寿命都计入第一段
+    records: List[Dict[str, Any]] = [
+      {"overall": 1, "age": -5, "achievements": []} for _ in range(3)]
+    outcome = CelebrityOutcome.from_records(1, records)
+    self.assertEqual(outcome.ages, (1.0,))
+    self.assertEqual(outcome.age, -5)
+
+  def test_dataset(self) -> None:
+    # 不同的数据不能共用同一张表
+    dataset = DEFAULT_DATASET.overlay(**OVERLAY)
+    config = Config()
+    self.assertNotEqual(
+      table_key(2, 0, config, [5], 5, dataset), table_key(2, 0, config, [5], 5))
@@ -1,7 +1,9 @@
 import unittest
-from typing import Dict, Set, Union
+from typing import Any, Dict, Set, Union
 
+from liferestart import Game, Statistics
 from liferestart.condition import Condition
+from liferestart.state import VARIABLES, GameState, Slot
 
 variables: Dict[str, Union[int, Set[int]]] = {
   "n1": 0,
@@ -99,3 +101,36 @@ class ConditionTestCase(unittest.TestCase):
     self.assertTrue(check('n1=0|n2<0|n3>0&n1!=0|n2>0|n3<0'))
     self.assertTrue(check('(n1>0|n1?[-10,0])&(n2>0|n3![0,1])'))
     self.assertTrue(check('(n1>0&n1?[-10,0])|(n2<0&n3![0,1])'))
+
+
+class EvaluateTestCase(unittest.TestCase):
+  def test_state(self) -> None:
+    state = GameState()
+    state.reset(Slot.CHR, 5)
+    state.add(Slot.CHR, -3)
+    state.add(Slot.CHR, 4)
+    state["TLT"] = {1001, 1002}
+    self.assertEqual((state["CHR"], state["HCHR"], state["LCHR"]), (6, 6, 2))
+    for expr in ("CHR>5&HCHR=6", "LCHR<3|INT>0", "TLT?[1001]&TLT![1003]", "(CHR>10|TLT=1002)&AGE=0"):
+      cond = Condition.parse(expr)
+      self.assertEqual(cond.evaluate(state.slots), cond(**state))
+      self.assertTrue(cond.evaluate(state.slots))
+
+  def test_mapping(self) -> None:
+    # 与原先的 _condition_vars 字典一样可以用 values()、items() 和 dict()
+    state = GameState()
+    state.reset(Slot.CHR, 5)
+    state.add(Slot.CHR, 2)
+    state["TLT"] = {1001}
+    expected: Dict[str, Any] = {name: 0 for name in VARIABLES}
+    expected.update(CHR=7, HCHR=7, LCHR=5, TLT={1001}, EVT=set(), ATLT=set(), AEVT=set())
+    self.assertEqual(dict(state), expected)
+    self.assertEqual(list(state.values()), list(expected.values()))
+    self.assertEqual(list(state.items()), list(expected.items()))
+    game = Game(statistics=Statistics())
+    game.set_talents([])
+    game.set_stats(5, 5, 5, 5)
+    game.start()
+    variables = game._condition_vars  # type: ignore
+    self.assertEqual(list(variables.values()), list(game.values))
+    self.assertEqual(dict(variables)["CHR"], game.values[Slot.CHR])
@@ -0,0 +1,28 @@
+import os
+import unittest
+from typing import Any, List
+
+from liferestart import Game
+from liferestart.conformance import check, fuzz
+from liferestart.struct.event import Event
+
+# 黄金轨迹不随包安装，从测试目录读取
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden", "traces.jsonl.gz")
+
+
+class ReversedGame(Game):
+  # 故意改变事件抽取顺序的引擎，用于确认 fuzz 能发现不一致
+  def _choose_event(self, choices: List[Event], weights: List[Any]) -> Event:
+    return super()._choose_event(choices[::-1], weights[::-1])
+
+
+class ConformanceTestCase(unittest.TestCase):
+  def test_golden(self) -> None:
+    # 完整检查较慢，这里只检查其中一部分，完整检查用 python -m liferestart.conformance check。
+    self.assertIsNone(check(GOLDEN_PATH, step=30))
+
+  def test_fuzz(self) -> None:
+    self.assertIsNone(fuzz(Game, Game, 5, seed=1))
+    divergence = fuzz(Game, ReversedGame, 20, seed=1)
+    self.assertIsNotNone(divergence)
+    self.assertTrue(divergence and divergence.field.startswith("years"))
@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from typing import Dict, List, TypedDict
+
+from liferestart import Game, Statistics, data
+from liferestart import dataset as dataset_module
+from liferestart.condition import Condition
+from liferestart.data import EVENT, TALENT
+from liferestart.dataset import (
+  DEFAULT_DATASET, Dataset, get_dataset, load_locale, locales, register_locale
+)
+from liferestart.rng import PhiloxRandom
+from liferestart.struct.achievement import Opportunity
+from liferestart.typing.achievement import AchievementDict
+from liferestart.typing.event import EventDict
+from liferestart.typing.talent import TalentDict
+
+
+class Overlay(TypedDict):
+  # Dataset.overlay 的参数
+  talents: List[TalentDict]
+  events: List[EventDict]
+  achievements: List[AchievementDict]
+  age: Dict[int, List[str]]
+
+
+OVERLAY: Overlay = {
+  "talents": [
+    {"id": 90001, "name": "测试天赋", "description": "颜值+1", "grade": 2, "effect": {"CHR": 1}},
+    {"id": 1001, "name": "随身玉佩", "description": "改为传说", "grade": 3, "effect": {"SPR": 1}},
+  ],
+  "events": [
+    {"id": 90001, "event": "你在自定义事件中出生了。", "branch": ["CHR>0:90002"]},
+    {"id": 90002, "event": "自定义的分支事件。", "NoRandom": 1},
+  ],
+  "achievements": [
+    {
+      "id": 90001, "name": "自定义成就", "description": "经历自定义事件", "grade": 1,
+      "condition": "EVT?[90001]", "hide": 0, "opportunity": "TRAJECTORY",
+    },
+  ],
+  "age": {0: ["90001*999999999"]},
+}
+
+
+def rebuilt(dataset: Dataset) -> Dataset:
+  return Dataset(
+    dict(dataset.age), dict(dataset.talents), dict(dataset.events), dict(dataset.achievements),
+    dict(dataset.characters), dataset.version)
+
+
+class DatasetTestCase(unittest.TestCase):
+  def test_overlay_does_not_modify_base(self) -> None:
+    dataset = DEFAULT_DATASET.overlay(**OVERLAY)
+    self.assertNotIn(90001, TALENT)
+    self.assertNotIn(90001, EVENT)
+    self.assertEqual(TALENT[1001].rarity.value, 0)
+    self.assertEqual(dataset.talents[1001].rarity.value, 3)
+    self.assertIn(90001, dataset.events)
+    self.assertNotEqual(dataset.version, DEFAULT_DATASET.version)
+    # 未变化的索引与底层数据共享
+    self.assertIs(dataset.characters, DEFAULT_DATASET.characters)
+
+  def test_incremental_matches_rebuild(self) -> None:
+    dataset = DEFAULT_DATASET.overlay(**OVERLAY)
+    expected = rebuilt(dataset)
+    self.assertEqual(dataset.talent_by_rarity, expected.talent_by_rarity)
+    self.assertEqual(
+      dataset.talent_incompatibility.adjacency, expected.talent_incompatibility.adjacency)
+    self.assertEqual(dataset.trigger_index.talent_ages, expected.trigger_index.talent_ages)
+    for opportunity in Opportunity:
+      for age in range(-1, 501):
+        self.assertEqual(
+          dataset.trigger_index.achievements_at(opportunity, age),
+          expected.trigger_index.achievements_at(opportunity, age))
+    self.assertEqual(dataset.branch_index.stats(), expected.branch_index.stats())
+    self.assertEqual(dataset.branch_index.tables.keys(), expected.branch_index.tables.keys())
+
+  def test_game(self) -> None:
+    dataset = DEFAULT_DATASET.overlay(**OVERLAY)
+    game = Game(statistics=Statistics(), random=PhiloxRandom(1), dataset=dataset)
+    game.set_talents([dataset.talents[90001]])
+    game.set_stats(5, 5, 5, 5)
+    progress = game.progress()
+    next(progress)
+    year = next(progress)
+    self.assertEqual([event.id for event, _ in year.events], [90001, 90002])
+    self.assertIn(90001, [achievement.id for achievement in year.achievements])
+    self.assertIs(game.fork().dataset, dataset)
+
+  def test_default(self) -> None:
+    game = Game(random=PhiloxRandom(1))
+    self.assertIs(game.dataset, DEFAULT_DATASET)
+    # 空的叠加与默认数据完全相同
+    other = Game(random=PhiloxRandom(1), dataset=DEFAULT_DATASET.overlay())
+    self.assertEqual(next(game.random_talents()), next(other.random_talents()))
+
+
+class LocaleTestCase(unittest.TestCase):
+  def setUp(self) -> None:
+    self.directory = tempfile.mkdtemp()
+    source = os.path.dirname(data.__file__)
+    for name in ("achievement.json", "character.json", "events.json", "talents.json"):
+      with open(os.path.join(source, name), encoding="utf-8") as f:
+        table = json.load(f)
+      for item in table.values():
+        for key in ("name", "description", "event", "postEvent"):
+          if key in item:
+            item[key] = f"en:{item[key]}"
+      with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False)
+
+  def tearDown(self) -> None:
+    shutil.rmtree(self.directory)
+
+  def test_shared_logic(self) -> None:
+    dataset = load_locale("en", self.directory)
+    self.assertEqual(dataset.locale, "en")
+    self.assertIs(dataset.age, DEFAULT_DATASET.age)
+    for id, talent in DEFAULT_DATASET.talents.items():
+      self.assertEqual(dataset.talents[id].name, f"en:{talent.name}")
+      self.assertIs(dataset.talents[id].condition, talent.condition)
+    for id, event in DEFAULT_DATASET.events.items():
+      self.assertIs(dataset.events[id].branch, event.branch)
+      self.assertIs(dataset.events[id].include, event.include)
+
+  def test_same_life(self) -> None:
+    register_locale("en", self.directory)
+    self.assertIn("en", locales())
+    for seed in range(5):
+      lives: List[List[List[int]]] = []
+      for game in (Game(random=PhiloxRandom(seed)), Game(random=PhiloxRandom(seed), locale="en")):
+        game.set_talents(next(game.random_talents())[:3])
+        game.set_stats(5, 5, 5, 5)
+        lives.append([
+          [event.id for event, _ in progress.events] for progress in game.progress()])
+      self.assertEqual(lives[0], lives[1])
+    self.assertIs(get_dataset("en"), get_dataset("en"))
+    with self.assertRaises(KeyError):
+      get_dataset("xx")
+
+  def test_mismatch(self) -> None:
+    path = os.path.join(self.directory, "events.json")
+    with open(path, encoding="utf-8") as f:
+      table = json.load(f)
+    table["10000"]["include"] = "INT>5"
+    with open(path, "w", encoding="utf-8") as f:
+      json.dump(table, f, ensure_ascii=False)
+    with self.assertRaises(ValueError):
+      load_locale("en", self.directory)
+
+  def test_logic(self) -> None:
+    # 集合和 dict 中的条件也按结构比较，而不是按对象
+    logic = dataset_module._logic  # type: ignore
+    self.assertEqual(
+      logic(frozenset([Condition.parse("AGE>1")])), logic(frozenset([Condition.parse("AGE>1")])))
+    self.assertNotEqual(
+      logic(frozenset([Condition.parse("AGE>1")])), logic(frozenset([Condition.parse("AGE>2")])))
+    self.assertEqual(logic({1: Condition.parse("CHR<0")}), logic({1: Condition.parse("CHR<0")}))
@@ -0,0 +1,60 @@
+import unittest
+from typing import List
+
+from liferestart import Game, Statistics
+from liferestart.estimate import (
+  ImportanceGame, default_setup, event_bias, event_target, importance_sampling,
+  multilevel_splitting
+)
+from liferestart.lookahead import lookahead
+from liferestart.state import Slot
+
+
+class ForkTestCase(unittest.TestCase):
+  def test_fork(self) -> None:
+    game = Game(statistics=Statistics())
+    game.seed(1)
+    default_setup(game)
+    progress = game.progress()
+    for _ in range(10):
+      next(progress)
+    clone = game.fork()
+    left = [x.age for x in progress]
+    right: List[int] = []
+    while clone.alive:
+      right.append(clone.next_year().age)
+    self.assertEqual(left, right)
+    self.assertEqual(game.end(), clone.end())
+
+
+class EstimateTestCase(unittest.TestCase):
+  def test_unbiased_without_bias(self) -> None:
+    game = ImportanceGame({})
+    game.seed(1)
+    default_setup(game)
+    for _ in game.progress():
+      pass
+    self.assertEqual(game.likelihood, 1.0)
+
+  def test_importance_sampling(self) -> None:
+    # 有偏置和无偏置的估计应在误差范围内一致
+    target = event_target(10095)
+    plain = importance_sampling(target, {}, 120, seed=0)
+    biased = importance_sampling(target, event_bias([10095], 5.0), 120, seed=1000)
+    self.assertGreater(biased.hits, plain.hits)
+    bound = 4 * (plain.variance + biased.variance) ** 0.5
+    self.assertLess(abs(plain.probability - biased.probability), bound)
+
+  def test_splitting(self) -> None:
+    # 0 岁时发生事件 10001 的精确概率由 lookahead 给出（出生时没有随机数）
+    game = Game(statistics=Statistics())
+    default_setup(game)
+    game.start()
+    exact = lookahead(game).events()[10001]
+    estimate = multilevel_splitting(
+      lambda game, end: 10001 in game.statistics.events,
+      [lambda game: game.values[Slot.AGE] >= 0, lambda game: 10001 in game.values[Slot.EVT]],
+      particles=20, replications=3)
+    self.assertEqual(estimate.samples, 60)
+    bound = 4 * (exact * (1 - exact) / estimate.samples) ** 0.5
+    self.assertLess(abs(estimate.probability - exact), bound)
@@ -0,0 +1,65 @@
+import itertools
+import unittest
+from typing import List
+
+from liferestart.condition import Condition
+from liferestart.data import BRANCH_INDEX, TALENT, TALENT_INCOMPATIBILITY
+from liferestart.index import BranchIndex, condition_ages
+from liferestart.struct.event import Event
+from liferestart.struct.commons import Rarity
+
+
+class IncompatibilityIndexTestCase(unittest.TestCase):
+  def test_symmetric(self) -> None:
+    for a, b in itertools.combinations(TALENT.values(), 2):
+      blocked = TALENT_INCOMPATIBILITY.blocked((a,))
+      self.assertEqual(TALENT_INCOMPATIBILITY.is_blocked(b, blocked), a.is_imcompatible_with(b))
+
+  def test_compatible(self) -> None:
+    selection = [talent for talent in TALENT.values() if talent.imcompatible][:3]
+    for rarity in Rarity:
+      expected = [
+        talent for talent in TALENT.values()
+        if not talent.exclusive and talent.rarity == rarity and not any(
+          talent is other or talent.is_imcompatible_with(other) for other in selection)
+      ]
+      self.assertEqual(TALENT_INCOMPATIBILITY.compatible(rarity, selection), expected)
+
+
+class ConditionAgesTestCase(unittest.TestCase):
+  def test_ages(self) -> None:
+    domain = list(range(-1, 101))
+    self.assertEqual(condition_ages(Condition.parse("AGE?[20,30]"), domain), {20, 30})
+    self.assertEqual(condition_ages(Condition.parse("AGE?[20,30]&INT>8"), domain), {20, 30})
+    self.assertEqual(condition_ages(Condition.parse("AGE?[20]|AGE?[30]"), domain), {20, 30})
+    self.assertIsNone(condition_ages(Condition.parse("AGE?[20]|INT>8"), domain))
+    self.assertIsNone(condition_ages(Condition.parse("HAGE>89"), domain))
+    self.assertEqual(condition_ages(Condition.parse("HAGE>98"), domain, True), {99, 100})
+
+
+def make_event(id: int, branch: List[str]) -> Event:
+  return Event.parse({"id": id, "event": str(id), "branch": branch})
+
+
+class BranchIndexTestCase(unittest.TestCase):
+  def test_bundled(self) -> None:
+    self.assertEqual(BRANCH_INDEX.cycles, [])
+    self.assertEqual(BRANCH_INDEX.missing, [])
+    # 事件 10000 的三个分支共享 AGE![500]
+    self.assertEqual(len(BRANCH_INDEX.tables[10000]), 1)
+
+  def test_graph(self) -> None:
+    events = {
+      1: make_event(1, ["AGE>0:2", "AGE>0:3", "AGE?[1000]:3", "AGE<0:4"]),
+      2: make_event(2, ["CHR>0:1"]),
+      3: make_event(3, ["CHR>0:5"]),
+      5: make_event(5, []),
+      6: make_event(6, []),
+    }
+    index = BranchIndex(events, {age: {1: 1} for age in range(10)})
+    self.assertEqual(index.cycles, [[1, 2]])
+    self.assertEqual(index.missing, [(1, 4)])
+    self.assertEqual(index.dead, [(1, 1), (1, 2)])
+    self.assertEqual(index.depth[3], 2)
+    self.assertIsNone(index.depth[1])
+    self.assertEqual(index.orphans, [6])
@@ -0,0 +1,55 @@
+import unittest
+from collections import Counter
+
+from liferestart import Game
+from liferestart.lookahead import clear_cache, lookahead, signature
+from liferestart.rng import PhiloxRandom
+
+
+def started(seed: int, years: int) -> Game:
+  game = Game(random=PhiloxRandom(seed))
+  game.set_talents(next(game.random_talents())[:3])
+  game.set_stats(5, 5, 5, 5)
+  progress = game.progress()
+  for _ in range(years + 1):
+    next(progress)
+  return game
+
+
+class LookaheadTestCase(unittest.TestCase):
+  def setUp(self) -> None:
+    clear_cache()
+
+  def test_distribution(self) -> None:
+    game = started(3, 10)
+    state = game.random.getstate()
+    result = lookahead(game)
+    self.assertAlmostEqual(result.total(), 1)
+    # 不消耗随机数
+    self.assertEqual(game.random.getstate(), state)
+    self.assertIs(lookahead(game), result)
+    self.assertEqual(lookahead(game, cache=False), result)
+    # 与抽样比较
+    count = 1000
+    counts: "Counter[int]" = Counter()
+    for seed in range(count):
+      child = game.fork(PhiloxRandom(1000 + seed))
+      counts.update({event.id for event, _ in child.next_year().events})
+    events = result.events()
+    self.assertLessEqual(set(counts), set(events))
+    for id, probability in events.items():
+      self.assertAlmostEqual(counts[id] / count, probability, delta=0.05)
+
+  def test_signature(self) -> None:
+    game = started(5, 4)
+    fork = game.fork()
+    self.assertEqual(signature(fork), signature(game))
+    self.assertNotEqual(signature(started(5, 5)), signature(game))
+
+  def test_dead(self) -> None:
+    game = Game(random=PhiloxRandom(7))
+    game.set_talents(next(game.random_talents())[:3])
+    game.set_stats(5, 5, 5, 5)
+    for _ in game.progress():
+      pass
+    self.assertEqual(lookahead(game).outcomes, ())
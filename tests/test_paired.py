@@ -0,0 +1,58 @@
+import unittest
+from typing import List, Tuple
+from unittest import mock
+
+from liferestart import Game
+from liferestart.data import EVENT
+from liferestart.paired import paired_simulation, run_life, stats_setup
+from liferestart.rng import PhiloxRandom
+from liferestart.state import Slot
+from liferestart.struct.event import Event
+
+
+class PairedTestCase(unittest.TestCase):
+  def test_same_config(self) -> None:
+    setup = stats_setup(5, 5, 5, 5)
+    result = paired_simulation({"a": setup, "b": setup}, 10)
+    self.assertEqual(result.lives["a"], result.lives["b"])
+    difference = result.difference("a", "b")["overall"]
+    self.assertEqual(difference.mean, 0)
+    self.assertEqual(difference.variance, 0)
+
+  def test_variance_reduction(self) -> None:
+    result = paired_simulation({"a": stats_setup(5, 5, 5, 5), "b": stats_setup(5, 5, 6, 4)}, 40)
+    self.assertGreater(result.difference("a", "b")["age"].variance_reduction, 1)
+
+  def test_workers(self) -> None:
+    configs = {"a": stats_setup(5, 5, 5, 5), "b": stats_setup(10, 0, 5, 5)}
+    self.assertEqual(
+      paired_simulation(configs, 6, seed=3).lives,
+      paired_simulation(configs, 6, seed=3, workers=2).lives)
+
+  def test_rewind(self) -> None:
+    # 年龄倒退之后的每一年仍然要使用新的块
+    positions: List[int] = []
+
+    class RecordingRandom(PhiloxRandom):
+      def seek(self, block: int) -> None:
+        positions.append(block)
+        super().seek(block)
+
+    def setup(game: Game) -> None:
+      game.set_talents([])
+      game.set_stats(5, 5, 5, 5)
+      candidates = game.event_candidates
+      rewound: List[bool] = []
+
+      def event_candidates() -> Tuple[List[Event], List[float]]:
+        if game.values[Slot.AGE] == 10 and not rewound:
+          rewound.append(True)
+          return [EVENT[11468]], [1.0]
+        return candidates()
+      game.event_candidates = event_candidates
+
+    with mock.patch("liferestart.paired.PhiloxRandom", RecordingRandom):
+      life = run_life(setup, 0)
+    self.assertGreater(life.age, 10)
+    self.assertEqual(len(positions), len(set(positions)))
+    self.assertEqual(positions, sorted(positions))
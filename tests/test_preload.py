@@ -0,0 +1,58 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from liferestart import Game, data, dataset, preload, render, search
+from liferestart.dataset import DEFAULT_DATASET, get_dataset, register_locale
+from liferestart.rng import PhiloxRandom
+
+try:
+  from liferestart import batch
+except ImportError:
+  batch = None
+
+
+class PreloadTestCase(unittest.TestCase):
+  def setUp(self) -> None:
+    self.directory = tempfile.mkdtemp()
+    source = os.path.dirname(data.__file__)
+    for name in ("achievement.json", "character.json", "events.json", "talents.json"):
+      with open(os.path.join(source, name), encoding="utf-8") as f:
+        table = json.load(f)
+      for item in table.values():
+        if "name" in item:
+          item["name"] = f"预载{item['name']}"
+      with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False)
+    register_locale("preload", self.directory)
+
+  def tearDown(self) -> None:
+    dataset._directories.pop("preload", None)  # type: ignore
+    dataset._datasets.pop("preload", None)  # type: ignore
+    shutil.rmtree(self.directory)
+
+  def test_nothing_lazy(self) -> None:
+    # preload 之后，数据集、显示宽度、搜索索引和批量模拟的条件都不再按需构建
+    preload(freeze=False, search=True, batch=batch is not None)
+    self.assertIn("preload", dataset._datasets)  # type: ignore
+    index = search._indexes.get(DEFAULT_DATASET.version)  # type: ignore
+    self.assertIsNotNone(index)
+    widths = len(render._width_cache)  # type: ignore
+    compiled = len(batch.get_tables().compiled) if batch is not None else 0
+    game = Game(random=PhiloxRandom(1), locale="preload")
+    talents = game.set_talents(next(game.random_talents())[:3])
+    game.set_stats(5, 5, 5, 5)
+    for _ in game.progress():
+      pass
+    end = game.end()
+    for item in (*talents, *end.achievements, *get_dataset("preload").characters.values()):
+      render.str_width(item.name)
+    self.assertIs(search.get_index(), index)
+    self.assertEqual(len(render._width_cache), widths)  # type: ignore
+    if batch is not None:
+      game = batch.BatchGame(50, seed=0)
+      game.set_stats(5, 5, 5, 5)
+      game.run()
+      self.assertEqual(len(batch.get_tables().compiled), compiled)
@@ -0,0 +1,69 @@
+import json
+import unittest
+from typing import Optional
+
+from liferestart import Game, Statistics
+from liferestart.data import EVENT
+from liferestart.dataset import DEFAULT_DATASET
+from liferestart.profiling import CountedCondition, Profiler
+
+
+def run(seed: int, profiler: Optional[Profiler] = None) -> Game:
+  game = Game(statistics=Statistics())
+  game.seed(seed)
+  game.set_talents([])
+  game.set_stats(5, 5, 5, 5)
+  if profiler:
+    with profiler.profile(game):
+      for _ in game.progress():
+        pass
+  else:
+    for _ in game.progress():
+      pass
+  return game
+
+
+class ProfilerTestCase(unittest.TestCase):
+  def test_profile(self) -> None:
+    profiler = Profiler()
+    end = run(1, profiler).end()
+    self.assertEqual(end, run(1).end())
+    result = profiler.to_dict()
+    self.assertEqual(sum(item["calls"] for item in result["ages"].values()), end.age + 1)
+    self.assertEqual(sum(result["chain_depth"].values()), end.age + 1)
+    self.assertIn("TRAJECTORY", result["achievements"])
+    self.assertTrue(result["conditions"])
+    for item in result["conditions"].values():
+      self.assertLessEqual(item["true"], item["evaluations"])
+    json.loads(profiler.to_json())
+    self.assertTrue(profiler.collapsed().startswith("game;execute_talents "))
+
+  def test_detach(self) -> None:
+    profiler = Profiler()
+    game = run(1, profiler)
+    self.assertNotIn("_execute_events", vars(game))
+    self.assertIs(game.dataset, DEFAULT_DATASET)
+    self.assertTrue(all("evaluate" not in vars(event.include) for event in EVENT.values()))
+
+  def test_scoped(self) -> None:
+    # 只统计附加的游戏，共享的条件和同时进行的其他游戏不受影响
+    profiler = Profiler()
+    game = Game(statistics=Statistics())
+    game.seed(1)
+    game.set_talents([])
+    game.set_stats(5, 5, 5, 5)
+    other = Game(statistics=Statistics())
+    other.seed(2)
+    other.set_talents([])
+    other.set_stats(5, 5, 5, 5)
+    with profiler.profile(game):
+      self.assertIsInstance(game.dataset.events[10001].exclude, CountedCondition)
+      self.assertIs(other.dataset, DEFAULT_DATASET)
+      game.start()
+      other.start()
+      evaluations = sum(count for count, _ in profiler.conditions.values())
+      while other.alive:
+        other.next_year()
+      self.assertEqual(sum(count for count, _ in profiler.conditions.values()), evaluations)
+    self.assertFalse(any(
+      isinstance(event.include, CountedCondition) for event in DEFAULT_DATASET.events.values()))
@@ -0,0 +1,45 @@
+import unittest
+
+from liferestart import Game, Statistics
+from liferestart.render import ANSI, MARKDOWN, PLAIN, render_life, str_width
+from liferestart.struct.commons import Rarity
+from liferestart.trace import LifeTrace
+
+
+class RenderTestCase(unittest.TestCase):
+  def test_str_width(self) -> None:
+    self.assertEqual(str_width(""), 0)
+    self.assertEqual(str_width("abc"), 3)
+    self.assertEqual(str_width("人生重开"), 8)
+    self.assertEqual(str_width("\x0e\x0fa"), 1)
+    self.assertEqual(str_width("̀"), 0)
+
+  def test_render_life(self) -> None:
+    game = Game(statistics=Statistics())
+    game.seed(1)
+    game.set_talents(next(game.random_talents())[:3])
+    game.set_stats(5, 5, 5, 5)
+    progress = list(game.progress())
+    end = game.end()
+    text = render_life(progress, end, style=PLAIN)
+    self.assertNotIn("\033", text)
+    self.assertTrue(text.startswith("---- 出生 ----\n"))
+    self.assertIn(f"总评: {end.overall} - ", text)
+    self.assertEqual(render_life(LifeTrace.from_progress(progress), end, style=PLAIN), text)
+    self.assertIn("\033[0m", render_life(progress, end, style=ANSI))
+
+  def test_markdown(self) -> None:
+    self.assertEqual(MARKDOWN.format(Rarity.RARE, "a*b"), "**a\\*b**")
+    game = Game(statistics=Statistics())
+    game.seed(1)
+    game.set_talents(next(game.random_talents())[:3])
+    game.set_stats(5, 5, 5, 5)
+    progress = list(game.progress())
+    end = game.end()
+    text = render_life(progress, end, style=MARKDOWN)
+    # 每一行都以硬换行结束，单独的换行在 Markdown 中会被合并成一段
+    lines = text.split("\n")
+    self.assertEqual(lines[-1], "")
+    self.assertTrue(all(line.endswith("  ") for line in lines[:-2]))
+    self.assertEqual(len(lines), len(render_life(progress, end, style=PLAIN).split("\n")))
+    self.assertIn(f"总评: {end.overall} - ", text)
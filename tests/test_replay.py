@@ -0,0 +1,74 @@
+import dataclasses
+import os
+import tempfile
+import unittest
+
+from liferestart import Game, Statistics
+from liferestart.dataset import DEFAULT_DATASET
+from liferestart.replay import ReplayCache, ReplayRecord, replay
+from liferestart.trace import LifeTrace
+
+from .test_dataset import OVERLAY
+
+
+def play(seed: int, statistics: Statistics) -> "tuple[ReplayRecord, LifeTrace]":
+  game = Game(statistics=statistics)
+  game.seed(seed)
+  generator = game.random_talents()
+  next(generator)
+  talents = next(generator)[:3]
+  record = ReplayRecord.create(seed, [talent.id for talent in talents], (4, 6, 5, 5), statistics, 2)
+  game.set_talents(talents)
+  game.set_stats(4, 6, 5, 5)
+  trace = LifeTrace.from_progress(game.progress())
+  game.end()
+  return record, trace
+
+
+class ReplayTestCase(unittest.TestCase):
+  def test_replay(self) -> None:
+    statistics = Statistics()
+    play(1, statistics)
+    record, trace = play(2, statistics)
+    self.assertTrue(record.finished_games == 1 and record.seen_events)
+    self.assertEqual(replay(record).trace, trace)
+    self.assertEqual(ReplayRecord.from_token(record.to_token()), record)
+
+  def test_dataset(self) -> None:
+    record, _ = play(1, Statistics())
+    with self.assertRaises(ValueError):
+      replay(dataclasses.replace(record, dataset="0" * 16))
+    # 叠加的数据按版本找回，也可以直接指定，指定的数据版本不同时拒绝
+    dataset = DEFAULT_DATASET.overlay(**OVERLAY)
+    game = Game(statistics=Statistics(), dataset=dataset)
+    game.seed(1)
+    record = ReplayRecord.create(1, [90001], (5, 5, 5, 5), game.statistics, dataset=game.dataset)
+    game.set_talents([dataset.talents[90001]])
+    game.set_stats(5, 5, 5, 5)
+    trace = LifeTrace.record(game)
+    self.assertEqual(record.dataset, dataset.version)
+    self.assertEqual(replay(record).trace, trace)
+    self.assertEqual(replay(record, dataset=dataset).trace, trace)
+    with self.assertRaises(ValueError):
+      replay(record, dataset=DEFAULT_DATASET)
+
+  def test_cache(self) -> None:
+    record, trace = play(3, Statistics())
+    with tempfile.TemporaryDirectory() as directory:
+      cache = ReplayCache(1, directory)
+      first = cache.get(record)
+      self.assertIs(cache.get(record), first)
+      self.assertEqual((cache.hits, cache.misses), (1, 1))
+      other = ReplayCache(1, directory).get(record)
+      self.assertEqual(other.trace, trace)
+      self.assertEqual(other.end, first.end)
+      # 写了一半的文件当作没有缓存，重新计算
+      path = os.path.join(directory, os.listdir(directory)[0])
+      with open(path, "rb") as f:
+        data = f.read()
+      for size in (2, len(data) // 2, len(data) - 1):
+        with open(path, "wb") as f:
+          f.write(data[:size])
+        cache = ReplayCache(1, directory)
+        self.assertEqual(cache.get(record).trace, trace)
+        self.assertEqual(cache.misses, 1)
@@ -0,0 +1,47 @@
+import unittest
+from random import Random
+from typing import List
+
+from liferestart import Game, Statistics
+from liferestart.rng import PhiloxRandom, philox, spawn_streams
+
+
+class PhiloxTestCase(unittest.TestCase):
+  def test_known_answer(self) -> None:
+    # Random123 的 philox4x32-10 测试向量
+    self.assertEqual(philox((0, 0, 0, 0), (0, 0)), (0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8))
+    self.assertEqual(
+      philox((0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344), (0xa4093822, 0x299f31d0)),
+      (0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1))
+
+  def test_jump(self) -> None:
+    a = PhiloxRandom(1)
+    b = PhiloxRandom(1)
+    for _ in range(20):
+      a.getrandbits(32)
+    b.jump(5)
+    self.assertEqual(a.random(), b.random())
+
+  def test_streams(self) -> None:
+    streams = spawn_streams(1, 3)
+    values = [[stream.random() for _ in range(100)] for stream in streams]
+    self.assertEqual(len({x for items in values for x in items}), 300)
+    self.assertEqual(values[2][0], PhiloxRandom(1, stream=2).random())
+
+  def test_random_array(self) -> None:
+    a = PhiloxRandom(3)
+    b = PhiloxRandom(3)
+    expected = [a.random() for _ in range(7)] + [a.random()]
+    self.assertEqual([*b.random_array(7), b.random()], expected)
+
+  def test_game(self) -> None:
+    # 默认后端与 random.Random 逐位一致
+    results: List[List[int]] = []
+    for random in (None, Random()):
+      game = Game(statistics=Statistics(), random=random)
+      game.seed(1)
+      results.append([talent.id for talent in next(game.random_talents())])
+    self.assertEqual(results[0], results[1])
+    game = Game(statistics=Statistics(), random=PhiloxRandom())
+    game.seed(1)
+    self.assertEqual(len(next(game.random_talents())), game.config.talent.choices)
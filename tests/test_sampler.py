@@ -0,0 +1,32 @@
+import unittest
+from random import Random
+
+from liferestart.sampler import BucketSampler
+
+
+class BucketSamplerTestCase(unittest.TestCase):
+  def test_exhaust(self) -> None:
+    for fast in (False, True):
+      sampler = BucketSampler({0: [1, 2, 3], 1: [4], 2: []}, {0: 1, 1: 1, 2: 1}, fast)
+      random = Random(0)
+      drawn = [sampler.draw(random) for _ in range(5)]
+      self.assertEqual(sorted(drawn[:4]), [1, 2, 3, 4])  # type: ignore
+      self.assertIsNone(drawn[4])
+
+  def test_undo_fast(self) -> None:
+    buckets = {0: list(range(10)), 1: list(range(10, 15))}
+    sampler = BucketSampler(buckets, {0: 3, 1: 1}, True)
+    random = Random(1)
+    first = [sampler.draw(random) for _ in range(8)]
+    sampler.undo()
+    self.assertEqual(sampler._items, list(buckets.values()))  # type: ignore
+    random = Random(1)
+    self.assertEqual([sampler.draw(random) for _ in range(8)], first)
+
+  def test_undo_exact(self) -> None:
+    sampler = BucketSampler({0: [1, 2, 3, 4]}, {0: 1})
+    random = Random(2)
+    first = [sampler.draw(random) for _ in range(2)]
+    sampler.undo()
+    # 与原实现一致，撤销后抽到的元素移到桶尾
+    self.assertEqual(sampler._items[0][-2:], first)  # type: ignore
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+from liferestart.data import EVENT, TALENT
+from liferestart.dataset import DEFAULT_DATASET
+from liferestart.search import SearchIndex, documents, get_index, search
+
+from .test_dataset import OVERLAY
+
+
+class SearchTestCase(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls) -> None:
+    cls.index = SearchIndex(documents())
+
+  def test_search(self) -> None:
+    results = self.index.search("诺贝尔")
+    self.assertEqual((results[0].kind, TALENT[results[0].id].name), ("talent", "诺贝尔奖"))
+    # 与逐个扫描子串的结果一致
+    expected = {id for id, event in EVENT.items() if "车祸" in event.event or "车祸" in event.post}
+    found = {result.id for result in self.index.search("车祸", 1000, "event")}
+    self.assertEqual(found, expected)
+    self.assertEqual(self.index.search("不存在的文本"), [])
+
+  def test_prefix_and_lookup(self) -> None:
+    self.assertTrue(all(result.text.startswith("天") for result in self.index.prefix("天")))
+    self.assertEqual(self.index.lookup(1001, "talent")[0].text, TALENT[1001].name)
+
+  def test_persist(self) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, "search.json")
+      self.index.save(path)
+      loaded = SearchIndex.load(path)
+    assert loaded is not None
+    self.assertEqual(loaded.search("转世"), self.index.search("转世"))
+    self.assertEqual(loaded.prefix("天"), self.index.prefix("天"))
+
+  def test_get_index(self) -> None:
+    # 已经缓存时指定 path 也会写入文件
+    index = get_index()
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, "search.json")
+      self.assertIs(get_index(path), index)
+      self.assertTrue(os.path.exists(path))
+      self.assertIs(get_index(path), index)
+    # 不同的数据集使用各自的索引
+    dataset = DEFAULT_DATASET.overlay(**OVERLAY)
+    self.assertIsNot(get_index(dataset=dataset), index)
+    self.assertEqual(search("测试天赋", dataset=dataset)[0].id, 90001)
+    self.assertEqual(search("测试天赋"), [])
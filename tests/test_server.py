@@ -0,0 +1,105 @@
+import asyncio
+import json
+import unittest
+from typing import Any, Optional, Tuple
+
+from liferestart.replay import ReplayRecord, replay
+from liferestart.server import SimulationServer
+
+
+async def request(
+  port: int, method: str, path: str, body: Optional[Any] = None
+) -> Tuple[int, Any]:
+  reader, writer = await asyncio.open_connection("127.0.0.1", port)
+  data = b"" if body is None else json.dumps(body).encode()
+  writer.write((
+    f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+    f"Content-Length: {len(data)}\r\n\r\n"
+  ).encode() + data)
+  response = await reader.read()
+  writer.close()
+  head, _, content = response.partition(b"\r\n\r\n")
+  status = int(head.split()[1])
+  if b"application/json" in head:
+    return status, json.loads(content)
+  return status, content.decode()
+
+
+class ServerTestCase(unittest.IsolatedAsyncioTestCase):
+  async def asyncSetUp(self) -> None:
+    self.server = SimulationServer(workers=1)
+    self.port = await self.server.start()
+
+  async def asyncTearDown(self) -> None:
+    await self.server.close()
+
+  async def test_life(self) -> None:
+    status, drawn = await request(self.port, "GET", "/talents?seed=7")
+    self.assertEqual(status, 200)
+    talents = [drawn["talents"][0]["id"]]
+    status, life = await request(self.port, "POST", "/lives", {
+      "seed": 7, "talents": talents, "stats": [5, 5, 5, 5], "rerolls": 1})
+    self.assertEqual(status, 200)
+    years = [life["year"]]
+    end = life["end"]
+    while end is None:
+      status, result = await request(self.port, "POST", f"/lives/{life['id']}/next")
+      self.assertEqual(status, 200)
+      years.append(result["year"])
+      end = result["end"]
+    # 与直接重放的结果相同
+    expected = replay(ReplayRecord.from_token(life["record"]))
+    self.assertEqual([year["age"] for year in years], list(expected.trace.ages))
+    self.assertEqual(end["overall"], expected.end.overall)
+    status, _ = await request(self.port, "POST", f"/lives/{life['id']}/next")
+    self.assertEqual(status, 404)
+
+  async def test_simulate(self) -> None:
+    status, result = await request(self.port, "POST", "/simulate", {
+      "start": 3, "count": 4, "character": 1})
+    self.assertEqual(status, 200)
+    self.assertEqual([life["seed"] for life in result["lives"]], [3, 4, 5, 6])
+    status, metrics = await request(self.port, "GET", "/metrics")
+    self.assertEqual(status, 200)
+    self.assertIn("liferestart_lives_total 4", metrics)
+    self.assertIn('liferestart_request_seconds_count{route="/simulate"} 1', metrics)
+
+  async def test_errors(self) -> None:
+    self.assertEqual((await request(self.port, "GET", "/nothing"))[0], 404)
+    self.assertEqual((await request(self.port, "GET", "/simulate"))[0], 405)
+    status, result = await request(self.port, "POST", "/lives", {"talents": [0], "stats": [5]})
+    self.assertEqual(status, 400)
+    self.assertIn("error", result)
+
+  async def test_invalid_life(self) -> None:
+    for body in (
+      # 重抽次数有上限，否则一个请求就能长时间占用工作进程
+      {"seed": 1, "stats": [5, 5, 5, 5], "rerolls": 1000000},
+      {"seed": 1, "stats": [5, 5, 5, 5], "rerolls": -1},
+      # 属性之和必须等于可分配的点数，天赋 1064 额外 +8
+      {"seed": 1, "stats": [10, 10, 10, 10]},
+      {"seed": 1, "talents": [1064], "stats": [5, 5, 5, 5]},
+      # 名人模式的天赋和属性是固定的
+      {"seed": 1, "character": 1, "talents": [1001]},
+      {"seed": 1, "character": 1, "stats": [5, 5, 5, 5]},
+      {"seed": 1, "character": 1, "rerolls": 1},
+    ):
+      with self.subTest(body=body):
+        status, result = await request(self.port, "POST", "/lives", body)
+        self.assertEqual(status, 400)
+        self.assertIn("error", result)
+    status, _ = await request(self.port, "POST", "/lives", {
+      "seed": 1, "talents": [1064], "stats": [7, 7, 7, 7]})
+    self.assertEqual(status, 200)
+    status, _ = await request(self.port, "POST", "/simulate", {
+      "count": 1, "character": 1, "talents": [1001]})
+    self.assertEqual(status, 400)
+
+  async def test_backpressure(self) -> None:
+    self.server.max_pending = 1
+    responses = await asyncio.gather(*(
+      request(self.port, "POST", "/simulate", {"count": 8}) for _ in range(4)))
+    statuses = sorted(status for status, _ in responses)
+    self.assertEqual(statuses[0], 200)
+    self.assertIn(429, statuses)
+    self.assertEqual(self.server.metrics.rejected, statuses.count(429))
@@ -0,0 +1,44 @@
+import contextlib
+import io
+import json
+import unittest
+
+from liferestart.__main__ import main
+from liferestart.simulate import SimulateOptions, simulate
+
+
+class SimulateTestCase(unittest.TestCase):
+  def test_workers(self) -> None:
+    options = SimulateOptions(stats=(5, 5, 5, 5))
+    single = [record for chunk in simulate(range(6), options, chunk=4) for record in chunk]
+    multi = [record for chunk in simulate(range(6), options, 2, chunk=1) for record in chunk]
+    self.assertEqual(single, multi)
+    self.assertEqual([record["seed"] for record in single], list(range(6)))
+
+  def test_cli(self) -> None:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+      main(["simulate", "--seeds", "5:8", "--talents", "1001,1002", "--stats", "5,5,5,5", "--events"])
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    self.assertEqual([record["seed"] for record in records], [5, 6, 7])
+    self.assertTrue(all(record["stats"] == [5, 5, 5, 5] for record in records))
+    self.assertTrue(all(record["events"] and all(record["events"]) for record in records))
+
+  def test_invalid(self) -> None:
+    # 不合法的选项由 argparse 报错退出，而不是抛出 KeyError
+    for args in (
+      ["--talents", "999999"],  # 不存在
+      ["--talents", "1001,1001"],  # 重复
+      ["--talents", "1001,1002,1003,1004"],  # 超过上限
+      ["--character", "1", "--talents", "1001"],
+      ["--character", "1", "--stats", "5,5,5,5"],
+      ["--stats", "5,5,5"],
+      ["--stats", "11,3,3,3"],  # 超出范围
+      ["--talents", "1064", "--stats", "5,5,5,5"],  # 与属性点不符
+    ):
+      with self.subTest(args=args), contextlib.redirect_stderr(io.StringIO()):
+        with self.assertRaises(SystemExit) as context:
+          main(["simulate", "--seeds", "1", *args])
+        self.assertEqual(context.exception.code, 2)
+    with self.assertRaises(ValueError):
+      next(simulate([0], SimulateOptions(talents=(999999,))))
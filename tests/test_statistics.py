@@ -0,0 +1,66 @@
+import unittest
+
+from liferestart import Game, Statistics
+
+
+def play(statistics: Statistics, seed: int) -> None:
+  game = Game(statistics=statistics)
+  game.seed(seed)
+  talents = next(game.random_talents())[:3]
+  statistics.inherited_talent = talents[0].id
+  game.set_talents(talents)
+  game.set_stats(5, 5, 5, 5)
+  for _ in game.progress():
+    pass
+  game.end()
+
+
+class MergeTestCase(unittest.TestCase):
+  def test_merge(self) -> None:
+    base = Statistics(replica="base")
+    play(base, 0)
+    a = base.copy()
+    a.replica = "a"
+    b = base.copy()
+    b.replica = "b"
+    play(a, 1)
+    play(b, 2)
+    play(b, 3)
+    left = a.copy()
+    left.merge(b)
+    right = b.copy()
+    right.merge(a)
+    self.assertEqual(left, right)
+    self.assertEqual(left.finished_games, 4)
+    self.assertEqual(left.events, a.events | b.events)
+    # b 最后设置了继承的天赋
+    self.assertEqual(left.inherited_talent, b.inherited_talent)
+    # 幂等
+    left.merge(b)
+    left.merge(left.copy())
+    self.assertEqual(left, right)
+    self.assertEqual(left.finished_games, 4)
+
+  def test_delta(self) -> None:
+    a = Statistics(replica="a")
+    b = Statistics(replica="b")
+    play(a, 1)
+    b.merge(a)
+    snapshot = a.copy()
+    play(a, 2)
+    delta = a.diff(snapshot)
+    self.assertLess(len(delta.events), len(a.events))
+    b.merge(delta)
+    self.assertEqual(b, a)
+    self.assertEqual(b.finished_games, 2)
+
+  def test_serialize(self) -> None:
+    a = Statistics(replica="a")
+    play(a, 1)
+    b = Statistics.deserialize(a.serialize())
+    self.assertEqual(b, a)
+    self.assertEqual((b.replica, b.counters, b.clocks), (a.replica, a.counters, a.clocks))
+    old = a.serialize()
+    for key in ("replica", "counters", "clocks"):
+      del old[key]  # type: ignore
+    self.assertEqual(Statistics.deserialize(old), a)
@@ -0,0 +1,80 @@
+import inspect
+import pickle
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from liferestart import Game, estimate, paired, render, replay
+from liferestart import simulate as simulate_module
+from liferestart.condition import VarCondition
+from liferestart.config import Config
+from liferestart.conformance import compare, load, trace
+from liferestart.data import AGE, EVENT, TALENT
+from liferestart.simulate import SimulateOptions, simulate
+
+from .test_conformance import GOLDEN_PATH
+
+
+class ImmutableTestCase(unittest.TestCase):
+  def test_tables(self) -> None:
+    with self.assertRaises(TypeError):
+      TALENT[0] = TALENT[1001]  # type: ignore
+    with self.assertRaises(TypeError):
+      AGE[0].clear()
+    with self.assertRaises(AttributeError):
+      TALENT[1001].name = ""  # type: ignore
+    # 不可修改的 dict 仍然可以 pickle，进程池可以传递数据对象
+    self.assertEqual(pickle.loads(pickle.dumps(AGE)), AGE)
+    talent = next(talent for talent in TALENT.values() if talent.weights)
+    self.assertEqual(pickle.loads(pickle.dumps(talent)).weights, talent.weights)
+    # 没有替换的天赋的 weights 以及条件的集合也不可修改
+    plain = next(talent for talent in TALENT.values() if talent.replacement is None)
+    with self.assertRaises(TypeError):
+      plain.weights[1001] = 1  # type: ignore
+    condition = next(
+      event.include for event in EVENT.values() if isinstance(event.include, VarCondition)
+      and isinstance(event.include.right, (set, frozenset)))
+    self.assertIsInstance(condition.right, frozenset)
+    with self.assertRaises(AttributeError):
+      condition.right.add(0)  # type: ignore
+
+  def test_default_statistics(self) -> None:
+    self.assertIsNot(Game().statistics, Game().statistics)
+
+  def test_default_arguments(self) -> None:
+    # 可修改的 Config 不能作为默认参数被所有调用共享
+    for module in (estimate, paired, render, replay, simulate_module):
+      functions = inspect.getmembers(module, inspect.isfunction)
+      for _, cls in inspect.getmembers(module, inspect.isclass):
+        if cls.__module__ == module.__name__:
+          functions.extend(inspect.getmembers(cls, inspect.isfunction))
+      for name, function in functions:
+        for parameter in inspect.signature(function).parameters.values():
+          self.assertNotIsInstance(
+            parameter.default, (Config, SimulateOptions), f"{module.__name__}.{name}")
+
+
+class ThreadingTestCase(unittest.TestCase):
+  def setUp(self) -> None:
+    # 更频繁地切换线程，尽量暴露共享状态
+    self.interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+  def tearDown(self) -> None:
+    sys.setswitchinterval(self.interval)
+
+  def test_golden(self) -> None:
+    expected = list(islice(load(GOLDEN_PATH), 0, None, 30))
+    seeds = [item["seed"] for item in expected] * 2
+    with ThreadPoolExecutor(8) as executor:
+      actual = list(executor.map(trace, seeds))
+    for item, result in zip(expected * 2, actual):
+      self.assertIsNone(compare(item, result))
+
+  def test_simulate(self) -> None:
+    seeds = range(32)
+    single = [record for chunk in simulate(seeds, chunk=4) for record in chunk]
+    threaded = [
+      record for chunk in simulate(seeds, workers=8, chunk=4, threads=True) for record in chunk]
+    self.assertEqual(single, threaded)
@@ -0,0 +1,78 @@
+import io
+import unittest
+
+from liferestart import Game, Statistics
+from liferestart.data import CHARACTER
+from liferestart.dataset import DEFAULT_DATASET
+from liferestart.render import PLAIN, render_life
+from liferestart.trace import LifeTrace, read_binary, read_jsonl, write_binary, write_jsonl
+
+from .test_dataset import OVERLAY
+
+
+def new_game(seed: int) -> Game:
+  game = Game(statistics=Statistics())
+  game.seed(seed)
+  game.set_talents(next(game.random_talents())[:3])
+  game.set_stats(5, 5, 5, 5)
+  return game
+
+
+class LifeTraceTestCase(unittest.TestCase):
+  def test_progress(self) -> None:
+    progress = list(new_game(1).progress())
+    trace = LifeTrace.from_progress(progress)
+    self.assertEqual(len(trace), len(progress))
+    self.assertEqual(list(trace), progress)
+    self.assertEqual(LifeTrace.record(new_game(1)), trace)
+
+  def test_export(self) -> None:
+    traces = [LifeTrace.record(new_game(seed)) for seed in range(3)]
+    binary = io.BytesIO()
+    write_binary(traces, binary)
+    binary.seek(0)
+    self.assertEqual(list(read_binary(binary)), traces)
+    text = io.StringIO()
+    write_jsonl(traces, text)
+    text.seek(0)
+    self.assertEqual(list(read_jsonl(text)), traces)
+    with self.assertRaises(ValueError):
+      LifeTrace.from_bytes(b"JSON" + traces[0].to_bytes()[4:])
+
+  def test_float_stats(self) -> None:
+    # 祖冲之的属性是 3.1415926，不能被截断
+    game = Game(statistics=Statistics())
+    game.seed(1)
+    game.set_character(next(c for c in CHARACTER.values() if c.name == "祖冲之"))
+    progress = list(game.progress())
+    self.assertEqual(progress[0].charm, 3.1415926)
+    trace = LifeTrace.from_progress(progress)
+    self.assertEqual(list(trace), progress)
+    self.assertEqual(list(LifeTrace.from_bytes(trace.to_bytes())), progress)
+    text = io.StringIO()
+    write_jsonl([trace], text)
+    text.seek(0)
+    self.assertEqual(list(next(read_jsonl(text))), progress)
+
+  def test_dataset(self) -> None:
+    # 叠加的数据中的事件只能从记录的版本中查出
+    dataset = DEFAULT_DATASET.overlay(**OVERLAY)
+    game = Game(statistics=Statistics(), dataset=dataset)
+    game.seed(1)
+    game.set_talents([dataset.talents[90001]])
+    game.set_stats(5, 5, 5, 5)
+    progress = list(game.progress())
+    self.assertEqual([event.id for event, _ in progress[1].events], [90001, 90002])
+    trace = LifeTrace.from_progress(progress, dataset)
+    self.assertEqual(LifeTrace.from_bytes(trace.to_bytes()).dataset, dataset)
+    self.assertEqual(list(LifeTrace.from_bytes(trace.to_bytes())), progress)
+    self.assertEqual(list(LifeTrace.from_dict(trace.to_dict())), progress)
+    end = game.end()
+    self.assertEqual(
+      render_life(trace, end, style=PLAIN), render_life(progress, end, style=PLAIN))
+    with self.assertRaises(ValueError):
+      LifeTrace.from_bytes(trace.to_bytes(), DEFAULT_DATASET)
+    data = trace.to_dict()
+    data["dataset"] = "0" * 16
+    with self.assertRaises(ValueError):
+      LifeTrace.from_dict(data)